@@ -85,9 +85,13 @@
 
 # bookings/admin.py
 
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db import transaction
+from django.utils import timezone
+
+from tours.availability import reserve_seats
 from .models import (
-    Booking, BookingTraveler, BookingStatusHistory, 
+    ACTIVE_BOOKING_STATUSES, Booking, BookingTraveler, BookingStatusHistory, 
     BookingCancellation, BookingPayment
 )
 
@@ -155,13 +159,54 @@ class BookingAdmin(admin.ModelAdmin):
 
     actions = ['confirm_bookings', 'cancel_bookings', 'update_availability_descriptions']
 
+    def change_status(self, request, queryset, new_status):
+        """
+        Save each booking rather than queryset.update(), so seats and user stats
+        follow the change through the booking signals, as they do for the API.
+        Returns (bookings changed, references left alone for lack of seats).
+        """
+        changed, no_seats = 0, []
+        for pk in queryset.exclude(booking_status=new_status).values_list('pk', flat=True):
+            with transaction.atomic():
+                booking = Booking.objects.select_for_update().get(pk=pk)
+                old_status = booking.booking_status
+                if old_status == new_status:
+                    continue
+                # A cancelled booking gave its seats back; it needs them again to be reactivated
+                reactivated = new_status in ACTIVE_BOOKING_STATUSES and old_status not in ACTIVE_BOOKING_STATUSES
+                if reactivated and booking.preferred_date and booking.availability_slot_id is None:
+                    try:
+                        booking.availability_slot = reserve_seats(
+                            booking.tour, booking.preferred_date, booking.number_of_travelers,
+                            start_time=booking.preferred_time,
+                        )
+                    except ValueError:
+                        no_seats.append(booking.booking_reference)
+                        continue
+                booking.booking_status = new_status
+                if new_status == 'confirmed':
+                    booking.confirmation_date = timezone.now()
+                elif new_status == 'cancelled':
+                    booking.cancellation_date = timezone.now()
+                booking.save()
+                BookingStatusHistory.objects.create(
+                    booking=booking, old_status=old_status, new_status=new_status,
+                    changed_by=request.user, reason='Changed from the admin',
+                )
+                changed += 1
+        return changed, no_seats
+
     def confirm_bookings(self, request, queryset):
-        updated = queryset.update(booking_status='confirmed')
+        updated, no_seats = self.change_status(request, queryset, 'confirmed')
         self.message_user(request, f'{updated} bookings confirmed.')
+        if no_seats:
+            self.message_user(
+                request, f'Not enough seats left to confirm: {", ".join(no_seats)}', level=messages.WARNING
+            )
     confirm_bookings.short_description = 'Confirm selected bookings'
 
     def cancel_bookings(self, request, queryset):
-        updated = queryset.update(booking_status='cancelled')
+        updated, _ = self.change_status(request, queryset, 'cancelled')
         self.message_user(request, f'{updated} bookings cancelled.')
     cancel_bookings.short_description = 'Cancel selected bookings'
 
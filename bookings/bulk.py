@@ -0,0 +1,219 @@
+# bookings/bulk.py
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import serializers
+import csv
+import json
+import logging
+import time
+
+from notifications.outbox import enqueue_many
+from notifications.rendering import render_email
+from tours.availability import reserve_seats
+from tours.models import Tour
+from .models import ACTIVE_BOOKING_STATUSES, Booking, BookingStatusHistory, BookingTraveler
+from .references import next_booking_references
+from .serializers import BookingTravelerSerializer
+
+logger = logging.getLogger(__name__)
+
+MAX_BULK_BOOKINGS = 1000  # Rows accepted by one API call
+
+class BookingImportRowSerializer(serializers.Serializer):
+    """One booking of a manifest; tours are checked for the whole batch at once"""
+    tour_id = serializers.UUIDField()
+    first_name = serializers.CharField(max_length=100)
+    last_name = serializers.CharField(max_length=100)
+    email = serializers.EmailField()
+    phone = serializers.CharField(max_length=20, required=False, allow_blank=True)
+    number_of_travelers = serializers.IntegerField(min_value=1, max_value=50)
+    preferred_date = serializers.DateField(required=False, allow_null=True)
+    preferred_time = serializers.TimeField(required=False, allow_null=True)
+    availability_description = serializers.CharField(max_length=200, required=False, allow_blank=True)
+    special_requests = serializers.CharField(required=False, allow_blank=True)
+    travelers = BookingTravelerSerializer(many=True, required=False)
+
+def read_manifest(text, file_format):
+    """
+    Rows from a text stream: CSV (one booking per line, no travelers)
+    or JSON (a list of bookings, or {"bookings": [...]})
+    """
+    if file_format == 'json':
+        try:
+            data = json.load(text)
+        except ValueError:
+            raise ValueError('Invalid JSON')
+        rows = data.get('bookings') if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            raise ValueError('Expected a list of bookings')
+        return rows
+    if file_format == 'csv':
+        # Empty cells mean "not given" rather than an empty value
+        return [{key: value for key, value in row.items() if value not in ('', None)} for row in csv.DictReader(text)]
+    raise ValueError(f'Unsupported format: {file_format}')
+
+class BookingImport:
+    """
+    Create many bookings at once.
+
+    Rows are validated without queries, their tours are loaded with one IN query
+    and existing active bookings with another. Valid rows are then inserted
+    chunk by chunk (bookings, travelers and status history with bulk_create),
+    each chunk in its own transaction together with its outbox emails.
+    Bad rows are reported in `errors` and never stop the rest of the batch.
+    """
+
+    def __init__(self, rows, send_emails=True, chunk_size=500):
+        self.rows = rows
+        self.send_emails = send_emails
+        self.chunk_size = chunk_size
+        self.created = []
+        self.errors = []
+        self.stats = {}
+
+    def error(self, index, errors):
+        self.errors.append({'row': index, 'errors': errors})
+
+    def validate(self):
+        """(index, data, tour) for every row that can be booked"""
+        valid = []
+        for index, row in enumerate(self.rows):
+            serializer = BookingImportRowSerializer(data=row)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                self.error(index, serializer.errors)
+
+        tours = Tour.objects.filter(is_active=True).in_bulk({data['tour_id'] for _, data in valid})
+        active = set(Booking.objects.filter(
+            booking_status__in=ACTIVE_BOOKING_STATUSES,
+            tour_id__in=list(tours),
+            email__in={data['email'] for _, data in valid},
+        ).values_list('email', 'tour_id'))
+
+        bookable = []
+        for index, data in valid:
+            tour = tours.get(data['tour_id'])
+            if tour is None:
+                self.error(index, {'tour_id': ['Invalid tour selected.']})
+            elif data['number_of_travelers'] > tour.max_persons:
+                self.error(index, {'number_of_travelers': [f'This tour can accommodate maximum {tour.max_persons} persons.']})
+            elif data['number_of_travelers'] < tour.min_persons:
+                self.error(index, {'number_of_travelers': [f'This tour requires minimum {tour.min_persons} persons.']})
+            elif (data['email'], tour.pk) in active:
+                self.error(index, {'email': ['Already has an active booking for this tour.']})
+            else:
+                # Also catches the same person twice in one manifest
+                active.add((data['email'], tour.pk))
+                bookable.append((index, data, tour))
+        return bookable
+
+    def build(self, data, tour, reference):
+        data = dict(data)
+        travelers = data.pop('travelers', [])
+        data.pop('tour_id')
+        total = tour.price * data['number_of_travelers']
+        booking = Booking(
+            booking_reference=reference,
+            tour=tour,
+            tour_price=tour.price,
+            total_amount=total,
+            availability_description=data.pop('availability_description', '') or 'Available all week',
+            **data
+        )
+        return booking, travelers
+
+    def insert_chunk(self, chunk):
+        """Insert one chunk in a transaction; returns the bookings created and the rows refused"""
+        refused = []
+        with transaction.atomic():
+            bookings = []
+            travelers = []
+            indexes = []
+            for (index, data, tour), reference in zip(chunk, next_booking_references(len(chunk))):
+                booking, traveler_rows = self.build(data, tour, reference)
+                if booking.preferred_date:
+                    try:
+                        booking.availability_slot = reserve_seats(
+                            tour, booking.preferred_date, booking.number_of_travelers, start_time=booking.preferred_time
+                        )
+                    except ValueError as e:
+                        refused.append((index, {'preferred_date': [str(e)]}))
+                        continue
+                bookings.append(booking)
+                indexes.append(index)
+                travelers += [BookingTraveler(booking=booking, **traveler) for traveler in traveler_rows]
+
+            Booking.objects.bulk_create(bookings)
+            BookingTraveler.objects.bulk_create(travelers)
+            BookingStatusHistory.objects.bulk_create([
+                BookingStatusHistory(booking=booking, new_status='pending', reason='Booking imported')
+                for booking in bookings
+            ])
+            if self.send_emails and bookings:
+                from .views import booking_confirmation_email
+
+                enqueue_many([booking_confirmation_email(booking) for booking in bookings])
+        return list(zip(indexes, bookings)), refused
+
+    def insert(self, chunk):
+        try:
+            created, refused = self.insert_chunk(chunk)
+        except IntegrityError:
+            if len(chunk) == 1:
+                self.error(chunk[0][0], {'non_field_errors': ['Conflicts with an existing booking.']})
+                return []
+            # A concurrent booking slipped in; retry row by row to find the conflicting ones
+            return [created for row in chunk for created in self.insert([row])]
+        for index, errors in refused:
+            self.error(index, errors)
+        return created
+
+    def queue_owner_summary(self, bookings):
+        from .views import OWNER_EMAIL, booking_email_context
+
+        rendered = render_email('emails/owner_batch_notification', {
+            'bookings': [booking_email_context(booking) for booking in bookings],
+            'error_count': len(self.errors),
+            'generated_at': timezone.now().strftime('%Y-%m-%d at %H:%M'),
+        })
+        enqueue_many([{
+            'to': [OWNER_EMAIL],
+            'subject': f'{len(bookings)} Bookings Imported',
+            'html': rendered.html,
+            'text': rendered.text,
+            'kind': 'owner_batch_import',
+            'headers': {'X-Mailer': 'NATA STORIA TRAVEL Booking System'},
+        }])
+
+    def run(self):
+        started = time.perf_counter()
+        bookable = self.validate()
+        for start in range(0, len(bookable), self.chunk_size):
+            self.created += self.insert(bookable[start:start + self.chunk_size])
+
+        if self.send_emails and self.created:
+            self.queue_owner_summary([booking for _, booking in self.created])
+
+        seconds = time.perf_counter() - started
+        self.errors.sort(key=lambda error: error['row'])
+        self.stats = {
+            'rows': len(self.rows),
+            'created': len(self.created),
+            'failed': len(self.errors),
+            'seconds': round(seconds, 3),
+            'rate': round(len(self.created) / seconds, 1) if seconds else None,
+        }
+        logger.info(f"Imported {self.stats['created']} of {self.stats['rows']} bookings in {seconds:.2f}s")
+        return self.report()
+
+    def report(self):
+        return {
+            'created': [
+                {'row': index, 'booking_reference': booking.booking_reference}
+                for index, booking in sorted(self.created, key=lambda created: created[0])
+            ],
+            'errors': self.errors,
+            'stats': self.stats,
+        }
@@ -0,0 +1,81 @@
+# bookings/idempotency.py
+
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from functools import wraps
+from rest_framework import status
+from rest_framework.response import Response
+import hashlib
+import json
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+def request_fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f"{request.method} {request.path}\n{body}".encode()).hexdigest()
+
+def stored_response(user, key, fingerprint):
+    """The response saved for this key, an error response if the key was reused, or None"""
+    record = IdempotencyKey.objects.filter(user=user, key=key).first()
+    if record is None:
+        return None
+    if record.created_at < timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL):
+        record.delete()
+        return None
+    if record.fingerprint != fingerprint:
+        return Response({
+            'success': False,
+            'message': f'This {IDEMPOTENCY_HEADER} was already used for a different request',
+            'error_code': 'IDEMPOTENCY_KEY_REUSED'
+        }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    response = Response(record.response, status=record.status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+def idempotent(handler):
+    """
+    Make a view's write method honour the Idempotency-Key header.
+
+    The key is claimed in the same transaction as the write and holds the response
+    once it commits, so a retry (or a concurrent duplicate, which waits on the key's
+    unique index) gets the first response back without repeating the write or its emails.
+    Raised errors roll the claim back, so the client can retry with the same key.
+    """
+    @wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return handler(self, request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({
+                'error': f'{IDEMPOTENCY_HEADER} must be at most 255 characters'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = request_fingerprint(request)
+        replay = stored_response(request.user, key, fingerprint)
+        if replay is not None:
+            return replay
+
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(user=request.user, key=key, fingerprint=fingerprint)
+                response = handler(self, request, *args, **kwargs)
+                if response.status_code >= 500:
+                    transaction.set_rollback(True)
+                    return response
+                record.status_code = response.status_code
+                record.response = response.data
+                record.save(update_fields=['status_code', 'response'])
+        except IntegrityError:
+            # Another request with this key committed first
+            replay = stored_response(request.user, key, fingerprint)
+            if replay is None:
+                raise
+            return replay
+        return response
+    return wrapper
@@ -0,0 +1,76 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from bookings.bulk import BookingImport
+from bookings.serializers import CreateBookingSerializer
+from bookings.views import booking_confirmation_email, queue_owner_notification_email
+from notifications.outbox import enqueue_email
+from tours.models import Tour
+
+class Rollback(Exception):
+    pass
+
+class Command(BaseCommand):
+    help = 'Compare creating bookings one request at a time with the bulk import (changes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500, help='Synthetic bookings per mode')
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def synthetic_rows(self, tours, count, prefix):
+        return [{
+            'tour_id': str(tours[i % len(tours)].pk),
+            'first_name': 'Bench',
+            'last_name': f'Traveler {i}',
+            'email': f'{prefix}-{i}@benchmark.invalid',
+            'phone': '+20 100 000 0000',
+            'number_of_travelers': tours[i % len(tours)].min_persons,
+            'travelers': [{'first_name': 'Bench', 'last_name': f'Companion {i}'}],
+        } for i in range(count)]
+
+    def per_row(self, rows):
+        # What CreateBookingView does for each booking: validate, save, queue both emails
+        for row in rows:
+            serializer = CreateBookingSerializer(data=row)
+            serializer.is_valid(raise_exception=True)
+            booking = serializer.save()
+            enqueue_email(**booking_confirmation_email(booking))
+            queue_owner_notification_email(booking, 'new_booking')
+
+    def bulk(self, rows, chunk_size):
+        report = BookingImport(rows, chunk_size=chunk_size).run()
+        if report['errors']:
+            raise CommandError(f"Bulk import rejected rows: {report['errors'][:3]}")
+
+    def measure(self, func):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            try:
+                with transaction.atomic():
+                    func()
+                    raise Rollback
+            except Rollback:
+                pass
+            seconds = time.perf_counter() - start
+        return seconds, len(queries)
+
+    def handle(self, *args, **options):
+        tours = list(Tour.objects.filter(is_active=True, min_persons__lte=50)[:10])
+        if not tours:
+            raise CommandError('Needs at least one active tour')
+        count = options['rows']
+
+        results = [
+            ('one by one', *self.measure(lambda: self.per_row(self.synthetic_rows(tours, count, 'row')))),
+            ('bulk import', *self.measure(lambda: self.bulk(self.synthetic_rows(tours, count, 'bulk'), options['chunk_size']))),
+        ]
+
+        self.stdout.write(f"{'mode':<15}{'seconds':>10}{'bookings/sec':>15}{'queries':>10}")
+        for name, seconds, queries in results:
+            self.stdout.write(f"{name:<15}{seconds:>10.2f}{count / seconds:>15.1f}{queries:>10}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Bulk import is {results[0][1] / results[1][1]:.1f}x faster for {count} bookings"
+        ))
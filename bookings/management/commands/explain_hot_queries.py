@@ -0,0 +1,79 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from bookings.models import ACTIVE_BOOKING_STATUSES, Booking
+from bookings.stats import STATS_AGGREGATES
+from bookings.views import booking_list_queryset, upcoming_booking_queryset
+
+# Plan lines that read a whole table
+SEQ_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (\w+)(?! USING (?:COVERING )?INDEX)'),
+}
+INDEX_PATTERN = re.compile(
+    r'(?:Index (?:Only )?Scan (?:Backward )?using|Bitmap Index Scan on|USING (?:COVERING )?INDEX) (\w+)'
+)
+
+class Command(BaseCommand):
+    help = (
+        'Show the query plan of the hot booking lookups and flag the ones that scan a whole table. '
+        'On small tables Postgres rightly prefers sequential scans; use --no-seqscan to see which index it would use.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-seqscan', action='store_true', help='Postgres: plan with enable_seqscan off')
+        parser.add_argument('--fail', action='store_true', help='Exit with an error if any query scans a table')
+        parser.add_argument('--plans', action='store_true', help='Print the full plans')
+
+    def hot_queries(self, booking):
+        """The lookups of the booking views, with values taken from `booking`"""
+        user_bookings = Booking.objects.filter(user_id=booking.user_id)
+        return [
+            ('upcoming_bookings', upcoming_booking_queryset(booking.user)),
+            ('my bookings (UserBookingListView)', booking_list_queryset(user_bookings).order_by('-created_at', 'id')[:20]),
+            ('duplicate check by user', user_bookings.filter(
+                tour_id=booking.tour_id, booking_status__in=ACTIVE_BOOKING_STATUSES
+            )),
+            ('duplicate check by email', Booking.objects.filter(
+                email=booking.email, tour_id=booking.tour_id, booking_status__in=ACTIVE_BOOKING_STATUSES
+            )),
+            ('guest lookup', Booking.objects.filter(booking_reference=booking.booking_reference, email=booking.email)),
+            ('user stats refresh', user_bookings.values('user_id').annotate(**STATS_AGGREGATES).order_by()),
+        ]
+
+    def explain(self, queryset, no_seqscan):
+        if connection.vendor != 'postgresql':
+            return queryset.explain()
+        with transaction.atomic():
+            if no_seqscan:
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain(analyze=True)
+
+    def handle(self, *args, **options):
+        booking = Booking.objects.filter(user__isnull=False).select_related('user').order_by('-created_at').first()
+        if booking is None:
+            raise CommandError('Needs at least one booking made by a user')
+        seq_scan = SEQ_SCAN_PATTERNS.get(connection.vendor)
+        if seq_scan is None:
+            raise CommandError(f'Plans of {connection.vendor} are not supported')
+
+        flagged = []
+        for name, queryset in self.hot_queries(booking):
+            plan = self.explain(queryset, options['no_seqscan'])
+            scanned = sorted(set(seq_scan.findall(plan)))
+            indexes = sorted(set(INDEX_PATTERN.findall(plan)))
+            if scanned:
+                flagged.append(name)
+                self.stdout.write(self.style.WARNING(f"{name}: sequential scan of {', '.join(scanned)}"))
+            else:
+                self.stdout.write(f"{name}: {', '.join(indexes) or 'no index'}")
+            if options['plans']:
+                self.stdout.write(plan + '\n')
+
+        if flagged and options['fail']:
+            raise CommandError(f"{len(flagged)} queries scan a whole table: {', '.join(flagged)}")
+        if not flagged:
+            self.stdout.write(self.style.SUCCESS('No sequential scans.'))
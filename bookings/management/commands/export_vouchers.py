@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.models import Booking
+from bookings.voucher_export import EXPORT_OUTPUTS, VoucherExport, filter_voucher_bookings
+
+class Command(BaseCommand):
+    help = 'Export the vouchers of many bookings (e.g. a day of departures) as a ZIP or one merged PDF'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to write the export to')
+        parser.add_argument('--tour', help='Tour id')
+        parser.add_argument('--date-from', help='First departure date (YYYY-MM-DD)')
+        parser.add_argument('--date-to', help='Last departure date (YYYY-MM-DD)')
+        parser.add_argument('--status', help='Booking status, "all", or "active" (default: all but cancelled)')
+        parser.add_argument('--output', choices=EXPORT_OUTPUTS, default='zip')
+        parser.add_argument('--variant', choices=['admin', 'customer'], default='admin')
+        parser.add_argument('--workers', type=int, help='Render processes (default: VOUCHER_EXPORT_WORKERS)')
+
+    def handle(self, *args, **options):
+        try:
+            bookings = filter_voucher_bookings(Booking.objects.all(), options)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        export = VoucherExport(bookings, variant=options['variant'], workers=options['workers'])
+        with open(options['path'], 'wb') as f:
+            for chunk in export.stream(options['output']):
+                f.write(chunk)
+
+        stats = export.stats
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {stats['vouchers']} vouchers to {options['path']} in {stats['seconds']:.2f}s "
+            f"({stats.get('rate', 0):.1f} vouchers/sec; {stats['rendered']} rendered, "
+            f"{stats['cached']} from cache, {export.workers} workers)"
+        ))
@@ -0,0 +1,42 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.bulk import BookingImport, read_manifest
+
+class Command(BaseCommand):
+    help = 'Create bookings from a partner manifest (CSV or JSON); bad rows are reported and skipped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Manifest to import')
+        parser.add_argument('--format', choices=['csv', 'json'], help='Manifest format (default: from the file extension)')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Bookings inserted per transaction')
+        parser.add_argument('--no-emails', action='store_true', help='Do not queue confirmation or owner emails')
+        parser.add_argument('--report', help='File to write the full JSON report to')
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as f:
+                rows = read_manifest(f, file_format)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        report = BookingImport(
+            rows, send_emails=not options['no_emails'], chunk_size=options['chunk_size']
+        ).run()
+        if options['report']:
+            with open(options['report'], 'w') as f:
+                json.dump(report, f, indent=2, default=str)
+
+        for error in report['errors'][:20]:
+            self.stderr.write(f"Row {error['row']}: {json.dumps(error['errors'], default=str)}")
+        if len(report['errors']) > 20:
+            self.stderr.write(f"... and {len(report['errors']) - 20} more")
+
+        stats = report['stats']
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {stats['created']} of {stats['rows']} bookings in {stats['seconds']:.2f}s "
+            f"({stats['rate'] or 0:.1f} bookings/sec; {stats['failed']} rows failed)"
+        ))
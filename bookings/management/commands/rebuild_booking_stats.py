@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from bookings.stats import rebuild_user_stats
+
+class Command(BaseCommand):
+    help = "Recompute every user's booking statistics from their bookings in one pass"
+
+    def handle(self, *args, **options):
+        users = rebuild_user_stats()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt booking statistics for {users} users.'))
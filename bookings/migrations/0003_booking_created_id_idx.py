@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-17 19:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_remove_booking_bookings_bo_preferr_b62ce4_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['-created_at', 'id'], name='booking_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2 on 2026-10-17 19:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tours', '0009_tourdaycapacity'),
+        ('bookings', '0003_booking_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='availability_slot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bookings', to='tours.touravailability'),
+        ),
+    ]
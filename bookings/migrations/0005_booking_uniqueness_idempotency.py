@@ -0,0 +1,95 @@
+# Generated by Django 4.2 on 2026-10-17 19:32
+
+from django.conf import settings
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ['pending', 'confirmed']
+
+
+def resolve_active_duplicates(apps, schema_editor):
+    """
+    Double submits left duplicate active bookings that the new unique indexes would reject.
+    Keep the oldest of each (user, tour) and (email, tour) group and cancel the others,
+    giving their seats back and logging their references.
+    """
+    Booking = apps.get_model('bookings', 'Booking')
+    BookingStatusHistory = apps.get_model('bookings', 'BookingStatusHistory')
+    TourAvailability = apps.get_model('tours', 'TourAvailability')
+    TourDayCapacity = apps.get_model('tours', 'TourDayCapacity')
+
+    now = timezone.now()
+    released_days = set()
+    for field in ('user', 'email'):
+        active = Booking.objects.filter(booking_status__in=ACTIVE_STATUSES).exclude(**{f'{field}__isnull': True})
+        groups = active.values(field, 'tour').annotate(count=models.Count('id')).filter(count__gt=1).order_by()
+        for group in groups:
+            kept, *duplicates = active.filter(**{field: group[field], 'tour': group['tour']}).order_by('created_at', 'id')
+            for booking in duplicates:
+                if booking.availability_slot_id is not None:
+                    TourAvailability.objects.filter(pk=booking.availability_slot_id).update(
+                        available_spots=models.F('available_spots') + booking.number_of_travelers
+                    )
+                    slot = TourAvailability.objects.get(pk=booking.availability_slot_id)
+                    released_days.add((slot.tour_id, slot.date))
+                BookingStatusHistory.objects.create(
+                    booking=booking, old_status=booking.booking_status, new_status='cancelled',
+                    reason=f'Duplicate of {kept.booking_reference}',
+                )
+                Booking.objects.filter(pk=booking.pk).update(
+                    booking_status='cancelled', cancellation_date=now, availability_slot=None
+                )
+                logger.warning(f"Cancelled duplicate booking {booking.booking_reference} (kept {kept.booking_reference})")
+
+    for tour_id, date in released_days:
+        totals = TourAvailability.objects.filter(tour_id=tour_id, date=date, is_active=True).aggregate(
+            seats_left=models.Sum('available_spots'), largest_party=models.Max('available_spots'),
+            slot_count=models.Count('id'),
+        )
+        if totals['slot_count']:
+            TourDayCapacity.objects.update_or_create(tour_id=tour_id, date=date, defaults=totals)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bookings', '0004_booking_availability_slot'),
+    ]
+
+    operations = [
+        migrations.RunPython(resolve_active_duplicates, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('status_code', models.PositiveSmallIntegerField(null=True)),
+                ('response', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.UniqueConstraint(condition=models.Q(('booking_status__in', ['pending', 'confirmed'])), fields=('user', 'tour'), name='booking_active_user_tour_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.UniqueConstraint(condition=models.Q(('booking_status__in', ['pending', 'confirmed'])), fields=('email', 'tour'), name='booking_active_email_tour_uniq'),
+        ),
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='idempotency_keys', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='idempotencykey',
+            constraint=models.UniqueConstraint(fields=('user', 'key'), name='idempotency_user_key_uniq'),
+        ),
+    ]
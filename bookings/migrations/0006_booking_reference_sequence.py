@@ -0,0 +1,40 @@
+# Generated by Django 4.2 on 2026-10-17 19:34
+
+from django.db import migrations, models
+
+# Values at the time of this migration (bookings/references.py)
+SEQUENCE_NAME = 'bookings_reference_seq'
+FIRST_VALUE = 32 ** 8
+BLOCK_SIZE = 20
+
+
+def create_reference_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return  # Other databases use the BookingReferenceCounter row
+    schema_editor.execute(
+        f'CREATE SEQUENCE IF NOT EXISTS {SEQUENCE_NAME} START WITH {FIRST_VALUE} INCREMENT BY {BLOCK_SIZE}'
+    )
+
+
+def drop_reference_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP SEQUENCE IF EXISTS {SEQUENCE_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_booking_uniqueness_idempotency'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingReferenceCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('next_value', models.BigIntegerField()),
+            ],
+        ),
+        migrations.RunPython(create_reference_sequence, drop_reference_sequence),
+    ]
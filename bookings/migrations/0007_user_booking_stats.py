@@ -0,0 +1,59 @@
+# Generated by Django 4.2 on 2026-10-17 19:40
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def backfill_user_stats(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    UserBookingStats = apps.get_model('bookings', 'UserBookingStats')
+
+    upcoming = {}
+    dates = Booking.objects.filter(
+        user__isnull=False, booking_status__in=['pending', 'confirmed'], preferred_date__gte=timezone.localdate()
+    ).order_by('preferred_date').values_list('user_id', 'preferred_date')
+    for user_id, date in dates.iterator(chunk_size=2000):
+        upcoming.setdefault(user_id, []).append(date.isoformat())
+
+    rows = Booking.objects.filter(user__isnull=False).values('user_id').annotate(
+        total_bookings=Count('id'),
+        pending_bookings=Count('id', filter=Q(booking_status='pending')),
+        confirmed_bookings=Count('id', filter=Q(booking_status='confirmed')),
+        completed_bookings=Count('id', filter=Q(booking_status='completed')),
+        cancelled_bookings=Count('id', filter=Q(booking_status='cancelled')),
+        total_spent=Coalesce(Sum('total_amount', filter=Q(payment_status='paid')), Value(0), output_field=DecimalField()),
+    ).order_by()
+    UserBookingStats.objects.bulk_create(
+        [UserBookingStats(upcoming_dates=upcoming.get(row['user_id'], []), **row) for row in rows.iterator(chunk_size=2000)],
+        batch_size=2000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('bookings', '0006_booking_reference_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserBookingStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='booking_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_bookings', models.PositiveIntegerField(default=0)),
+                ('pending_bookings', models.PositiveIntegerField(default=0)),
+                ('confirmed_bookings', models.PositiveIntegerField(default=0)),
+                ('completed_bookings', models.PositiveIntegerField(default=0)),
+                ('cancelled_bookings', models.PositiveIntegerField(default=0)),
+                ('total_spent', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('upcoming_dates', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_user_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2 on 2026-10-17 19:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0007_user_booking_stats'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='bookings_bo_booking_8a7545_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='bookings_bo_user_id_0e7f91_idx',
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', '-created_at', 'id'], name='booking_user_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('booking_status__in', ['pending', 'confirmed'])), fields=['user', 'preferred_date'], name='booking_user_upcoming_idx'),
+        ),
+    ]
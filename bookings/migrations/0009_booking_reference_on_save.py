@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-17 20:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0008_booking_access_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='booking',
+            name='booking_reference',
+            field=models.CharField(blank=True, max_length=20, unique=True),
+        ),
+    ]
@@ -3,21 +3,40 @@
 # bookings/models.py
 
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from tours.models import Tour
 import uuid
-import string
-import random
+
+from .references import next_booking_reference
 
 User = get_user_model()
 
+# Statuses that hold a place on a tour; at most one such booking per user and per email
+ACTIVE_BOOKING_STATUSES = ['pending', 'confirmed']
+
+class DaysUntil(models.Func):
+    """Whole days from `today` to a date column, in SQL (the database side of Booking.days_until_tour)"""
+    output_field = models.IntegerField()
+
+    def __init__(self, expression, today, **extra):
+        super().__init__(expression, models.Value(today, output_field=models.DateField()), **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, template='(%(expressions)s)', arg_joiner=' - ', **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection, template='CAST(julianday(%(expressions)s) AS INTEGER)', arg_joiner=') - julianday(',
+            **extra_context
+        )
+
 def generate_booking_reference():
-    """Generate a unique booking reference"""
-    letters = string.ascii_uppercase
-    numbers = string.digits
-    return ''.join(random.choices(letters, k=3)) + ''.join(random.choices(numbers, k=6))
+    """Generate a unique booking reference (sequence-backed, see bookings/references.py)"""
+    # No longer the field default (kept for migration 0001); Booking.save() allocates on first save
+    return next_booking_reference()
 
 class Booking(models.Model):
     """
@@ -41,10 +60,11 @@ class Booking(models.Model):
 
     # Primary identifiers
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # Allocated on first save, so unsaved instances (e.g. the admin add form) don't use up references
     booking_reference = models.CharField(
         max_length=20, 
         unique=True, 
-        default=generate_booking_reference
+        blank=True
     )
 
     # Customer information (for guest bookings)
@@ -69,6 +89,14 @@ class Booking(models.Model):
     )
     
     preferred_time = models.TimeField(null=True, blank=True)
+    # Slot holding this booking's seats; cleared when the seats are released
+    availability_slot = models.ForeignKey(
+        'tours.TourAvailability',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='bookings'
+    )
     special_requests = models.TextField(blank=True)
 
     # Pricing information
@@ -119,14 +147,38 @@ class Booking(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        # booking_reference (unique) and user (foreign key) get their own indexes;
+        # the guest lookup by (booking_reference, email) is served by the unique one,
+        # the duplicate checks by (user|email, tour, active) by the constraints below.
+        # `manage.py explain_hot_queries` shows the plan of each of these lookups.
         indexes = [
-            models.Index(fields=['booking_reference']),
             models.Index(fields=['email']),
-            models.Index(fields=['user']),
             models.Index(fields=['booking_status']),
             models.Index(fields=['payment_status']),
+            # Admin booking feed pages on (-created_at, id)
+            models.Index(fields=['-created_at', 'id'], name='booking_created_id_idx'),
+            # My bookings, newest first (keyset pages on -created_at, id), and the per-user stats refresh
+            models.Index(fields=['user', '-created_at', 'id'], name='booking_user_created_id_idx'),
+            # Upcoming bookings of a user: only active ones, by date
+            models.Index(
+                fields=['user', 'preferred_date'],
+                condition=models.Q(booking_status__in=ACTIVE_BOOKING_STATUSES),
+                name='booking_user_upcoming_idx',
+            ),
             # REMOVED: Index on preferred_date since it's now optional
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'tour'],
+                condition=models.Q(booking_status__in=ACTIVE_BOOKING_STATUSES),
+                name='booking_active_user_tour_uniq',
+            ),
+            models.UniqueConstraint(
+                fields=['email', 'tour'],
+                condition=models.Q(booking_status__in=ACTIVE_BOOKING_STATUSES),
+                name='booking_active_email_tour_uniq',
+            ),
+        ]
 
     def __str__(self):
         return f"Booking {self.booking_reference} - {self.full_name} - {self.tour.title}"
@@ -162,6 +214,9 @@ class Booking(models.Model):
         return None
 
     def save(self, *args, **kwargs):
+        if self._state.adding and not self.booking_reference:
+            self.booking_reference = next_booking_reference()
+
         # Calculate total amount if not set
         if not self.total_amount:
             self.total_amount = (self.tour_price * self.number_of_travelers) - self.discount_amount + self.tax_amount
@@ -273,4 +328,48 @@ class BookingPayment(models.Model):
         ordering = ['-created_at']
 
     def __str__(self):
-        return f"{self.payment_type.title()} - {self.booking.booking_reference} - ${self.amount}"
\ No newline at end of file
+        return f"{self.payment_type.title()} - {self.booking.booking_reference} - ${self.amount}"
+
+class BookingReferenceCounter(models.Model):
+    """Next booking reference number where there is no Postgres sequence (development)"""
+    next_value = models.BigIntegerField()
+
+class IdempotencyKey(models.Model):
+    """
+    Response stored for a client-supplied Idempotency-Key, so retries of the
+    same request replay it instead of running the write again
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)  # Hash of the request the key was first used for
+    # Filled in by the same transaction that claimed the key
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(encoder=DjangoJSONEncoder, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_user_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.status_code})"
+
+class UserBookingStats(models.Model):
+    """
+    A user's booking counts, kept up to date whenever one of their bookings
+    changes (see bookings/stats.py), so the dashboard reads one row
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='booking_stats')
+    total_bookings = models.PositiveIntegerField(default=0)
+    pending_bookings = models.PositiveIntegerField(default=0)
+    confirmed_bookings = models.PositiveIntegerField(default=0)
+    completed_bookings = models.PositiveIntegerField(default=0)
+    cancelled_bookings = models.PositiveIntegerField(default=0)
+    total_spent = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Dates of active bookings still ahead when last refreshed; readers drop the ones that have passed
+    upcoming_dates = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user} - {self.total_bookings} bookings"
@@ -0,0 +1,116 @@
+# bookings/references.py
+
+from django.db import connection, transaction
+from django.db.models import F
+import os
+import re
+import threading
+
+# Crockford base32: no I, L, O or U, so references survive being read aloud or retyped
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+ALIASES = str.maketrans({'O': '0', 'I': '1', 'L': '1'})
+PAYLOAD_LENGTH = 9  # 32**9 references; the tenth character is a check symbol
+FIRST_VALUE = 32 ** 8  # Start with a non-zero leading symbol
+BLOCK_SIZE = 20  # Values each process takes from the sequence at a time
+SEQUENCE_NAME = 'bookings_reference_seq'
+
+REFERENCE_PATTERN = re.compile(f'^[{ALPHABET}]{{{PAYLOAD_LENGTH + 1}}}$')
+LEGACY_PATTERN = re.compile(r'^[A-Z]{3}\d{6}$')  # References issued before this scheme
+
+def check_symbol(payload):
+    """Luhn mod 32 check symbol: catches any single wrong symbol and most swapped neighbours"""
+    total = 0
+    factor = 2
+    for char in reversed(payload):
+        addend = factor * ALPHABET.index(char)
+        total += addend // 32 + addend % 32
+        factor = 1 if factor == 2 else 2
+    return ALPHABET[-total % 32]
+
+def encode_reference(value):
+    """Fixed-width base32 of `value` plus its check symbol; sorts in the same order as `value`"""
+    payload = ''
+    for _ in range(PAYLOAD_LENGTH):
+        value, digit = divmod(value, 32)
+        payload = ALPHABET[digit] + payload
+    if value:
+        raise ValueError('Booking reference space exhausted')
+    return payload + check_symbol(payload)
+
+def normalize_reference(text):
+    """Uppercase and strip separators; new-style references also accept Crockford's look-alikes"""
+    reference = re.sub(r'[\s-]', '', text or '').upper()
+    if len(reference) == PAYLOAD_LENGTH + 1:
+        reference = reference.translate(ALIASES)
+    return reference
+
+def is_valid_reference(reference):
+    """Check a normalized reference without touching the database"""
+    if LEGACY_PATTERN.match(reference):
+        return True
+    return bool(REFERENCE_PATTERN.match(reference)) and check_symbol(reference[:-1]) == reference[-1]
+
+class ReferenceAllocator:
+    """
+    Hands out increasing reference numbers from blocks of BLOCK_SIZE.
+
+    On Postgres a block is one nextval() on a sequence that steps by BLOCK_SIZE;
+    sequences never roll back, so a block is never handed out twice. Each process
+    then issues its block in order, which keeps index inserts near the right edge.
+    Elsewhere (SQLite in development) numbers come one at a time from a counter row
+    updated inside the caller's transaction.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = None
+        self.next_value = self.end = 0
+
+    def allocate(self):
+        return self.allocate_many(1)[0]
+
+    def allocate_many(self, count):
+        """`count` increasing reference numbers"""
+        if connection.vendor != 'postgresql':
+            return self.allocate_from_counter(count)
+        with self.lock:
+            if self.pid != os.getpid():
+                # A forked worker must not reuse its parent's block
+                self.pid = os.getpid()
+                self.next_value = self.end = 0
+
+            values = list(range(self.next_value, min(self.end, self.next_value + count)))
+            self.next_value += len(values)
+            missing = count - len(values)
+            if missing:
+                # Whole new blocks in one round trip
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'SELECT nextval(%s) FROM generate_series(1, %s)',
+                        [SEQUENCE_NAME, -(-missing // BLOCK_SIZE)]
+                    )
+                    starts = sorted(row[0] for row in cursor.fetchall())
+                for start in starts:
+                    self.next_value, self.end = start, start + BLOCK_SIZE
+                    taken = list(range(start, min(self.end, start + missing)))
+                    values += taken
+                    self.next_value += len(taken)
+                    missing -= len(taken)
+            return values
+
+    def allocate_from_counter(self, count):
+        from .models import BookingReferenceCounter
+
+        with transaction.atomic():
+            counter, _ = BookingReferenceCounter.objects.get_or_create(pk=1, defaults={'next_value': FIRST_VALUE})
+            BookingReferenceCounter.objects.filter(pk=counter.pk).update(next_value=F('next_value') + count)
+            counter.refresh_from_db()
+            return list(range(counter.next_value - count, counter.next_value))
+
+allocator = ReferenceAllocator()
+
+def next_booking_reference():
+    return encode_reference(allocator.allocate())
+
+def next_booking_references(count):
+    return [encode_reference(value) for value in allocator.allocate_many(count)]
@@ -234,8 +234,13 @@
 
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils.functional import cached_property
 from .models import Booking, BookingTraveler, BookingStatusHistory, BookingCancellation, BookingPayment
-from tours.models import Tour
+from .references import is_valid_reference, normalize_reference
+from tours.availability import release_seats, reserve_seats
+from tours.identity import tour_identity_map
+from tours.media import MediaURLField
 
 User = get_user_model()
 
@@ -282,15 +287,18 @@ class BookingCancellationSerializer(serializers.ModelSerializer):
 class BookingListSerializer(serializers.ModelSerializer):
     """
     Serializer for booking list (minimal information)
+
+    Reads `list_days_until_tour` and `list_can_be_cancelled` when the queryset
+    was prepared with `booking_list_queryset`, the model properties otherwise.
     """
     tour_title = serializers.CharField(source='tour.title', read_only=True)
-    tour_cover_photo = serializers.ImageField(source='tour.cover_photo', read_only=True)
+    tour_cover_photo = MediaURLField(source='tour.cover_photo')
     tour_location = serializers.CharField(source='tour.location', read_only=True)
     full_name = serializers.ReadOnlyField()
     booking_status_display = serializers.CharField(source='get_booking_status_display', read_only=True)
     payment_status_display = serializers.CharField(source='get_payment_status_display', read_only=True)
-    days_until_tour = serializers.ReadOnlyField()
-    can_be_cancelled = serializers.ReadOnlyField()
+    days_until_tour = serializers.SerializerMethodField()
+    can_be_cancelled = serializers.SerializerMethodField()
 
     class Meta:
         model = Booking
@@ -303,12 +311,18 @@ class BookingListSerializer(serializers.ModelSerializer):
             'preferred_date'
         ]
 
+    def get_days_until_tour(self, obj):
+        return obj.list_days_until_tour if hasattr(obj, 'list_days_until_tour') else obj.days_until_tour
+
+    def get_can_be_cancelled(self, obj):
+        return obj.list_can_be_cancelled if hasattr(obj, 'list_can_be_cancelled') else obj.can_be_cancelled
+
 class BookingDetailSerializer(serializers.ModelSerializer):
     """
     Serializer for detailed booking information
     """
     tour_title = serializers.CharField(source='tour.title', read_only=True)
-    tour_cover_photo = serializers.ImageField(source='tour.cover_photo', read_only=True)
+    tour_cover_photo = MediaURLField(source='tour.cover_photo')
     tour_location = serializers.CharField(source='tour.location', read_only=True)
     tour_duration = serializers.CharField(source='tour.duration', read_only=True)
     tour_id = serializers.CharField(source='tour.id', write_only=True)
@@ -349,12 +363,15 @@ class CreateBookingSerializer(serializers.ModelSerializer):
             'preferred_date'
         ]
 
+    @cached_property
+    def tours(self):
+        """Tours already loaded for this request (see tours.identity)"""
+        return tour_identity_map(self.context.get('request'))
+
     def validate_tour_id(self, value):
-        try:
-            tour = Tour.objects.get(id=value, is_active=True)
-            return value
-        except Tour.DoesNotExist:
+        if self.tours.get(value) is None:
             raise serializers.ValidationError("Invalid tour selected.")
+        return value
 
     def validate_number_of_travelers(self, value):
         if value < 1:
@@ -367,21 +384,21 @@ class CreateBookingSerializer(serializers.ModelSerializer):
         
         # Get the tour object for validation
         if tour_id:
-            try:
-                tour = Tour.objects.get(id=tour_id, is_active=True)
-                # Check if tour can accommodate the number of travelers
-                if number_of_travelers > tour.max_persons:
-                    raise serializers.ValidationError(
-                        f"This tour can accommodate maximum {tour.max_persons} persons."
-                    )
-                
-                # Check if number of travelers meets minimum requirement
-                if number_of_travelers < tour.min_persons:
-                    raise serializers.ValidationError(
-                        f"This tour requires minimum {tour.min_persons} persons."
-                    )
-            except Tour.DoesNotExist:
+            tour = self.tours.get(tour_id)
+            if tour is None:
                 raise serializers.ValidationError("Invalid tour selected.")
+
+            # Check if tour can accommodate the number of travelers
+            if number_of_travelers > tour.max_persons:
+                raise serializers.ValidationError(
+                    f"This tour can accommodate maximum {tour.max_persons} persons."
+                )
+            
+            # Check if number of travelers meets minimum requirement
+            if number_of_travelers < tour.min_persons:
+                raise serializers.ValidationError(
+                    f"This tour requires minimum {tour.min_persons} persons."
+                )
         
         return attrs
 
@@ -389,8 +406,8 @@ class CreateBookingSerializer(serializers.ModelSerializer):
         travelers_data = validated_data.pop('travelers', [])
         tour_id = validated_data.pop('tour_id')
         
-        # Get the tour object
-        tour = Tour.objects.get(id=tour_id)
+        # Get the tour object (validation already loaded it)
+        tour = self.tours.get(tour_id)
         
         # Set tour-related fields
         validated_data['tour'] = tour
@@ -406,6 +423,18 @@ class CreateBookingSerializer(serializers.ModelSerializer):
         if request and request.user.is_authenticated:
             validated_data['user'] = request.user
 
+        # Hold the seats; the caller's transaction gives them back if the booking fails
+        if validated_data.get('preferred_date'):
+            try:
+                validated_data['availability_slot'] = reserve_seats(
+                    tour,
+                    validated_data['preferred_date'],
+                    validated_data['number_of_travelers'],
+                    start_time=validated_data.get('preferred_time'),
+                )
+            except ValueError as e:
+                raise serializers.ValidationError({'preferred_date': str(e)})
+
         # Create booking
         booking = Booking.objects.create(**validated_data)
         
@@ -435,6 +464,9 @@ class UpdateBookingSerializer(serializers.ModelSerializer):
             'preferred_date'
         ]
 
+    # Changing any of these moves the booking's seats to another slot
+    SEAT_FIELDS = ('preferred_date', 'preferred_time', 'number_of_travelers')
+
     def validate_preferred_date(self, value):
         # Only validate if preferred_date is provided
         if value:
@@ -443,6 +475,35 @@ class UpdateBookingSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError("Preferred date must be in the future.")
         return value
 
+    def update(self, instance, validated_data):
+        if all(validated_data.get(name, getattr(instance, name)) == getattr(instance, name) for name in self.SEAT_FIELDS):
+            return super().update(instance, validated_data)
+
+        with transaction.atomic():
+            # The locked row says which slot holds the seats now, whatever this instance last saw
+            held = Booking.objects.select_for_update().filter(pk=instance.pk).values(
+                'availability_slot_id', 'number_of_travelers'
+            ).first()
+            if held and held['availability_slot_id']:
+                release_seats(held['availability_slot_id'], held['number_of_travelers'])
+
+            for name, value in validated_data.items():
+                setattr(instance, name, value)
+            instance.availability_slot = None
+            if instance.preferred_date:
+                try:
+                    instance.availability_slot = reserve_seats(
+                        instance.tour,
+                        instance.preferred_date,
+                        instance.number_of_travelers,
+                        start_time=instance.preferred_time,
+                    )
+                except ValueError as e:
+                    # Rolls back the release too, so the booking keeps its old seats
+                    raise serializers.ValidationError({'preferred_date': str(e)})
+            instance.save()
+        return instance
+
 class CancelBookingSerializer(serializers.Serializer):
     """
     Serializer for booking cancellation
@@ -457,6 +518,13 @@ class GuestBookingLookupSerializer(serializers.Serializer):
     booking_reference = serializers.CharField(max_length=20)
     email = serializers.EmailField()
 
+    def validate_booking_reference(self, value):
+        # The check symbol rejects mistyped references before any query
+        reference = normalize_reference(value)
+        if not is_valid_reference(reference):
+            raise serializers.ValidationError("This is not a valid booking reference.")
+        return reference
+
     def validate(self, attrs):
         booking_reference = attrs.get('booking_reference')
         email = attrs.get('email')
@@ -0,0 +1,67 @@
+# bookings/signals.py
+
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from tours.availability import release_seats
+from .models import Booking
+from .stats import apply_stats_change, refresh_user_stats, stats_state
+from .vouchers import schedule_voucher_render
+
+@receiver(post_save, sender=Booking)
+def prerender_booking_vouchers(sender, instance, raw=False, **kwargs):
+    """Vouchers are cached by content, so any change to a booking gets freshly rendered ones"""
+    if raw or instance.booking_status == 'cancelled':
+        return
+    schedule_voucher_render(instance)
+
+@receiver(post_save, sender=Booking)
+def release_cancelled_booking_seats(sender, instance, raw=False, **kwargs):
+    if raw or instance.booking_status != 'cancelled' or instance.availability_slot_id is None:
+        return
+    # Clearing the slot first makes the release happen once, even for concurrent saves
+    released = Booking.objects.filter(pk=instance.pk, availability_slot_id=instance.availability_slot_id).update(
+        availability_slot=None
+    )
+    if released:
+        release_seats(instance.availability_slot_id, instance.number_of_travelers)
+        instance.availability_slot = None
+
+@receiver(post_delete, sender=Booking)
+def release_deleted_booking_seats(sender, instance, **kwargs):
+    # Cancelled bookings have already given their seats back and cleared the slot
+    if instance.availability_slot_id is not None:
+        release_seats(instance.availability_slot_id, instance.number_of_travelers)
+
+@receiver(post_init, sender=Booking)
+def remember_booking_stats_state(sender, instance, **kwargs):
+    # What the booking counts for now, so the next save or delete can apply the difference
+    instance._stats_state = stats_state(instance)
+
+def refresh_booking_user_stats(instance):
+    # Saved or deleted from a partially loaded instance: recount the user instead
+    user_id = instance.__dict__.get('user_id', ...)
+    if user_id is ...:
+        user_id = Booking.objects.filter(pk=instance.pk).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        refresh_user_stats(user_id)
+
+@receiver(post_save, sender=Booking)
+def update_booking_stats(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    before = None if created else instance._stats_state
+    after = stats_state(instance)
+    if after is None or (before is None and not created):
+        refresh_booking_user_stats(instance)
+    else:
+        apply_stats_change(before, after)
+    instance._stats_state = after
+
+@receiver(post_delete, sender=Booking)
+def remove_booking_stats(sender, instance, **kwargs):
+    before = instance._stats_state or stats_state(instance)
+    if before is not None:
+        apply_stats_change(before, None)
+    else:
+        refresh_booking_user_stats(instance)
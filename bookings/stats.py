@@ -0,0 +1,150 @@
+# bookings/stats.py
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, Exists, F, OuterRef, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import ACTIVE_BOOKING_STATUSES, Booking, UserBookingStats
+
+COUNTERS = ('total_bookings', 'confirmed_bookings', 'completed_bookings', 'cancelled_bookings', 'pending_bookings')
+
+# One conditional aggregation instead of a query per figure
+STATS_AGGREGATES = {
+    'total_bookings': Count('id'),
+    'pending_bookings': Count('id', filter=Q(booking_status='pending')),
+    'confirmed_bookings': Count('id', filter=Q(booking_status='confirmed')),
+    'completed_bookings': Count('id', filter=Q(booking_status='completed')),
+    'cancelled_bookings': Count('id', filter=Q(booking_status='cancelled')),
+    'total_spent': Coalesce(
+        Sum('total_amount', filter=Q(payment_status='paid')), Value(0), output_field=DecimalField()
+    ),
+}
+
+def upcoming_bookings_filter(today=None):
+    return Q(booking_status__in=ACTIVE_BOOKING_STATUSES, preferred_date__gte=today or timezone.localdate())
+
+def save_stats(rows):
+    """Insert or overwrite stats rows in one statement"""
+    UserBookingStats.objects.bulk_create(
+        rows,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=[*COUNTERS, 'total_spent', 'upcoming_dates', 'updated_at'],
+    )
+
+def refresh_user_stats(user_id):
+    """Recompute one user's row from their bookings"""
+    bookings = Booking.objects.filter(user_id=user_id)
+    totals = bookings.aggregate(**STATS_AGGREGATES)
+    if not totals['total_bookings']:
+        UserBookingStats.objects.filter(user_id=user_id).delete()
+        return
+    dates = bookings.filter(upcoming_bookings_filter()).order_by('preferred_date').values_list('preferred_date', flat=True)
+    save_stats([UserBookingStats(
+        user_id=user_id,
+        upcoming_dates=[date.isoformat() for date in dates],
+        updated_at=timezone.now(),
+        **totals
+    )])
+
+# Booking fields that decide what a booking counts for in its user's row
+STATS_FIELDS = ('user_id', 'booking_status', 'payment_status', 'total_amount', 'preferred_date')
+
+def stats_state(booking):
+    """The stats fields of a booking as loaded or last saved, or None if some were deferred"""
+    values = booking.__dict__
+    if any(name not in values for name in STATS_FIELDS):
+        return None
+    return tuple(values[name] for name in STATS_FIELDS)
+
+def stats_figures(state):
+    """(counter values, upcoming date or None) that a booking in `state` adds to its user's row"""
+    _, booking_status, payment_status, total_amount, preferred_date = state
+    # Values assigned by code may not have been converted yet (e.g. a date string)
+    total_amount = Booking._meta.get_field('total_amount').to_python(total_amount)
+    preferred_date = Booking._meta.get_field('preferred_date').to_python(preferred_date)
+    figures = {'total_bookings': 1}
+    if f'{booking_status}_bookings' in COUNTERS:
+        figures[f'{booking_status}_bookings'] = 1
+    if payment_status == 'paid':
+        figures['total_spent'] = total_amount or 0
+    upcoming = None
+    if booking_status in ACTIVE_BOOKING_STATUSES and preferred_date and preferred_date >= timezone.localdate():
+        upcoming = preferred_date.isoformat()
+    return figures, upcoming
+
+def adjust_user_stats(user_id, deltas, removed_dates, added_dates):
+    """
+    Shift an existing row by `deltas` with F() expressions. Returns False when the user has no row.
+    Only a change of upcoming dates reads the row (locked) to edit the list.
+    """
+    rows = UserBookingStats.objects.filter(user_id=user_id)
+    # Never below zero, even if a change slipped past the signals (a queryset update; rebuild_user_stats repairs those)
+    updates = {name: Greatest(F(name) + delta, 0) for name, delta in deltas.items()}
+    if removed_dates or added_dates:
+        row = rows.select_for_update().only('upcoming_dates').first()
+        if row is None:
+            return False
+        dates = list(row.upcoming_dates)
+        for date in removed_dates:
+            if date in dates:
+                dates.remove(date)
+        updates['upcoming_dates'] = sorted(dates + added_dates)
+    return rows.update(updated_at=timezone.now(), **updates) > 0
+
+def apply_stats_change(before, after):
+    """
+    Move the stats rows by what a booking change is worth: `before` and `after` are
+    stats states (None when the booking did not exist, or no longer does).
+    Runs in the booking's transaction, so a rollback undoes it too. Users without
+    a row yet, and changes whose earlier state is unknown, get a full refresh instead.
+    """
+    changes = {}
+    for state, sign in ((before, -1), (after, 1)):
+        if state is None or state[0] is None:
+            continue
+        figures, upcoming = stats_figures(state)
+        deltas, removed_dates, added_dates = changes.setdefault(state[0], ({}, [], []))
+        for name, value in figures.items():
+            deltas[name] = deltas.get(name, 0) + sign * value
+        if upcoming:
+            (added_dates if sign > 0 else removed_dates).append(upcoming)
+
+    for user_id, (deltas, removed_dates, added_dates) in changes.items():
+        deltas = {name: delta for name, delta in deltas.items() if delta}
+        if sorted(removed_dates) == sorted(added_dates):
+            removed_dates = added_dates = []
+        if not (deltas or removed_dates or added_dates):
+            continue
+        if not adjust_user_stats(user_id, deltas, removed_dates, added_dates):
+            refresh_user_stats(user_id)
+
+def rebuild_user_stats():
+    """Recompute every user's row in one pass over the bookings; returns the number of users"""
+    totals = Booking.objects.filter(user__isnull=False).values('user_id').annotate(**STATS_AGGREGATES).order_by()
+    upcoming = {}
+    dates = Booking.objects.filter(upcoming_bookings_filter(), user__isnull=False).order_by('preferred_date')
+    for user_id, date in dates.values_list('user_id', 'preferred_date').iterator(chunk_size=2000):
+        upcoming.setdefault(user_id, []).append(date.isoformat())
+
+    now = timezone.now()
+    rows = [
+        UserBookingStats(upcoming_dates=upcoming.get(row['user_id'], []), updated_at=now, **row)
+        for row in totals.iterator(chunk_size=2000)
+    ]
+    with transaction.atomic():
+        # Users whose bookings have all been deleted
+        UserBookingStats.objects.filter(~Exists(Booking.objects.filter(user_id=OuterRef('user_id')))).delete()
+        save_stats(rows)
+    return len(rows)
+
+def user_stats(user):
+    """The dashboard figures of `user`, read from their stats row"""
+    row = UserBookingStats.objects.filter(user=user).first()
+    today = timezone.localdate().isoformat()
+    stats = {field: getattr(row, field, 0) for field in COUNTERS}
+    stats['total_spent'] = float(row.total_spent) if row else 0.0
+    stats['upcoming_tours'] = sum(date >= today for date in row.upcoming_dates) if row else 0
+    return stats
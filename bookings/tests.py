@@ -1,3 +1,638 @@
-from django.test import TestCase
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+import io
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import uuid
+import zipfile
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from pypdf import PdfReader
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from notifications.models import OutboundEmail
+from tour_backend.middleware import QueryBudgetExceeded
+from tours.models import Tour, TourAvailability, TourCategory, TourDayCapacity
+from . import vouchers
+from .models import Booking, UserBookingStats
+from .references import (
+    ALPHABET, FIRST_VALUE, check_symbol, encode_reference, is_valid_reference, normalize_reference
+)
+from .serializers import GuestBookingLookupSerializer
+from .stats import COUNTERS, rebuild_user_stats
+
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+@override_settings(CACHES=LOCAL_CACHE, ALLOWED_HOSTS=['*'], VOUCHER_PRERENDER=False, QUERY_BUDGET_STRICT=True)
+class CreateBookingQueryTests(TestCase):
+    """Creating a booking must stay within its query budget and read its tour once"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='alice@gmail.com', username='alice', password='pw12345!x', first_name='Alice', last_name='Smith'
+        )
+        category = TourCategory.objects.create(name='Culture')
+        cls.tour = Tour.objects.create(
+            title='Pyramids of Giza', description='Great pyramids tour', short_description='Pyramids',
+            location='Giza', price=Decimal('100.00'), duration='3 hours', max_persons=10,
+            category=category, cover_photo='tour_images/a.jpg', includes='Guide',
+        )
+        cls.day = timezone.localdate() + timedelta(days=10)
+        TourAvailability.objects.create(
+            tour=cls.tour, user=cls.user, date=cls.day, start_time=time(9), end_time=time(12), available_spots=4
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_booking(self, **extra):
+        return self.client.post('/api/bookings/create/', {
+            'tour_id': str(self.tour.id),
+            'first_name': 'Alice',
+            'last_name': 'Smith',
+            'email': 'alice@gmail.com',
+            'number_of_travelers': 2,
+            'travelers': [{'first_name': 'Bob', 'last_name': 'Smith'}],
+            **extra,
+        }, format='json')
+
+    def create_counting_queries(self, **extra):
+        # The transaction.on_commit work (caches, voucher renders) runs after the view in production
+        # but still belongs to the request, so it is counted against the budget too
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.create_booking(**extra)
+        return response, queries
+
+    def tour_queries(self, queries):
+        return [query for query in queries if query['sql'].startswith('SELECT') and 'FROM "tours_tour"' in query['sql']]
+
+    def test_create_reads_tour_once(self):
+        # Fails with QueryBudgetExceeded if the create path grows past QUERY_BUDGETS
+        response, queries = self.create_counting_queries()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(self.tour_queries(queries)), 1)
+        self.assertLessEqual(len(queries), settings.QUERY_BUDGETS['create_booking'])
+
+    def test_create_reserving_a_slot_stays_within_budget(self):
+        response, queries = self.create_counting_queries(preferred_date=str(self.day))
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNotNone(Booking.objects.get(user=self.user).availability_slot_id)
+        self.assertLessEqual(len(queries), settings.QUERY_BUDGETS['create_booking'])
+
+    def test_duplicate_reads_tour_once(self):
+        self.create_booking()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.create_booking()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['existing_booking']['tour_title'], self.tour.title)
+        self.assertEqual(len(self.tour_queries(queries)), 1)
+
+    def test_over_budget_fails(self):
+        with override_settings(QUERY_BUDGETS={'create_booking': 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.create_booking()
+
+@override_settings(ALLOWED_HOSTS=['*'], VOUCHER_PRERENDER=False)
+class IdempotentCreateTests(TestCase):
+    """A retried create replays its first response; only one booking and one set of emails exist"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='alice@gmail.com', username='alice', password='pw12345!x', first_name='Alice', last_name='Smith'
+        )
+        cls.tour = make_tour()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_booking(self, key=None, **extra):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        return self.client.post('/api/bookings/create/', {
+            'tour_id': str(self.tour.id), 'first_name': 'Alice', 'last_name': 'Smith',
+            'email': 'alice@gmail.com', 'number_of_travelers': 2, **extra,
+        }, format='json', **headers)
+
+    def test_retry_replays_the_stored_response(self):
+        first = self.create_booking(key='checkout-1')
+        self.assertEqual(first.status_code, 201)
+        emails = OutboundEmail.objects.count()
+        self.assertTrue(emails)
+
+        replay = self.create_booking(key='checkout-1')
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(replay.json()['booking']['booking_reference'], first.data['booking']['booking_reference'])
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(OutboundEmail.objects.count(), emails)
+
+    def test_key_reused_for_another_request(self):
+        self.create_booking(key='checkout-1')
+        response = self.create_booking(key='checkout-1', number_of_travelers=3)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.data['error_code'], 'IDEMPOTENCY_KEY_REUSED')
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_duplicate_without_key_is_a_conflict(self):
+        self.create_booking()
+        emails = OutboundEmail.objects.count()
+        # The unique index on active bookings rejects it; no pre-check ran
+        response = self.create_booking()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['error_code'], 'DUPLICATE_BOOKING')
+        self.assertEqual((Booking.objects.count(), OutboundEmail.objects.count()), (1, emails))
+
+@override_settings(ALLOWED_HOSTS=['*'], VOUCHER_PRERENDER=False)
+class ConcurrentCreateTests(TransactionTestCase):
+    """Two submits of the same booking at once: one creates it, the other does not"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='alice@gmail.com', username='alice', password='pw12345!x', first_name='Alice', last_name='Smith'
+        )
+        self.tour = make_tour()
+
+    def submit_together(self, headers):
+        start = threading.Barrier(2)
+        responses = []
+
+        def submit():
+            client = APIClient()
+            client.force_authenticate(self.user)
+            start.wait(5)
+            try:
+                responses.append(client.post('/api/bookings/create/', {
+                    'tour_id': str(self.tour.id), 'first_name': 'Alice', 'last_name': 'Smith',
+                    'email': 'alice@gmail.com', 'number_of_travelers': 2,
+                }, format='json', **headers))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sorted(response.status_code for response in responses)
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Needs concurrent writers')
+    def test_double_click_creates_one_booking(self):
+        self.assertEqual(self.submit_together({}), [201, 409])
+        self.assertEqual(Booking.objects.count(), 1)
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Needs concurrent writers')
+    def test_concurrent_retry_replays(self):
+        self.assertEqual(self.submit_together({'HTTP_IDEMPOTENCY_KEY': 'checkout-1'}), [201, 201])
+        self.assertEqual(Booking.objects.count(), 1)
+        kinds = list(OutboundEmail.objects.values_list('kind', flat=True))
+        self.assertEqual(len(kinds), len(set(kinds)))
+
+class BookingReferenceTests(TestCase):
+    """References carry a check symbol, so mistypes are caught before any lookup"""
+
+    def test_encode_round_trips_through_the_check(self):
+        for value in (FIRST_VALUE, FIRST_VALUE + 1, 12345678901, 32 ** 9 - 1):
+            reference = encode_reference(value)
+            self.assertEqual(len(reference), 10)
+            self.assertEqual(reference[-1], check_symbol(reference[:-1]))
+            self.assertTrue(is_valid_reference(reference))
+        # Fixed width keeps the string order of the numbers
+        self.assertLess(encode_reference(FIRST_VALUE + 9), encode_reference(FIRST_VALUE + 10))
+        with self.assertRaises(ValueError):
+            encode_reference(32 ** 9)
+
+    def test_check_symbol_catches_one_wrong_symbol(self):
+        reference = encode_reference(FIRST_VALUE + 4242)
+        for position in range(len(reference)):
+            for char in ALPHABET:
+                if char != reference[position]:
+                    typo = reference[:position] + char + reference[position + 1:]
+                    self.assertFalse(is_valid_reference(typo), typo)
+
+    def test_normalize_folds_look_alikes(self):
+        reference = encode_reference(FIRST_VALUE + 4242)
+        self.assertEqual(normalize_reference(f' {reference[:5].lower()}-{reference[5:]} '), reference)
+        self.assertEqual(normalize_reference('1000o0il0L'), '1000001101')
+        # U is not an alias of anything, so it never makes a valid reference
+        self.assertFalse(is_valid_reference(normalize_reference(reference[:-2] + 'u' + reference[-1])))
+        # Legacy references keep their letters
+        self.assertEqual(normalize_reference('abc-123456'), 'ABC123456')
+
+    def test_legacy_references_are_accepted(self):
+        self.assertTrue(is_valid_reference('ABC123456'))
+        self.assertFalse(is_valid_reference('AB1234567'))
+
+    def test_lookup_rejects_a_bad_check_symbol_without_a_query(self):
+        reference = encode_reference(FIRST_VALUE + 4242)
+        wrong = ALPHABET[(ALPHABET.index(reference[-1]) + 1) % 32]
+        serializer = GuestBookingLookupSerializer(data={'booking_reference': reference[:-1] + wrong, 'email': 'alice@gmail.com'})
+        with self.assertNumQueries(0):
+            self.assertFalse(serializer.is_valid())
+        self.assertIn('booking_reference', serializer.errors)
+
+    def test_reference_is_allocated_on_first_save(self):
+        with self.assertNumQueries(0):
+            booking = Booking(first_name='Alice', last_name='Smith', email='alice@gmail.com')
+        self.assertEqual(booking.booking_reference, '')
+        booking.tour = make_tour()
+        booking.number_of_travelers, booking.tour_price = 1, Decimal('100.00')
+        booking.save()
+        self.assertTrue(is_valid_reference(booking.booking_reference))
+        reference = booking.booking_reference
+        booking.save()
+        self.assertEqual(Booking.objects.get(pk=booking.pk).booking_reference, reference)
+
+def make_tour(**extra):
+    category, _ = TourCategory.objects.get_or_create(name='Culture')
+    fields = dict(
+        title='Pyramids of Giza', description='Great pyramids tour', short_description='Pyramids',
+        location='Giza', price=Decimal('100.00'), duration='3 hours', max_persons=10,
+        category=category, cover_photo='tour_images/a.jpg', includes='Guide',
+    )
+    fields.update(extra)
+    return Tour.objects.create(**fields)
+
+def make_booking(tour, first_name, email, **extra):
+    return Booking.objects.create(
+        tour=tour, first_name=first_name, last_name='Smith', email=email, number_of_travelers=2,
+        tour_price=tour.price, total_amount=tour.price * 2, **extra
+    )
+
+async def read_stream(response):
+    return [chunk async for chunk in response.streaming_content]
+
+@override_settings(ALLOWED_HOSTS=['*'], VOUCHER_PRERENDER=False)
+class AdminBookingFeedTests(TestCase):
+    """Admin feed filters and the NDJSON export"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            email='boss@gmail.com', username='boss', password='pw12345!x', first_name='Boss', last_name='Admin', is_staff=True
+        )
+        tour = make_tour()
+        cls.alice = make_booking(tour, 'Alice', 'alice@gmail.com')
+        cls.bob = make_booking(tour, 'Bob', 'bob.jones@example.com')
+        cls.carol = make_booking(tour, 'Carol', 'carol@example.com')
+        # Alice booked yesterday (late in the evening), the others today
+        yesterday = timezone.make_aware(datetime.combine(timezone.localdate() - timedelta(days=1), datetime.max.time()))
+        Booking.objects.filter(pk=cls.alice.pk).update(created_at=yesterday)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def references(self, **params):
+        response = self.client.get('/api/bookings/admin/all/', params)
+        self.assertEqual(response.status_code, 200)
+        return {row['booking_reference'] for row in response.data['bookings']}
+
+    def test_free_text_matches_name_and_partial_email(self):
+        self.assertEqual(self.references(q='carol'), {self.carol.booking_reference})
+        self.assertEqual(self.references(q='jones'), {self.bob.booking_reference})
+        self.assertEqual(self.references(q='Alice Smith'), {self.alice.booking_reference})
+        self.assertEqual(self.references(q=self.bob.booking_reference), {self.bob.booking_reference})
+
+    def test_date_range_covers_whole_days(self):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        self.assertEqual(self.references(date_from=yesterday, date_to=yesterday), {self.alice.booking_reference})
+        self.assertEqual(
+            self.references(date_from=timezone.localdate()), {self.bob.booking_reference, self.carol.booking_reference}
+        )
+
+    def test_ndjson_export_streams_asynchronously(self):
+        response = self.client.get('/api/bookings/admin/all/', {'export': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        # An async body is what ASGI servers send chunk by chunk instead of buffering
+        self.assertTrue(response.is_async)
+        chunks = async_to_sync(read_stream)(response)
+        self.assertEqual(len(chunks), 3)
+        rows = [json.loads(chunk) for chunk in chunks]
+        self.assertEqual(rows[-1]['booking_reference'], self.alice.booking_reference)
+
+@override_settings(ALLOWED_HOSTS=['*'], VOUCHER_PRERENDER=False)
+class VoucherExportTests(TestCase):
+    """Bulk exports are assembled from the cached per-booking vouchers and streamed"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            email='boss@gmail.com', username='boss', password='pw12345!x', first_name='Boss', last_name='Admin', is_staff=True
+        )
+        tour = make_tour()
+        cls.bookings = [make_booking(tour, name, f'{name.lower()}@gmail.com') for name in ('Alice', 'Bob', 'Carol')]
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        storage_before, vouchers._storage = vouchers._storage, FileSystemStorage(location=directory)
+        self.addCleanup(setattr, vouchers, '_storage', storage_before)
+        for booking in Booking.objects.select_related('tour'):
+            vouchers.store_voucher(vouchers.voucher_data(booking), 'admin')
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, output):
+        response = self.client.get('/api/bookings/admin/vouchers/export/', {'output': output})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        chunks = async_to_sync(read_stream)(response)
+        # A chunk per voucher plus the end of the file, not one buffered body
+        self.assertEqual(len(chunks), len(self.bookings) + 1)
+        return b''.join(chunks)
+
+    def test_merged_pdf_has_a_page_per_booking(self):
+        pages = PdfReader(io.BytesIO(self.export('pdf')), strict=True).pages
+        self.assertEqual(
+            sorted(booking.booking_reference for booking in self.bookings),
+            sorted(page.extract_text().split('Booking: ')[1].split()[0] for page in pages),
+        )
+
+    def test_zip_has_a_voucher_per_booking(self):
+        names = zipfile.ZipFile(io.BytesIO(self.export('zip'))).namelist()
+        self.assertEqual(len(names), len(self.bookings))
+
+@override_settings(ALLOWED_HOSTS=['*'], VOUCHER_PRERENDER=False)
+class VoucherCacheTests(TestCase):
+    """Vouchers are stored under a fingerprint of their content and rendered once per version"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='alice@gmail.com', username='alice', password='pw12345!x', first_name='Alice', last_name='Smith'
+        )
+        cls.booking = make_booking(make_tour(), 'Alice', 'alice@gmail.com', user=cls.user)
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        storage_before, vouchers._storage = vouchers._storage, FileSystemStorage(location=directory)
+        self.addCleanup(setattr, vouchers, '_storage', storage_before)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        render = mock.patch.object(vouchers, 'render_voucher_pdf', wraps=vouchers.render_voucher_pdf)
+        self.render = render.start()
+        self.addCleanup(render.stop)
+
+    def download(self, **headers):
+        response = self.client.get(f'/api/bookings/{self.booking.booking_reference}/voucher/', **headers)
+        if response.status_code == 200:
+            self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        return response
+
+    def test_rendered_once_then_served_from_storage(self):
+        first = self.download()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.render.call_count, 1)
+
+        second = self.download()
+        self.assertEqual((second.status_code, second['ETag']), (200, first['ETag']))
+        self.assertEqual(self.render.call_count, 1)
+
+        self.assertEqual(self.download(HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.assertEqual(self.render.call_count, 1)
+
+    def test_printed_changes_render_a_new_voucher(self):
+        first = self.download()
+        self.booking.booking_status = 'confirmed'
+        self.booking.save()
+
+        second = self.download(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(self.render.call_count, 2)
+
+    def test_other_changes_keep_the_voucher(self):
+        first = self.download()
+        self.booking.internal_notes = 'VIP'
+        self.booking.save()
+        self.assertEqual(self.download(HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.assertEqual(self.render.call_count, 1)
+
+@override_settings(ALLOWED_HOSTS=['*'], VOUCHER_PRERENDER=False)
+class SeatReservationTests(TestCase):
+    """A booking's seats follow it when it moves and come back when it goes away"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='alice@gmail.com', username='alice', password='pw12345!x', first_name='Alice', last_name='Smith'
+        )
+        cls.admin = User.objects.create_superuser(
+            email='boss@gmail.com', username='boss', password='pw12345!x', first_name='Boss', last_name='Admin'
+        )
+        cls.tour = make_tour()
+        cls.first_day = timezone.localdate() + timedelta(days=10)
+        cls.second_day = cls.first_day + timedelta(days=1)
+        cls.slots = [
+            TourAvailability.objects.create(
+                tour=cls.tour, user=cls.user, date=day, start_time=time(9), end_time=time(12), available_spots=4
+            )
+            for day in (cls.first_day, cls.second_day)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        response = self.client.post('/api/bookings/create/', {
+            'tour_id': str(self.tour.id), 'first_name': 'Alice', 'last_name': 'Smith', 'email': 'alice@gmail.com',
+            'number_of_travelers': 3, 'preferred_date': str(self.first_day),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.booking = Booking.objects.get(user=self.user)
+
+    def assertSeatsLeft(self, first_day, second_day):
+        for slot, seats in zip(self.slots, (first_day, second_day)):
+            slot.refresh_from_db()
+            self.assertEqual(slot.available_spots, seats)
+            rollup = TourDayCapacity.objects.get(tour=self.tour, date=slot.date)
+            self.assertEqual((rollup.seats_left, rollup.largest_party), (seats, seats))
+
+    def update(self, **data):
+        return self.client.patch(f'/api/bookings/my-bookings/{self.booking.booking_reference}/update/', data, format='json')
+
+    def test_create_takes_seats(self):
+        self.assertEqual(self.booking.availability_slot_id, self.slots[0].pk)
+        self.assertSeatsLeft(1, 4)
+
+    def test_moving_the_date_moves_the_seats(self):
+        self.assertEqual(self.update(preferred_date=str(self.second_day)).status_code, 200)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.availability_slot_id, self.slots[1].pk)
+        self.assertSeatsLeft(4, 1)
+
+    def test_failed_move_keeps_the_old_seats(self):
+        response = self.update(preferred_date=str(self.second_day + timedelta(days=1)))
+        self.assertEqual(response.status_code, 400)
+        self.booking.refresh_from_db()
+        self.assertEqual((self.booking.preferred_date, self.booking.availability_slot_id), (self.first_day, self.slots[0].pk))
+        self.assertSeatsLeft(1, 4)
+
+    def test_other_edits_leave_the_seats_alone(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.update(special_requests='Window seat').status_code, 200)
+        self.assertFalse([query for query in queries if 'tours_touravailability' in query['sql']])
+        self.assertSeatsLeft(1, 4)
+
+    def test_delete_returns_the_seats(self):
+        self.booking.delete()
+        self.assertSeatsLeft(4, 4)
+
+    def admin_action(self, action):
+        client = Client()
+        client.force_login(self.admin)
+        response = client.post(reverse('admin:bookings_booking_changelist'), {
+            'action': action, '_selected_action': [self.booking.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.booking.refresh_from_db()
+
+    def test_admin_bulk_cancel_returns_the_seats(self):
+        self.admin_action('cancel_bookings')
+        self.assertEqual((self.booking.booking_status, self.booking.availability_slot_id), ('cancelled', None))
+        self.assertSeatsLeft(4, 4)
+
+    def test_admin_bulk_confirm_takes_the_seats_back(self):
+        self.admin_action('cancel_bookings')
+        self.admin_action('confirm_bookings')
+        self.assertEqual((self.booking.booking_status, self.booking.availability_slot_id), ('confirmed', self.slots[0].pk))
+        self.assertSeatsLeft(1, 4)
+
+    def test_admin_bulk_confirm_without_seats_leaves_the_booking_cancelled(self):
+        self.admin_action('cancel_bookings')
+        TourAvailability.objects.filter(pk=self.slots[0].pk).update(available_spots=2)
+        self.admin_action('confirm_bookings')
+        self.assertEqual((self.booking.booking_status, self.booking.availability_slot_id), ('cancelled', None))
+
+@override_settings(ALLOWED_HOSTS=['*'], VOUCHER_PRERENDER=False)
+class BulkBookingTests(TestCase):
+    """The bulk endpoint reports success only when bookings were created"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            email='boss@gmail.com', username='boss', password='pw12345!x', first_name='Boss', last_name='Admin', is_staff=True
+        )
+        cls.tour = make_tour()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def row(self, **extra):
+        return {'tour_id': str(self.tour.id), 'first_name': 'Alice', 'last_name': 'Smith',
+                'email': 'alice@gmail.com', 'number_of_travelers': 2, **extra}
+
+    def bulk(self, rows):
+        return self.client.post('/api/bookings/admin/bulk/', {'bookings': rows, 'send_emails': False}, format='json')
+
+    def test_partial_success(self):
+        response = self.bulk([self.row(), self.row(email='not-an-email')])
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.data['success'])
+        self.assertEqual([error['row'] for error in response.data['errors']], [1])
+
+    def test_all_rows_failed(self):
+        response = self.bulk([self.row(number_of_travelers=0), self.row(tour_id=str(uuid.uuid4()))])
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(response.data['success'])
+        self.assertEqual(response.data['created'], [])
+        self.assertEqual([error['row'] for error in response.data['errors']], [0, 1])
+        self.assertFalse(Booking.objects.exists())
+
+class UserBookingStatsTests(TestCase):
+    """Booking saves and deletes move the user's stats row by the difference"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='alice@gmail.com', username='alice', password='pw12345!x', first_name='Alice', last_name='Smith'
+        )
+        cls.tours = [make_tour(title=f'Tour {number}') for number in range(3)]
+
+    def book(self, tour, **extra):
+        fields = dict(
+            tour=tour, user=self.user, first_name='Alice', last_name='Smith', email=f'alice{tour.pk}@gmail.com',
+            number_of_travelers=1, tour_price=Decimal('100.00'), total_amount=Decimal('100.00'),
+        )
+        fields.update(extra)
+        return Booking.objects.create(**fields)
+
+    def row(self):
+        row = UserBookingStats.objects.get(user=self.user)
+        return [getattr(row, name) for name in COUNTERS], row.total_spent, row.upcoming_dates
+
+    def assertMatchesRebuild(self):
+        incremental = self.row()
+        rebuild_user_stats()
+        self.assertEqual(incremental, self.row())
+
+    def test_changes_match_a_rebuild(self):
+        soon = timezone.localdate() + timedelta(days=5)
+        first = self.book(self.tours[0], preferred_date=soon)
+        second = self.book(self.tours[1])
+        self.assertEqual(self.row(), ([2, 0, 0, 0, 2], Decimal('0.00'), [soon.isoformat()]))
+
+        first.booking_status, first.payment_status = 'confirmed', 'paid'
+        first.preferred_date = str(soon + timedelta(days=1))
+        first.save()
+        second.booking_status = 'cancelled'
+        second.save()
+        self.assertEqual(self.row(), ([2, 1, 0, 1, 0], Decimal('100.00'), [(soon + timedelta(days=1)).isoformat()]))
+        self.assertMatchesRebuild()
+
+        first.delete()
+        self.assertEqual(self.row(), ([1, 0, 0, 1, 0], Decimal('0.00'), []))
+        self.assertMatchesRebuild()
+
+    def test_status_change_is_one_update(self):
+        booking = self.book(self.tours[0])
+        booking = Booking.objects.get(pk=booking.pk)
+        booking.booking_status = 'confirmed'
+        with CaptureQueriesContext(connection) as queries:
+            booking.save()
+        stats_queries = [query['sql'] for query in queries if 'bookings_userbookingstats' in query['sql']]
+        self.assertEqual(len(stats_queries), 1)
+        self.assertTrue(stats_queries[0].startswith('UPDATE'))
+        self.assertEqual(self.row()[0], [1, 1, 0, 0, 0])
+
+    def test_admin_bulk_actions_keep_the_row_current(self):
+        bookings = [self.book(tour) for tour in self.tours]
+        admin = User.objects.create_superuser(
+            email='boss@gmail.com', username='boss', password='pw12345!x', first_name='Boss', last_name='Admin'
+        )
+        client = Client()
+        client.force_login(admin)
+        for action, selected in (('confirm_bookings', bookings[:2]), ('cancel_bookings', bookings[2:])):
+            client.post(reverse('admin:bookings_booking_changelist'), {
+                'action': action, '_selected_action': [booking.pk for booking in selected],
+            })
+        self.assertEqual(self.row()[0], [3, 2, 0, 1, 0])
+        self.assertMatchesRebuild()
+
+    def test_partially_loaded_save_recounts_the_user(self):
+        booking = self.book(self.tours[0])
+        booking = Booking.objects.only('id', 'booking_status').get(pk=booking.pk)
+        booking.booking_status = 'completed'
+        booking.save()
+        self.assertEqual(self.row()[0], [1, 0, 1, 0, 0])
+        self.assertMatchesRebuild()
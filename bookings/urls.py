@@ -25,6 +25,8 @@ urlpatterns = [
       path('admin/all/', views.admin_all_bookings, name='admin_all_bookings'),
     path('admin/<str:booking_reference>/confirm/', views.admin_confirm_booking, name='admin_confirm_booking'),
     path('admin/<str:booking_reference>/decline/', views.admin_decline_booking, name='admin_decline_booking'),
+    path('admin/bulk/', views.admin_bulk_create_bookings, name='admin_bulk_create_bookings'),
+    path('admin/vouchers/export/', views.admin_export_vouchers, name='admin_export_vouchers'),
     path('admin/<str:booking_reference>/voucher/', views.admin_booking_voucher, name='admin_booking_voucher'),
 
 ]
\ No newline at end of file
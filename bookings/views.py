@@ -1270,15 +1270,29 @@ from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 from django.conf import settings
 from django.utils import timezone
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from datetime import datetime, timedelta
+import io
 import re
 import logging
-import resend
-
-from .models import Booking, BookingStatusHistory, BookingCancellation
-from django.http import HttpResponse
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
+import uuid
+
+from notifications.outbox import enqueue_email
+from notifications.rendering import render_email
+from tour_backend.pagination import KeysetListPagination, KeysetPagination
+from tour_backend.streaming import async_stream
+from tours.identity import tour_identity_map
+
+from .bulk import MAX_BULK_BOOKINGS, BookingImport, read_manifest
+from .idempotency import idempotent
+from .models import ACTIVE_BOOKING_STATUSES, Booking, BookingStatusHistory, BookingCancellation, DaysUntil
+from .stats import user_stats
+from .vouchers import open_voucher, voucher_data, voucher_fingerprint
+from .voucher_export import EXPORT_OUTPUTS, VoucherExport, filter_voucher_bookings
+from django.http import FileResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import parse_etags
+from django.utils.dateparse import parse_date
+from rest_framework.utils.encoders import JSONEncoder
 
 from .serializers import (
     BookingListSerializer,
@@ -1292,159 +1306,93 @@ from .serializers import (
 # Setup logging
 logger = logging.getLogger(__name__)
 
-def send_owner_notification_email(booking, action_type, additional_info=None):
+OWNER_EMAIL = 'mimmosafari56@gmail.com'
+
+def booking_email_context(booking, **extra):
     """
-    Send notification email to site owner about booking actions using Resend
-    action_type: 'new_booking', 'cancellation', 'admin_confirmation', 'admin_decline'
+    Template context shared by the booking emails.
+    Values are formatted here so the HTML and plain text bodies read the same.
     """
-    resend.api_key = settings.RESEND_API_KEY
-
-    try:
-        owner_email = 'mimmosafari56@gmail.com'  # Updated email
-        
-        # Determine subject and content based on action type
-        if action_type == 'new_booking':
-            subject = f'New Booking - {booking.booking_reference}'
-            action_text = 'A new booking has been created'
-            status_color = '#007bff'  # Blue
-        elif action_type == 'cancellation':
-            subject = f'Booking Cancelled - {booking.booking_reference}'
-            action_text = 'A booking has been cancelled'
-            status_color = '#dc3545'  # Red
-        elif action_type == 'admin_confirmation':
-            subject = f'Booking Confirmed by Admin - {booking.booking_reference}'
-            action_text = 'You have confirmed this booking'
-            status_color = '#28a745'  # Green
-        elif action_type == 'admin_decline':
-            subject = f'Booking Declined by Admin - {booking.booking_reference}'
-            action_text = 'You have declined this booking'
-            status_color = '#ffc107'  # Yellow
-        else:
-            subject = f'Booking Update - {booking.booking_reference}'
-            action_text = 'Booking status has been updated'
-            status_color = '#6c757d'  # Gray
-
-        # HTML email content
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <title>Booking Notification</title>
-        </head>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto;">
-            <div style="background: {status_color}; color: white; padding: 20px; text-align: center;">
-                <h2 style="margin: 0;">NATA STORIA TRAVEL</h2>
-                <p style="margin: 5px 0 0 0;">Booking Notification</p>
-            </div>
-            
-            <div style="padding: 20px; background: white; border: 1px solid #ddd;">
-                <h3 style="color: {status_color}; margin-top: 0;">{action_text}</h3>
-                
-                <table style="width: 100%; border-collapse: collapse; margin: 20px 0;">
-                    <tr style="background: #f8f9fa;">
-                        <td style="padding: 10px; font-weight: bold; border: 1px solid #ddd;">Booking Reference:</td>
-                        <td style="padding: 10px; border: 1px solid #ddd;">{booking.booking_reference}</td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 10px; font-weight: bold; border: 1px solid #ddd;">Customer:</td>
-                        <td style="padding: 10px; border: 1px solid #ddd;">{booking.full_name}</td>
-                    </tr>
-                    <tr style="background: #f8f9fa;">
-                        <td style="padding: 10px; font-weight: bold; border: 1px solid #ddd;">Email:</td>
-                        <td style="padding: 10px; border: 1px solid #ddd;">{booking.email}</td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 10px; font-weight: bold; border: 1px solid #ddd;">Phone:</td>
-                        <td style="padding: 10px; border: 1px solid #ddd;">{booking.phone or 'Not provided'}</td>
-                    </tr>
-                    <tr style="background: #f8f9fa;">
-                        <td style="padding: 10px; font-weight: bold; border: 1px solid #ddd;">Tour:</td>
-                        <td style="padding: 10px; border: 1px solid #ddd;">{booking.tour.title}</td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 10px; font-weight: bold; border: 1px solid #ddd;">Date:</td>
-                        <td style="padding: 10px; border: 1px solid #ddd;">{booking.preferred_date}</td>
-                    </tr>
-                    <tr style="background: #f8f9fa;">
-                        <td style="padding: 10px; font-weight: bold; border: 1px solid #ddd;">Time:</td>
-                        <td style="padding: 10px; border: 1px solid #ddd;">{booking.preferred_time or 'To be confirmed'}</td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 10px; font-weight: bold; border: 1px solid #ddd;">Travelers:</td>
-                        <td style="padding: 10px; border: 1px solid #ddd;">{booking.number_of_travelers}</td>
-                    </tr>
-                    <tr style="background: #f8f9fa;">
-                        <td style="padding: 10px; font-weight: bold; border: 1px solid #ddd;">Total Amount:</td>
-                        <td style="padding: 10px; border: 1px solid #ddd; font-weight: bold;">${booking.total_amount} USD</td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 10px; font-weight: bold; border: 1px solid #ddd;">Status:</td>
-                        <td style="padding: 10px; border: 1px solid #ddd; color: {status_color}; font-weight: bold;">{booking.booking_status.upper()}</td>
-                    </tr>
-                </table>
-                
-                {f'<div style="background: #fff3cd; padding: 15px; border-radius: 5px; margin: 15px 0;"><strong>Additional Info:</strong> {additional_info}</div>' if additional_info else ''}
-                
-                {f'<div style="background: #f8f9ff; padding: 15px; border-radius: 5px; margin: 15px 0;"><strong>Special Requests:</strong> {booking.special_requests}</div>' if booking.special_requests else ''}
-                
-                <p style="margin-top: 20px; font-size: 14px; color: #666;">
-                    Generated automatically by NATA STORIA TRAVEL booking system on {timezone.now().strftime('%Y-%m-%d at %H:%M')}
-                </p>
-            </div>
-        </body>
-        </html>
-        """
-
-        # Plain text version
-        plain_content = f"""
-{action_text.upper()}
-
-Booking Details:
-================
-Reference: {booking.booking_reference}
-Customer: {booking.full_name}
-Email: {booking.email}
-Phone: {booking.phone or 'Not provided'}
-Tour: {booking.tour.title}
-Date: {booking.preferred_date}
-Time: {booking.preferred_time or 'To be confirmed'}
-Travelers: {booking.number_of_travelers}
-Total: ${booking.total_amount} USD
-Status: {booking.booking_status.upper()}
-
-{f'Additional Info: {additional_info}' if additional_info else ''}
-{f'Special Requests: {booking.special_requests}' if booking.special_requests else ''}
-
-Generated on {timezone.now().strftime('%Y-%m-%d at %H:%M')}
-NATA STORIA TRAVEL Booking System
-        """
+    context = {
+        'reference': booking.booking_reference,
+        'full_name': booking.full_name,
+        'email': booking.email,
+        'phone': booking.phone,
+        'tour_title': booking.tour.title,
+        'preferred_date': str(booking.preferred_date),
+        'preferred_time': str(booking.preferred_time) if booking.preferred_time else '',
+        'number_of_travelers': booking.number_of_travelers,
+        'total_amount': str(booking.total_amount),
+        'booking_status': booking.booking_status,
+        'special_requests': booking.special_requests,
+        'generated_at': timezone.now().strftime('%Y-%m-%d at %H:%M'),
+    }
+    context.update(extra)
+    return context
+
+def booking_confirmation_email(booking):
+    """enqueue_email arguments for the customer's booking confirmation"""
+    rendered = render_email('emails/booking_confirmation', booking_email_context(booking))
+    return {
+        'to': [booking.email],
+        'subject': f'Booking Confirmation - {booking.booking_reference}',
+        'html': rendered.html,
+        'text': rendered.text,
+        'kind': 'booking_confirmation',
+        'reference': booking.booking_reference,
+        'reply_to': [settings.DEFAULT_FROM_EMAIL],
+        'headers': {
+            'X-Mailer': 'NATA STORIA TRAVEL Booking System',
+            'X-Priority': '3',
+            'Importance': 'Normal'
+        },
+    }
 
-        # Send email using Resend
-        params: resend.Emails.SendParams = {
-            "from": f"NATA STORIA TRAVEL <{settings.DEFAULT_FROM_EMAIL}>",
-            "to": [owner_email],
-            "subject": subject,
-            "html": html_content,
-            "text": plain_content,
-            "headers": {
-                'X-Mailer': 'NATA STORIA TRAVEL Booking System',
-                'X-Priority': '3' if action_type == 'new_booking' else '2',
-            }
+def queue_owner_notification_email(booking, action_type, additional_info=None):
+    """
+    Queue notification email to site owner about booking actions
+    action_type: 'new_booking', 'cancellation', 'admin_confirmation', 'admin_decline'
+    """
+    owner_email = OWNER_EMAIL
+    
+    # Determine subject and content based on action type
+    if action_type == 'new_booking':
+        subject = f'New Booking - {booking.booking_reference}'
+        action_text = 'A new booking has been created'
+        status_color = '#007bff'  # Blue
+    elif action_type == 'cancellation':
+        subject = f'Booking Cancelled - {booking.booking_reference}'
+        action_text = 'A booking has been cancelled'
+        status_color = '#dc3545'  # Red
+    elif action_type == 'admin_confirmation':
+        subject = f'Booking Confirmed by Admin - {booking.booking_reference}'
+        action_text = 'You have confirmed this booking'
+        status_color = '#28a745'  # Green
+    elif action_type == 'admin_decline':
+        subject = f'Booking Declined by Admin - {booking.booking_reference}'
+        action_text = 'You have declined this booking'
+        status_color = '#ffc107'  # Yellow
+    else:
+        subject = f'Booking Update - {booking.booking_reference}'
+        action_text = 'Booking status has been updated'
+        status_color = '#6c757d'  # Gray
+
+    rendered = render_email('emails/owner_notification', booking_email_context(
+        booking, action_text=action_text, status_color=status_color, additional_info=additional_info
+    ))
+
+    return enqueue_email(
+        to=[owner_email],
+        subject=subject,
+        html=rendered.html,
+        text=rendered.text,
+        kind=f'owner_{action_type}',
+        reference=booking.booking_reference,
+        headers={
+            'X-Mailer': 'NATA STORIA TRAVEL Booking System',
+            'X-Priority': '3' if action_type == 'new_booking' else '2',
         }
-        
-        response = resend.Emails.send(params)
-        
-        if response and response.get('id'):
-            logger.info(f"Owner notification sent successfully for {action_type} - booking {booking.booking_reference}. Email ID: {response.get('id')}")
-            return True
-        else:
-            logger.warning(f"Owner notification failed for {action_type} - booking {booking.booking_reference}. Response: {response}")
-            return False
-            
-    except Exception as e:
-        logger.error(f"Failed to send owner notification for {action_type} - booking {booking.booking_reference}: {e}")
-        return False
+    )
 
 class CreateBookingView(generics.CreateAPIView):
     """
@@ -1487,15 +1435,12 @@ class CreateBookingView(generics.CreateAPIView):
     #     return None
     def check_duplicate_booking(self, user, tour_id, availability_description=None, preferred_date=None, email=None):
         """
-        Check if the user already has an active booking for the same tour
-        Now uses availability_description instead of preferred_date for comparison
+        Find the user's active booking for the same tour (the one the unique
+        indexes on active bookings matched)
         """
-        # Define active booking statuses (exclude cancelled and completed)
-        active_statuses = ['pending', 'confirmed']
-        
         base_filter = {
             'tour_id': tour_id,
-            'booking_status__in': active_statuses
+            'booking_status__in': ACTIVE_BOOKING_STATUSES
         }
         
         # For authenticated users, check by user
@@ -1541,6 +1486,7 @@ class CreateBookingView(generics.CreateAPIView):
         except (ValidationError, IndexError):
             return False
     
+    @idempotent
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -1560,15 +1506,26 @@ class CreateBookingView(generics.CreateAPIView):
         tour_id = serializer.validated_data['tour_id']
         # preferred_date = serializer.validated_data['preferred_date']
         
-        # Check for duplicate booking
-        duplicate_booking = self.check_duplicate_booking(
-            user=request.user,
-            tour_id=tour_id,
-        
-            email=email
-        )
-        
-        if duplicate_booking:
+        # Booking, seats and emails commit together; the mail worker sends them.
+        # The unique indexes on active bookings reject duplicates, even concurrent ones.
+        try:
+            with transaction.atomic():
+                booking = serializer.save(
+                    user=request.user,
+                    email=email
+                )
+                self.queue_booking_confirmation_email(booking)
+                queue_owner_notification_email(booking, 'new_booking')
+        except IntegrityError:
+            duplicate_booking = self.check_duplicate_booking(
+                user=request.user,
+                tour_id=tour_id,
+                email=email
+            )
+            if duplicate_booking is None:
+                raise
+            # Same tour the serializer already loaded
+            duplicate_booking.tour = tour_identity_map(request).get(tour_id) or duplicate_booking.tour
             return Response({
                 'success': False,
                 'message': 'You already have an active booking for this tour on this date',
@@ -1580,195 +1537,59 @@ class CreateBookingView(generics.CreateAPIView):
                     'tour_title': duplicate_booking.tour.title
                 }
             }, status=status.HTTP_409_CONFLICT)
-        
-        booking = serializer.save(
-            user=request.user,
-            email=email
-        )
-        
-        # Send confirmation email with error handling
-        email_sent = False
-        email_error = None
-        
-        try:
-            email_sent = self.send_booking_confirmation_email(booking)
-        except Exception as e:
-            email_error = str(e)
-            logger.error(f"Failed to send confirmation email for booking {booking.booking_reference}: {e}")
-        
+
         response_data = {
             'success': True,
             'message': 'Booking created successfully',
             'booking': BookingDetailSerializer(booking).data,
-            'email_sent': email_sent
+            'email_status': 'queued'
         }
-        
-        # Include email error in response if it failed
-        if not email_sent and email_error:
-            response_data['email_warning'] = 'Booking created but confirmation email could not be sent'
-        
-        try:
-            send_owner_notification_email(booking, 'new_booking')
-        except Exception as e:
-            logger.error(f"Failed to send owner notification for new booking {booking.booking_reference}: {e}")
 
         return Response(response_data, status=status.HTTP_201_CREATED)
     
 
-    def send_booking_confirmation_email(self, booking):
-        """Send booking confirmation email to customer using Resend"""
-        resend.api_key = settings.RESEND_API_KEY
-        
-        try:
-            subject = f'Booking Confirmation - {booking.booking_reference}'
-            
-            # Create HTML email content
-            html_content = f"""
-            <!DOCTYPE html>
-            <html lang="en">
-            <head>
-                <meta charset="UTF-8">
-                <meta name="viewport" content="width=device-width, initial-scale=1.0">
-                <title>Booking Confirmation</title>
-            </head>
-            <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px;">
-                <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 30px; border-radius: 10px 10px 0 0; text-align: center;">
-                    <h1 style="color: white; margin: 0; font-size: 28px;">NATA STORIA TRAVEL</h1>
-                    <p style="color: #f0f0f0; margin: 10px 0 0 0; font-size: 16px;">Your Adventure Awaits!</p>
-                </div>
-                
-                <div style="background: white; padding: 30px; border: 1px solid #ddd; border-top: none;">
-                    <h2 style="color: #667eea; margin-top: 0;">Booking Confirmed! ✅</h2>
-                    
-                    <p style="font-size: 16px;">Dear <strong>{booking.full_name}</strong>,</p>
-                    
-                    <p style="font-size: 16px;">Thank you for choosing NATA STORIA TRAVEL! Your booking has been confirmed and we're excited to show you the wonders of travel.</p>
-                    
-                    <div style="background: #f8f9ff; padding: 20px; border-radius: 8px; border-left: 4px solid #667eea; margin: 25px 0;">
-                        <h3 style="color: #667eea; margin-top: 0;">📋 Booking Details</h3>
-                        <table style="width: 100%; border-collapse: collapse;">
-                            <tr>
-                                <td style="padding: 8px 0; font-weight: bold; color: #555;">Booking Reference:</td>
-                                <td style="padding: 8px 0; color: #333;">{booking.booking_reference}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px 0; font-weight: bold; color: #555;">Tour:</td>
-                                <td style="padding: 8px 0; color: #333;">{booking.tour.title}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px 0; font-weight: bold; color: #555;">Date:</td>
-                                <td style="padding: 8px 0; color: #333;">{booking.preferred_date}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px 0; font-weight: bold; color: #555;">Time:</td>
-                                <td style="padding: 8px 0; color: #333;">{booking.preferred_time or 'To be confirmed'}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px 0; font-weight: bold; color: #555;">Travelers:</td>
-                                <td style="padding: 8px 0; color: #333;">{booking.number_of_travelers}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px 0; font-weight: bold; color: #555; font-size: 18px;">Total Amount:</td>
-                                <td style="padding: 8px 0; color: #667eea; font-size: 18px; font-weight: bold;">${booking.total_amount} USD</td>
-                            </tr>
-                        </table>
-                    </div>
-                    
-                    <div style="background: #fff3cd; padding: 15px; border-radius: 5px; border: 1px solid #ffeaa7; margin: 20px 0;">
-                        <p style="margin: 0; color: #856404;"><strong>💳 Payment:</strong> You can pay on arrival or we'll contact you with payment options.</p>
-                    </div>
-                    
-                    <p style="font-size: 16px;">We will contact you within 24 hours to confirm your booking details and provide any additional information you may need.</p>
-                    
-                    <div style="text-align: center; margin: 30px 0;">
-                        <p style="font-size: 16px; margin: 0;">Questions? We're here to help!</p>
-                        <p style="margin: 10px 0;">
-                            📧 <a href="mailto:mimmosafari56@gmail.com" style="color: #667eea;">mimmosafari56@gmail.com</a><br>
-                            📞 <a href="tel:+201093706046" style="color: #667eea;">+20 109 370 6046</a>
-                        </p>
-                    </div>
-                </div>
-                
-                <div style="background: #f8f9fa; padding: 20px; border-radius: 0 0 10px 10px; text-align: center; border: 1px solid #ddd; border-top: none;">
-                    <p style="margin: 0; color: #6c757d; font-size: 14px;">
-                        Best regards,<br>
-                        <strong style="color: #667eea;">NATA STORIA TRAVEL Team</strong>
-                    </p>
-                    <p style="margin: 15px 0 0 0; color: #6c757d; font-size: 12px;">
-                        This email was sent regarding your booking. Please keep this email for your records.
-                    </p>
-                </div>
-            </body>
-            </html>
-            """
-            
-            # Plain text version
-            plain_content = f"""
-Dear {booking.full_name},
-
-Thank you for choosing NATA STORIA TRAVEL! Your booking has been confirmed.
-
-BOOKING DETAILS:
-================
-Booking Reference: {booking.booking_reference}
-Tour: {booking.tour.title}
-Date: {booking.preferred_date}
-Time: {booking.preferred_time or 'To be confirmed'}
-Number of Travelers: {booking.number_of_travelers}
-Total Amount: ${booking.total_amount} USD
-
-PAYMENT: You can pay on arrival or we'll contact you with payment options.
+    def queue_booking_confirmation_email(self, booking):
+        """Queue booking confirmation email to customer"""
+        return enqueue_email(**booking_confirmation_email(booking))
 
-We will contact you within 24 hours to confirm your booking details and provide any additional information you may need.
+# Columns BookingListSerializer reads
+BOOKING_LIST_COLUMNS = (
+    'id', 'booking_reference', 'first_name', 'last_name', 'availability_description', 'preferred_date',
+    'preferred_time', 'number_of_travelers', 'total_amount', 'booking_status', 'payment_status', 'created_at',
+    'tour__id', 'tour__title', 'tour__cover_photo', 'tour__location',
+)
 
-Questions? Contact us:
-Email: mimmosafari56@gmail.com
-Phone: +20 109 370 6046
+def booking_list_queryset(bookings):
+    """Project `bookings` for BookingListSerializer and compute its date-dependent fields in SQL"""
+    today = timezone.now().date()
+    return bookings.select_related('tour').only(*BOOKING_LIST_COLUMNS).annotate(
+        list_days_until_tour=DaysUntil('preferred_date', today),
+        list_can_be_cancelled=models.Case(
+            models.When(
+                models.Q(booking_status__in=ACTIVE_BOOKING_STATUSES)
+                & (models.Q(preferred_date__isnull=True) | models.Q(preferred_date__gt=today)),
+                then=models.Value(True),
+            ),
+            default=models.Value(False),
+            output_field=models.BooleanField(),
+        ),
+    )
 
-Best regards,
-NATA STORIA TRAVEL Team
-
----
-This email was sent regarding your booking. Please keep this email for your records.
-            """
-            
-            # Send email using Resend
-            params: resend.Emails.SendParams = {
-                "from": f"NATA STORIA TRAVEL <{settings.DEFAULT_FROM_EMAIL}>",
-                "to": [booking.email],
-                "subject": subject,
-                "html": html_content,
-                "text": plain_content,
-                "reply_to": [settings.DEFAULT_FROM_EMAIL],
-                "headers": {
-                    'X-Mailer': 'NATA STORIA TRAVEL Booking System',
-                    'X-Priority': '3',
-                    'Importance': 'Normal'
-                }
-            }
-            
-            response = resend.Emails.send(params)
-            
-            if response and response.get('id'):
-                logger.info(f"Confirmation email sent successfully to {booking.email} for booking {booking.booking_reference}. Email ID: {response.get('id')}")
-                return True
-            else:
-                logger.warning(f"Email sending failed for booking {booking.booking_reference}. Response: {response}")
-                return False
-                
-        except Exception as e:
-            logger.error(f"Failed to send confirmation email for booking {booking.booking_reference}: {e}")
-            raise e
+class UserBookingPagination(KeysetListPagination):
+    ordering = ('-created_at', 'id')
+    page_size = 20
 
 class UserBookingListView(generics.ListAPIView):
     """
-    List all bookings for the authenticated user
+    List the authenticated user's bookings, newest first, one page at a time
+    (`page_size`, and `next_cursor` from the previous page as `cursor`)
     """
     serializer_class = BookingListSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = UserBookingPagination
 
     def get_queryset(self):
-        return Booking.objects.filter(user=self.request.user).select_related('tour').order_by('-created_at')
+        return booking_list_queryset(Booking.objects.filter(user=self.request.user))
 
 class BookingDetailView(generics.RetrieveAPIView):
     """
@@ -1849,179 +1670,69 @@ class CancelBookingView(generics.GenericAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        # Update booking status
-        old_status = booking.booking_status
-        booking.booking_status = 'cancelled'
-        booking.cancellation_date = timezone.now()
-        booking.save()
-
-        # Create cancellation record
-        cancellation = BookingCancellation.objects.create(
-            booking=booking,
-            reason=serializer.validated_data['reason'],
-            reason_details=serializer.validated_data.get('reason_details', ''),
-            cancelled_by=request.user,
-            refund_amount=booking.total_amount  # Full refund by default
-        )
+        with transaction.atomic():
+            # Update booking status
+            old_status = booking.booking_status
+            booking.booking_status = 'cancelled'
+            booking.cancellation_date = timezone.now()
+            booking.save()
+
+            # Create cancellation record
+            cancellation = BookingCancellation.objects.create(
+                booking=booking,
+                reason=serializer.validated_data['reason'],
+                reason_details=serializer.validated_data.get('reason_details', ''),
+                cancelled_by=request.user,
+                refund_amount=booking.total_amount  # Full refund by default
+            )
 
-        # Create status history
-        BookingStatusHistory.objects.create(
-            booking=booking,
-            old_status=old_status,
-            new_status='cancelled',
-            changed_by=request.user,
-            reason=f"Cancelled: {cancellation.get_reason_display()}"
-        )
+            # Create status history
+            BookingStatusHistory.objects.create(
+                booking=booking,
+                old_status=old_status,
+                new_status='cancelled',
+                changed_by=request.user,
+                reason=f"Cancelled: {cancellation.get_reason_display()}"
+            )
 
-        # Send cancellation email
-        email_sent = False
-        try:
-            email_sent = self.send_cancellation_email(booking, cancellation)
-        except Exception as e:
-            logger.error(f"Failed to send cancellation email for booking {booking.booking_reference}: {e}")
+            # Queue cancellation emails for the mail worker
+            self.queue_cancellation_email(booking, cancellation)
+            cancellation_info = f"Reason: {cancellation.get_reason_display()}"
+            if cancellation.reason_details:
+                cancellation_info += f" - {cancellation.reason_details}"
+            queue_owner_notification_email(booking, 'cancellation', cancellation_info)
 
         response_data = {
             'success': True,
             'message': 'Booking cancelled successfully',
             'booking': BookingDetailSerializer(booking).data,
-            'email_sent': email_sent
+            'email_status': 'queued'
         }
-        
-        try:
-            cancellation_info = f"Reason: {cancellation.get_reason_display()}"
-            if cancellation.reason_details:
-                cancellation_info += f" - {cancellation.reason_details}"
-            send_owner_notification_email(booking, 'cancellation', cancellation_info)
-        except Exception as e:
-            logger.error(f"Failed to send owner notification for cancellation {booking.booking_reference}: {e}")
 
         return Response(response_data)
 
-    def send_cancellation_email(self, booking, cancellation):
-        """Send cancellation confirmation email using Resend"""
-        resend.api_key = settings.RESEND_API_KEY
-        
-        try:
-            subject = f'Booking Cancellation - {booking.booking_reference}'
-            
-            # HTML email content
-            html_content = f"""
-            <!DOCTYPE html>
-            <html lang="en">
-            <head>
-                <meta charset="UTF-8">
-                <meta name="viewport" content="width=device-width, initial-scale=1.0">
-                <title>Booking Cancellation</title>
-            </head>
-            <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px;">
-                <div style="background: linear-gradient(135deg, #ff6b6b 0%, #ee5a24 100%); padding: 30px; border-radius: 10px 10px 0 0; text-align: center;">
-                    <h1 style="color: white; margin: 0; font-size: 28px;">NATA STORIA TRAVEL</h1>
-                    <p style="color: #f0f0f0; margin: 10px 0 0 0; font-size: 16px;">Booking Cancellation</p>
-                </div>
-                
-                <div style="background: white; padding: 30px; border: 1px solid #ddd; border-top: none;">
-                    <h2 style="color: #ff6b6b; margin-top: 0;">Booking Cancelled</h2>
-                    
-                    <p style="font-size: 16px;">Dear <strong>{booking.full_name}</strong>,</p>
-                    
-                    <p style="font-size: 16px;">We have processed your cancellation request. Here are the details:</p>
-                    
-                    <div style="background: #fff5f5; padding: 20px; border-radius: 8px; border-left: 4px solid #ff6b6b; margin: 25px 0;">
-                        <h3 style="color: #ff6b6b; margin-top: 0;">📋 Cancellation Details</h3>
-                        <table style="width: 100%; border-collapse: collapse;">
-                            <tr>
-                                <td style="padding: 8px 0; font-weight: bold; color: #555;">Booking Reference:</td>
-                                <td style="padding: 8px 0; color: #333;">{booking.booking_reference}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px 0; font-weight: bold; color: #555;">Tour:</td>
-                                <td style="padding: 8px 0; color: #333;">{booking.tour.title}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px 0; font-weight: bold; color: #555;">Original Date:</td>
-                                <td style="padding: 8px 0; color: #333;">{booking.preferred_date}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px 0; font-weight: bold; color: #555;">Cancellation Reason:</td>
-                                <td style="padding: 8px 0; color: #333;">{cancellation.get_reason_display()}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px 0; font-weight: bold; color: #555;">Refund Amount:</td>
-                                <td style="padding: 8px 0; color: #28a745; font-weight: bold;">${cancellation.refund_amount} USD</td>
-                            </tr>
-                        </table>
-                    </div>
-                    
-                    <p style="font-size: 16px;">We're sorry to see you cancel your tour. If you'd like to reschedule or book another tour in the future, we'd be happy to help!</p>
-                    
-                    <div style="text-align: center; margin: 30px 0;">
-                        <p style="font-size: 16px; margin: 0;">Questions? We're here to help!</p>
-                        <p style="margin: 10px 0;">
-                            📧 <a href="mailto:mimmosafari56@gmail.com" style="color: #ff6b6b;">mimmosafari56@gmail.com</a><br>
-                            📞 <a href="tel:+201093706046" style="color: #ff6b6b;">+20 109 370 6046</a>
-                        </p>
-                    </div>
-                </div>
-                
-                <div style="background: #f8f9fa; padding: 20px; border-radius: 0 0 10px 10px; text-align: center; border: 1px solid #ddd; border-top: none;">
-                    <p style="margin: 0; color: #6c757d; font-size: 14px;">
-                        Best regards,<br>
-                        <strong style="color: #ff6b6b;">NATA STORIA TRAVEL Team</strong>
-                    </p>
-                </div>
-            </body>
-            </html>
-            """
-            
-            # Plain text version
-            plain_content = f"""
-Dear {booking.full_name},
-
-We have processed your booking cancellation request.
-
-CANCELLATION DETAILS:
-====================
-Booking Reference: {booking.booking_reference}
-Tour: {booking.tour.title}
-Original Date: {booking.preferred_date}
-Cancellation Reason: {cancellation.get_reason_display()}
-Refund Amount: ${cancellation.refund_amount} USD
-
-We're sorry to see you cancel your tour. If you'd like to reschedule or book another tour in the future, we'd be happy to help!
-
-Questions? Contact us:
-Email: mimmosafari56@gmail.com
-Phone: +20 109 370 6046
-
-Best regards,
-NATA STORIA TRAVEL Team
-            """
-            
-            # Send email using Resend
-            params: resend.Emails.SendParams = {
-                "from": f"NATA STORIA TRAVEL <{settings.DEFAULT_FROM_EMAIL}>",
-                "to": [booking.email],
-                "subject": subject,
-                "html": html_content,
-                "text": plain_content,
-                "reply_to": [settings.DEFAULT_FROM_EMAIL],
-                "headers": {
-                    'X-Mailer': 'NATA STORIA TRAVEL Booking System',
-                }
+    def queue_cancellation_email(self, booking, cancellation):
+        """Queue cancellation confirmation email"""
+        subject = f'Booking Cancellation - {booking.booking_reference}'
+        
+        rendered = render_email('emails/booking_cancellation', booking_email_context(
+            booking,
+            cancellation_reason=cancellation.get_reason_display(),
+            refund_amount=str(cancellation.refund_amount),
+        ))
+        
+        return enqueue_email(
+            to=[booking.email],
+            subject=subject,
+            html=rendered.html,
+            text=rendered.text,
+            kind='booking_cancellation',
+            reference=booking.booking_reference,
+            reply_to=[settings.DEFAULT_FROM_EMAIL],
+            headers={
+                'X-Mailer': 'NATA STORIA TRAVEL Booking System',
             }
-            
-            response = resend.Emails.send(params)
-            
-            if response and response.get('id'):
-                logger.info(f"Cancellation email sent successfully to {booking.email} for booking {booking.booking_reference}. Email ID: {response.get('id')}")
-                return True
-            else:
-                logger.warning(f"Cancellation email sending failed for booking {booking.booking_reference}. Response: {response}")
-                return False
-                
-        except Exception as e:
-            logger.error(f"Failed to send cancellation email for booking {booking.booking_reference}: {e}")
-            raise e
+        )
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -2094,205 +1805,203 @@ def cancel_guest_booking(request):
 @permission_classes([IsAuthenticated])
 def user_booking_stats(request):
     """
-    Get booking statistics for the authenticated user
+    Get booking statistics for the authenticated user (one row, see bookings/stats.py)
     """
-    user_bookings = Booking.objects.filter(user=request.user)
-    
-    stats = {
-        'total_bookings': user_bookings.count(),
-        'confirmed_bookings': user_bookings.filter(booking_status='confirmed').count(),
-        'completed_bookings': user_bookings.filter(booking_status='completed').count(),
-        'cancelled_bookings': user_bookings.filter(booking_status='cancelled').count(),
-        'pending_bookings': user_bookings.filter(booking_status='pending').count(),
-        'total_spent': float(user_bookings.filter(payment_status='paid').aggregate(
-            total=models.Sum('total_amount'))['total'] or 0),
-        'upcoming_tours': user_bookings.filter(
-            booking_status__in=['confirmed', 'pending'],
-            preferred_date__gte=timezone.now().date()
-        ).count()
-    }
+    stats = user_stats(request.user)
     
     return Response({
         'success': True,
         'stats': stats
     })
 
+def upcoming_booking_queryset(user):
+    """The user's next active bookings by date (served by booking_user_upcoming_idx)"""
+    return booking_list_queryset(Booking.objects.filter(
+        user=user,
+        booking_status__in=ACTIVE_BOOKING_STATUSES,
+        preferred_date__gte=timezone.now().date()
+    )).order_by('preferred_date')[:5]
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def upcoming_bookings(request):
     """
     Get upcoming bookings for the authenticated user
     """
-    upcoming = Booking.objects.filter(
-        user=request.user,
-        booking_status__in=['confirmed', 'pending'],
-        preferred_date__gte=timezone.now().date()
-    ).select_related('tour').order_by('preferred_date')[:5]
+    upcoming = upcoming_booking_queryset(request.user)
     
     return Response({
         'success': True,
         'bookings': BookingListSerializer(upcoming, many=True).data
     })
 
+def voucher_response(request, booking, variant, filename):
+    """
+    Serve a cached voucher PDF. The ETag is the voucher's content fingerprint,
+    so clients that already hold the current voucher get a 304.
+    """
+    data = voucher_data(booking)
+    fingerprint = voucher_fingerprint(data, variant)
+    etag = f'"{fingerprint}"'
+
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(
+            open_voucher(data, variant, fingerprint),
+            as_attachment=True,
+            filename=filename,
+            content_type='application/pdf'
+        )
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def booking_voucher(request, booking_reference):
     """
-    Generate and download booking voucher as PDF
+    Download booking voucher as PDF (pre-rendered when the booking is saved)
     """
-    booking = get_object_or_404(Booking, booking_reference=booking_reference, user=request.user)
-
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="voucher-{booking.booking_reference}.pdf"'
-
-    p = canvas.Canvas(response, pagesize=A4)
-    width, height = A4
-
-    # Header
-    p.setFont("Helvetica-Bold", 20)
-    p.drawString(50, height - 50, "NATA STORIA TRAVEL")
-    
-    p.setFont("Helvetica-Bold", 18)
-    p.drawString(50, height - 80, "Tour Booking Voucher")
-
-    # Booking details
-    p.setFont("Helvetica", 14)
-    y_pos = height - 120
-    
-    details = [
-        f"Booking Reference: {booking.booking_reference}",
-        f"Customer: {booking.full_name}",
-        f"Email: {booking.email}",
-        f"Tour: {booking.tour.title}",
-        f"Location: {booking.tour.location}",
-        f"Date: {booking.preferred_date}",
-        f"Time: {booking.preferred_time or 'To be confirmed'}",
-        f"Number of Travelers: {booking.number_of_travelers}",
-    ]
-    
-    for detail in details:
-        p.drawString(50, y_pos, detail)
-        y_pos -= 25
-
-    # Price section
-    p.setFont("Helvetica-Bold", 16)
-    y_pos -= 20
-    p.drawString(50, y_pos, f"Total Price: ${booking.total_amount} USD")
-    p.drawString(50, y_pos - 25, f"Payment Status: {booking.get_payment_status_display()}")
-
-    # Instructions
-    p.setFont("Helvetica", 12)
-    y_pos -= 70
-    instructions = [
-        "IMPORTANT INSTRUCTIONS:",
-        "• Please present this voucher to your tour guide on arrival",
-        "• Arrive 15 minutes before your scheduled time",
-        "• Bring a valid ID for all travelers",
-        "• Contact us if you need to make any changes",
-        "",
-        "Contact Information:",
-        "📧 Email: mimmosafari56@gmail.com",
-        "📞 Phone: +20 109 370 6046",
-        "🌐 Website: www.natastoriatravel.com"
-    ]
-    
-    for instruction in instructions:
-        if instruction.startswith("IMPORTANT"):
-            p.setFont("Helvetica-Bold", 12)
-        elif instruction.startswith("Contact"):
-            p.setFont("Helvetica-Bold", 12)
-        else:
-            p.setFont("Helvetica", 11)
-        
-        p.drawString(50, y_pos, instruction)
-        y_pos -= 18
+    booking = get_object_or_404(
+        Booking.objects.select_related('tour'), booking_reference=booking_reference, user=request.user
+    )
+    return voucher_response(request, booking, 'customer', f"voucher-{booking.booking_reference}.pdf")
+
+# Columns read by the admin booking feed; rows are built from these without loading model instances
+ADMIN_BOOKING_FEED_FIELDS = (
+    'id', 'booking_reference', 'first_name', 'last_name', 'email', 'phone',
+    'tour__title', 'tour__location', 'availability_description',
+    'preferred_date', 'preferred_time', 'number_of_travelers', 'total_amount',
+    'booking_status', 'payment_status', 'created_at', 'special_requests',
+    'user_id', 'user__username',
+)
+ADMIN_BOOKING_EXPORT_CHUNK_SIZE = 2000
+
+def admin_booking_row(values):
+    """Shape one .values() row of the admin booking feed"""
+    return {
+        'id': values['id'],
+        'booking_reference': values['booking_reference'],
+        'customer_name': f"{values['first_name']} {values['last_name']}",
+        'customer_email': values['email'],
+        'tour_title': values['tour__title'],
+        'tour_location': values['tour__location'],
+        'availability_description': values['availability_description'],
+        'preferred_date': values['preferred_date'],  # Keep for legacy bookings
+        'preferred_time': values['preferred_time'],
+        'number_of_travelers': values['number_of_travelers'],
+        'total_amount': values['total_amount'],
+        'phone_num': values['phone'],
+        'booking_status': values['booking_status'],
+        'payment_status': values['payment_status'],
+        'created_at': values['created_at'],
+        'can_confirm': values['booking_status'] == 'pending',
+        'can_decline': values['booking_status'] in ['pending', 'confirmed'],
+        'special_requests': values['special_requests'],
+        'user_id': values['user_id'],
+        'username': values['user__username'] or 'Guest',
+    }
+
+def filter_admin_bookings(bookings, params):
+    """
+    Apply the admin feed filters from query params.
+    Raises ValueError for malformed values.
+    """
+    status_filter = params.get('status', 'all')  # all, pending, confirmed, cancelled
+    if status_filter != 'all':
+        bookings = bookings.filter(booking_status=status_filter)
 
-    # Footer
-    p.setFont("Helvetica", 10)
-    p.drawString(50, 50, f"Generated on {timezone.now().strftime('%Y-%m-%d %H:%M')} • NATA STORIA TRAVEL Booking System")
+    payment_status = params.get('payment_status')
+    if payment_status:
+        bookings = bookings.filter(payment_status=payment_status)
 
-    p.showPage()
-    p.save()
-    
-    logger.info(f"Voucher generated for booking {booking.booking_reference}")
-    return response
+    tour_id = params.get('tour')
+    if tour_id:
+        try:
+            bookings = bookings.filter(tour_id=uuid.UUID(tour_id))
+        except ValueError:
+            raise ValueError('Invalid tour id')
+
+    # Whole days as a created_at range, so the (-created_at, id) index can serve it
+    for param, lookup, days in (('date_from', 'created_at__gte', 0), ('date_to', 'created_at__lt', 1)):
+        value = params.get(param)
+        if value:
+            try:
+                parsed = parse_date(value)
+            except ValueError:
+                parsed = None
+            if not parsed:
+                raise ValueError(f'Invalid {param}, expected YYYY-MM-DD')
+            start_of_day = timezone.make_aware(datetime.combine(parsed + timedelta(days=days), datetime.min.time()))
+            bookings = bookings.filter(**{lookup: start_of_day})
+
+    # Every word must match the reference (prefix), the email or the customer's name
+    for word in params.get('q', '').split():
+        bookings = bookings.filter(
+            models.Q(booking_reference__istartswith=word)
+            | models.Q(email__icontains=word)
+            | models.Q(first_name__icontains=word)
+            | models.Q(last_name__icontains=word)
+        )
+    return bookings
+
+def stream_admin_bookings_ndjson(bookings):
+    """Yield one JSON document per booking, reading the table in chunks"""
+    encoder = JSONEncoder()
+    for values in bookings.iterator(chunk_size=ADMIN_BOOKING_EXPORT_CHUNK_SIZE):
+        yield encoder.encode(admin_booking_row(values)) + '\n'
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def admin_all_bookings(request):
     """
-    Admin endpoint to get all bookings with filtering options
+    Admin endpoint to list bookings, newest first, one page at a time
+
+    Filters: status, payment_status, tour, date_from / date_to (booking creation date),
+    q (words matched against reference prefix, email and customer name).
+    Paging: page_size and the `next_cursor` from the previous page as `cursor`.
+    `count=false` skips the total count; `export=ndjson` streams every matching booking.
     """
     # Check if user is admin
     if not request.user.is_staff:
         return Response({
             'error': 'Admin access required'
         }, status=status.HTTP_403_FORBIDDEN)
-    
-    # Get filter parameters
-    status_filter = request.GET.get('status', 'all')  # all, pending, confirmed, cancelled
-    
-    # Base queryset
-    bookings = Booking.objects.select_related('tour', 'user').order_by('-created_at')
-    
-    # Apply status filter
-    if status_filter != 'all':
-        bookings = bookings.filter(booking_status=status_filter)
-    
-    # Serialize bookings with extra admin info
-    booking_data = []
-    # for booking in bookings:
-    #     booking_info = {
-    #         'id': booking.id,
-    #         'booking_reference': booking.booking_reference,
-    #         'customer_name': booking.full_name,
-    #         'customer_email': booking.email,
-    #         'tour_title': booking.tour.title,
-    #         'tour_location': booking.tour.location,
-    #         'preferred_date': booking.preferred_date,
-    #         'preferred_time': booking.preferred_time,
-    #         'number_of_travelers': booking.number_of_travelers,
-    #         'total_amount': booking.total_amount,
-    #         'phone_num': booking.phone,
-    #         'booking_status': booking.booking_status,
-    #         'payment_status': booking.payment_status,
-    #         'created_at': booking.created_at,
-    #         'can_confirm': booking.booking_status == 'pending',
-    #         'can_decline': booking.booking_status in ['pending', 'confirmed'],
-    #         'special_requests': booking.special_requests,
-    #         'user_id': booking.user.id if booking.user else None,
-    #         'username': booking.user.username if booking.user else 'Guest',
-    #     }
-    #     booking_data.append(booking_info)
-    for booking in bookings:
-        booking_info = {
-            'id': booking.id,
-            'booking_reference': booking.booking_reference,
-            'customer_name': booking.full_name,
-            'customer_email': booking.email,
-            'tour_title': booking.tour.title,
-            'tour_location': booking.tour.location,
-            'availability_description': booking.availability_description,  # NEW
-            'preferred_date': booking.preferred_date,  # Keep for legacy bookings
-            'preferred_time': booking.preferred_time,
-            'number_of_travelers': booking.number_of_travelers,
-            'total_amount': booking.total_amount,
-            'phone_num': booking.phone,
-            'booking_status': booking.booking_status,
-            'payment_status': booking.payment_status,
-            'created_at': booking.created_at,
-            'can_confirm': booking.booking_status == 'pending',
-            'can_decline': booking.booking_status in ['pending', 'confirmed'],
-            'special_requests': booking.special_requests,
-            'user_id': booking.user.id if booking.user else None,
-            'username': booking.user.username if booking.user else 'Guest',
-        }
-        booking_data.append(booking_info)
-    
+
+    try:
+        bookings = filter_admin_bookings(Booking.objects.all(), request.GET)
+    except ValueError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    bookings = bookings.values(*ADMIN_BOOKING_FEED_FIELDS)
+
+    if request.GET.get('export') == 'ndjson':
+        response = StreamingHttpResponse(
+            async_stream(stream_admin_bookings_ndjson(bookings.order_by('-created_at', 'id'))),
+            content_type='application/x-ndjson'
+        )
+        response['Content-Disposition'] = 'attachment; filename="bookings.ndjson"'
+        return response
+
+    paginator = KeysetPagination(ordering=('-created_at', 'id'))
+    try:
+        rows, next_cursor = paginator.paginate(bookings, request)
+    except ValueError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    include_count = request.GET.get('count', 'true').lower() not in ('false', '0', 'no')
+
     return Response({
         'success': True,
-        'bookings': booking_data,
-        'total_count': len(booking_data)
+        'bookings': [admin_booking_row(values) for values in rows],
+        'total_count': bookings.count() if include_count else None,
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None,
     })
 
 @api_view(['POST'])
@@ -2315,34 +2024,30 @@ def admin_confirm_booking(request, booking_reference):
             'error': f'Cannot confirm booking. Current status: {booking.booking_status}'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Update booking status
-    booking.booking_status = 'confirmed'
-    booking.confirmation_date = timezone.now()
-    booking.save()
-    
-    # Create status history
-    BookingStatusHistory.objects.create(
-        booking=booking,
-        old_status='pending',
-        new_status='confirmed',
-        changed_by=request.user,
-        reason='Confirmed by admin'
-    )
-    
-    # Send confirmation email
-    email_sent = False
-    try:
-        email_sent = send_admin_confirmation_email(booking)
-        # Also send owner notification
-        send_owner_notification_email(booking, 'admin_confirmation')
-    except Exception as e:
-        logger.error(f"Failed to send admin confirmation email: {e}")
+    with transaction.atomic():
+        # Update booking status
+        booking.booking_status = 'confirmed'
+        booking.confirmation_date = timezone.now()
+        booking.save()
+        
+        # Create status history
+        BookingStatusHistory.objects.create(
+            booking=booking,
+            old_status='pending',
+            new_status='confirmed',
+            changed_by=request.user,
+            reason='Confirmed by admin'
+        )
+        
+        # Queue confirmation email and owner notification
+        queue_admin_confirmation_email(booking)
+        queue_owner_notification_email(booking, 'admin_confirmation')
     
     return Response({
         'success': True,
         'message': f'Booking {booking_reference} confirmed successfully',
         'booking_status': booking.booking_status,
-        'email_sent': email_sent
+        'email_status': 'queued'
     })
 
 @api_view(['POST'])
@@ -2368,206 +2073,118 @@ def admin_decline_booking(request, booking_reference):
     # Get decline reason from request
     decline_reason = request.data.get('reason', 'Declined by admin')
     
-    # Update booking status
-    old_status = booking.booking_status
-    booking.booking_status = 'cancelled'
-    booking.cancellation_date = timezone.now()
-    booking.save()
-    
-    # Create status history
-    BookingStatusHistory.objects.create(
-        booking=booking,
-        old_status=old_status,
-        new_status='cancelled',
-        changed_by=request.user,
-        reason=f'Declined by admin: {decline_reason}'
-    )
-    
-    # Create cancellation record if it doesn't exist
-    if not hasattr(booking, 'cancellation'):
-        BookingCancellation.objects.create(
+    with transaction.atomic():
+        # Update booking status
+        old_status = booking.booking_status
+        booking.booking_status = 'cancelled'
+        booking.cancellation_date = timezone.now()
+        booking.save()
+        
+        # Create status history
+        BookingStatusHistory.objects.create(
             booking=booking,
-            reason='other',
-            reason_details=decline_reason,
-            cancelled_by=request.user,
-            refund_amount=booking.total_amount
+            old_status=old_status,
+            new_status='cancelled',
+            changed_by=request.user,
+            reason=f'Declined by admin: {decline_reason}'
         )
-    
-    # Send decline email
-    email_sent = False
-    try:
-        email_sent = send_admin_decline_email(booking, decline_reason)
-        # Also send owner notification
-        send_owner_notification_email(booking, 'admin_decline', decline_reason)
-    except Exception as e:
-        logger.error(f"Failed to send admin decline email: {e}")
+        
+        # Create cancellation record if it doesn't exist
+        if not hasattr(booking, 'cancellation'):
+            BookingCancellation.objects.create(
+                booking=booking,
+                reason='other',
+                reason_details=decline_reason,
+                cancelled_by=request.user,
+                refund_amount=booking.total_amount
+            )
+        
+        # Queue decline email and owner notification
+        queue_admin_decline_email(booking, decline_reason)
+        queue_owner_notification_email(booking, 'admin_decline', decline_reason)
     
     return Response({
         'success': True,
         'message': f'Booking {booking_reference} declined successfully',
         'booking_status': booking.booking_status,
-        'email_sent': email_sent
+        'email_status': 'queued'
     })
 
-def send_admin_confirmation_email(booking):
-    """Send booking confirmation email when admin confirms using Resend"""
-    resend.api_key = settings.RESEND_API_KEY
-    
-    subject = f'Booking Confirmed - {booking.booking_reference}'
-    
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <title>Booking Confirmed</title>
-    </head>
-    <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; color: #333;">
-        <div style="background: #28a745; color: white; padding: 20px; text-align: center; border-radius: 10px 10px 0 0;">
-            <h2 style="margin: 0;">Your Booking is Confirmed!</h2>
-        </div>
-        
-        <div style="background: white; padding: 20px; border: 1px solid #ddd; border-top: none; border-radius: 0 0 10px 10px;">
-            <p>Dear {booking.full_name},</p>
-            
-            <p>Great news! Your booking has been confirmed by our team.</p>
-            
-            <div style="background: #f8f9fa; padding: 20px; border-radius: 5px; margin: 20px 0;">
-                <h3>Booking Details:</h3>
-                <p><strong>Reference:</strong> {booking.booking_reference}</p>
-                <p><strong>Tour:</strong> {booking.tour.title}</p>
-                <p><strong>Date:</strong> {booking.preferred_date}</p>
-                <p><strong>Time:</strong> {booking.preferred_time or 'To be confirmed'}</p>
-                <p><strong>Travelers:</strong> {booking.number_of_travelers}</p>
-                <p><strong>Total:</strong> ${booking.total_amount}</p>
-            </div>
-            
-            <p>We will contact you soon with more details about your tour.</p>
-            
-            <div style="text-align: center; margin: 20px 0;">
-                <p>Questions? Contact us:</p>
-                <p>📧 <a href="mailto:mimmosafari56@gmail.com">mimmosafari56@gmail.com</a><br>
-                📞 <a href="tel:+201093706046">+20 109 370 6046</a></p>
-            </div>
-            
-            <p>Best regards,<br>NATA STORIA TRAVEL Team</p>
-        </div>
-    </body>
-    </html>
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def admin_bulk_create_bookings(request):
     """
-    
-    plain_content = f"""
-Dear {booking.full_name},
+    Admin endpoint to create many bookings at once, e.g. a partner manifest
 
-Great news! Your booking has been confirmed by our team.
+    Body: {"bookings": [...]} with up to MAX_BULK_BOOKINGS rows, or a CSV/JSON `file` upload.
+    Bad rows are reported by index and do not stop the others; when no row
+    could be created the response is 422 with success false.
+    `send_emails=false` skips the confirmation and owner emails.
+    """
+    # Check if user is admin
+    if not request.user.is_staff:
+        return Response({
+            'error': 'Admin access required'
+        }, status=status.HTTP_403_FORBIDDEN)
 
-Booking Details:
-===============
-Reference: {booking.booking_reference}
-Tour: {booking.tour.title}
-Date: {booking.preferred_date}
-Time: {booking.preferred_time or 'To be confirmed'}
-Travelers: {booking.number_of_travelers}
-Total: ${booking.total_amount}
+    upload = request.FILES.get('file')
+    if upload is not None:
+        file_format = upload.name.rsplit('.', 1)[-1].lower()
+        try:
+            rows = read_manifest(io.TextIOWrapper(upload.file, encoding='utf-8-sig'), file_format)
+        except (ValueError, UnicodeDecodeError) as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        rows = request.data.get('bookings')
+        if not isinstance(rows, list):
+            return Response({
+                'error': 'Expected a list of bookings'
+            }, status=status.HTTP_400_BAD_REQUEST)
 
-We will contact you soon with more details about your tour.
+    if not rows or len(rows) > MAX_BULK_BOOKINGS:
+        return Response({
+            'error': f'Send between 1 and {MAX_BULK_BOOKINGS} bookings'
+        }, status=status.HTTP_400_BAD_REQUEST)
 
-Questions? Contact us:
-Email: mimmosafari56@gmail.com
-Phone: +20 109 370 6046
+    send_emails = str(request.data.get('send_emails', 'true')).lower() not in ('false', '0', 'no')
+    report = BookingImport(rows, send_emails=send_emails).run()
+    # Some rows created: 201 with the failed ones listed; none created: 422 with every row's errors
+    return Response({
+        'success': bool(report['created']),
+        **report
+    }, status=status.HTTP_201_CREATED if report['created'] else status.HTTP_422_UNPROCESSABLE_ENTITY)
 
-Best regards,
-NATA STORIA TRAVEL Team
-    """
+def queue_admin_confirmation_email(booking):
+    """Queue booking confirmation email when admin confirms"""
+    subject = f'Booking Confirmed - {booking.booking_reference}'
     
-    params: resend.Emails.SendParams = {
-        "from": f"NATA STORIA TRAVEL <{settings.DEFAULT_FROM_EMAIL}>",
-        "to": [booking.email],
-        "subject": subject,
-        "html": html_content,
-        "text": plain_content
-    }
+    rendered = render_email('emails/admin_confirmation', booking_email_context(booking))
     
-    response = resend.Emails.send(params)
-    return response and response.get('id') is not None
+    return enqueue_email(
+        to=[booking.email],
+        subject=subject,
+        html=rendered.html,
+        text=rendered.text,
+        kind='booking_admin_confirmation',
+        reference=booking.booking_reference
+    )
 
-def send_admin_decline_email(booking, reason):
-    """Send booking decline email when admin declines using Resend"""
-    resend.api_key = settings.RESEND_API_KEY
-    
+def queue_admin_decline_email(booking, reason):
+    """Queue booking decline email when admin declines"""
     subject = f'Booking Update - {booking.booking_reference}'
     
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <title>Booking Update</title>
-    </head>
-    <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; color: #333;">
-        <div style="background: #dc3545; color: white; padding: 20px; text-align: center; border-radius: 10px 10px 0 0;">
-            <h2 style="margin: 0;">Booking Update</h2>
-        </div>
-        
-        <div style="background: white; padding: 20px; border: 1px solid #ddd; border-top: none; border-radius: 0 0 10px 10px;">
-            <p>Dear {booking.full_name},</p>
-            
-            <p>We regret to inform you that your booking has been cancelled.</p>
-            
-            <div style="background: #f8f9fa; padding: 20px; border-radius: 5px; margin: 20px 0;">
-                <h3>Booking Details:</h3>
-                <p><strong>Reference:</strong> {booking.booking_reference}</p>
-                <p><strong>Tour:</strong> {booking.tour.title}</p>
-                <p><strong>Date:</strong> {booking.preferred_date}</p>
-                <p><strong>Reason:</strong> {reason}</p>
-            </div>
-            
-            <p>If you have any questions, please contact us.</p>
-            
-            <div style="text-align: center; margin: 20px 0;">
-                <p>Questions? Contact us:</p>
-                <p>📧 <a href="mailto:mimmosafari56@gmail.com">mimmosafari56@gmail.com</a><br>
-                📞 <a href="tel:+201093706046">+20 109 370 6046</a></p>
-            </div>
-            
-            <p>Best regards,<br>NATA STORIA TRAVEL Team</p>
-        </div>
-    </body>
-    </html>
-    """
-    
-    plain_content = f"""
-Dear {booking.full_name},
-
-We regret to inform you that your booking has been cancelled.
-
-Booking Details:
-===============
-Reference: {booking.booking_reference}
-Tour: {booking.tour.title}
-Date: {booking.preferred_date}
-Reason: {reason}
-
-If you have any questions, please contact us.
-
-Questions? Contact us:
-Email: mimmosafari56@gmail.com
-Phone: +20 109 370 6046
-
-Best regards,
-NATA STORIA TRAVEL Team
-    """
-    
-    params: resend.Emails.SendParams = {
-        "from": f"NATA STORIA TRAVEL <{settings.DEFAULT_FROM_EMAIL}>",
-        "to": [booking.email],
-        "subject": subject,
-        "html": html_content,
-        "text": plain_content
-    }
+    rendered = render_email('emails/admin_decline', booking_email_context(booking, reason=reason))
     
-    response = resend.Emails.send(params)
-    return response and response.get('id') is not None
+    return enqueue_email(
+        to=[booking.email],
+        subject=subject,
+        html=rendered.html,
+        text=rendered.text,
+        kind='booking_admin_decline',
+        reference=booking.booking_reference
+    )
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -2581,47 +2198,43 @@ def admin_booking_voucher(request, booking_reference):
             'error': 'Admin access required'
         }, status=status.HTTP_403_FORBIDDEN)
     
-    booking = get_object_or_404(Booking, booking_reference=booking_reference)
-    
-    # Use the existing voucher generation code but for admin
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="admin-voucher-{booking.booking_reference}.pdf"'
+    booking = get_object_or_404(Booking.objects.select_related('tour'), booking_reference=booking_reference)
+    return voucher_response(request, booking, 'admin', f"admin-voucher-{booking.booking_reference}.pdf")
 
-    p = canvas.Canvas(response, pagesize=A4)
-    width, height = A4
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_export_vouchers(request):
+    """
+    Admin endpoint to download the vouchers of many bookings at once
 
-    # Header
-    p.setFont("Helvetica-Bold", 20)
-    p.drawString(50, height - 50, "NATA STORIA TRAVEL - ADMIN VOUCHER")
-    
-    p.setFont("Helvetica-Bold", 18)
-    p.drawString(50, height - 80, f"Booking: {booking.booking_reference}")
+    Filters: tour, date_from / date_to (departure date), status (default: all but cancelled).
+    output=zip (default, one PDF per booking) or output=pdf (one merged PDF).
+    """
+    # Check if user is admin
+    if not request.user.is_staff:
+        return Response({
+            'error': 'Admin access required'
+        }, status=status.HTTP_403_FORBIDDEN)
 
-    # Booking details
-    p.setFont("Helvetica", 14)
-    y_pos = height - 120
-    
-    details = [
-        f"Customer: {booking.full_name}",
-        f"Email: {booking.email}",
-        f"Phone: {booking.phone}",
-        f"Tour: {booking.tour.title}",
-        f"Date: {booking.preferred_date}",
-        f"Time: {booking.preferred_time or 'TBD'}",
-        f"Travelers: {booking.number_of_travelers}",
-        f"Status: {booking.booking_status.upper()}",
-        f"Total: ${booking.total_amount}",
-    ]
-    
-    for detail in details:
-        p.drawString(50, y_pos, detail)
-        y_pos -= 25
+    output = request.GET.get('output', 'zip')
+    if output not in EXPORT_OUTPUTS:
+        return Response({
+            'error': f"Invalid output, expected one of: {', '.join(EXPORT_OUTPUTS)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
 
-    # Admin info
-    p.setFont("Helvetica", 10)
-    p.drawString(50, 50, f"Generated by admin: {request.user.username} on {timezone.now().strftime('%Y-%m-%d %H:%M')}")
+    try:
+        bookings = filter_voucher_bookings(Booking.objects.all(), request.GET)
+    except ValueError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
 
-    p.showPage()
-    p.save()
-    
-    return response
\ No newline at end of file
+    export = VoucherExport(bookings)
+    stamp = timezone.now().strftime('%Y%m%d-%H%M')
+    if output == 'pdf':
+        response = StreamingHttpResponse(async_stream(export.stream('pdf')), content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="vouchers-{stamp}.pdf"'
+    else:
+        response = StreamingHttpResponse(async_stream(export.stream('zip')), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="vouchers-{stamp}.zip"'
+    return response
@@ -0,0 +1,326 @@
+# bookings/voucher_export.py
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils.dateparse import parse_date
+from pypdf import PdfReader
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject
+import logging
+import multiprocessing
+import threading
+import time
+import uuid
+import zipfile
+
+from .vouchers import (
+    get_voucher_storage,
+    render_voucher_pdf,
+    voucher_data,
+    voucher_fingerprint,
+    voucher_path,
+)
+
+logger = logging.getLogger(__name__)
+
+EXPORT_OUTPUTS = ('zip', 'pdf')
+
+def filter_voucher_bookings(bookings, params):
+    """
+    Select bookings for a voucher export from query params / command options:
+    tour, date_from / date_to (departure date) and status (defaults to every
+    booking that is not cancelled). Raises ValueError for malformed values.
+    """
+    status_filter = params.get('status') or 'active'
+    if status_filter == 'active':
+        bookings = bookings.exclude(booking_status='cancelled')
+    elif status_filter != 'all':
+        bookings = bookings.filter(booking_status=status_filter)
+
+    tour_id = params.get('tour')
+    if tour_id:
+        try:
+            bookings = bookings.filter(tour_id=uuid.UUID(str(tour_id)))
+        except ValueError:
+            raise ValueError('Invalid tour id')
+
+    for param, lookup in (('date_from', 'preferred_date__gte'), ('date_to', 'preferred_date__lte')):
+        value = params.get(param)
+        if value:
+            try:
+                parsed = parse_date(str(value))
+            except ValueError:
+                parsed = None
+            if not parsed:
+                raise ValueError(f'Invalid {param}, expected YYYY-MM-DD')
+            bookings = bookings.filter(**{lookup: parsed})
+
+    return bookings.select_related('tour').order_by('preferred_date', 'preferred_time', 'booking_reference')
+
+def _render_in_worker(data, variant):
+    # Runs in a child process; only plain data crosses the process boundary
+    return render_voucher_pdf(data, variant)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_export_pool(workers=None):
+    """
+    The render processes shared by every export in this process, started on first use.
+    Children are spawned rather than forked: web workers are threaded, and forking
+    a threaded process can copy locks held by other threads.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=workers or settings.VOUCHER_EXPORT_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+    return _pool
+
+class _StreamBuffer:
+    """Write-only file object that hands written bytes back to a generator"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+# Page attributes a page may inherit from its page tree
+INHERITED_PAGE_KEYS = ('/Resources', '/MediaBox', '/CropBox', '/Rotate')
+
+class MergedPDFWriter:
+    """
+    Concatenate PDFs into one document that is written out as it grows.
+
+    Each page is copied with the objects it uses (content stream, fonts), renumbered
+    into the output. Only object offsets and page numbers are kept until `close`
+    writes the page tree, cross-reference table and trailer.
+    """
+    CATALOG = 1
+    PAGES = 2
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.offsets = {}
+        self.last_number = self.PAGES
+        self.kids = []
+        self.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def write(self, data):
+        self.chunks.append(data)
+        self.position += len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+    def reserve(self):
+        self.last_number += 1
+        return self.last_number
+
+    def write_object(self, number, obj):
+        body = BytesIO()
+        obj.write_to_stream(body)
+        self.offsets[number] = self.position
+        self.write(f'{number} 0 obj\n'.encode() + body.getvalue() + b'\nendobj\n')
+
+    def add_pdf(self, pdf):
+        """Append every page of a PDF; returns the bytes written so far"""
+        for page in PdfReader(BytesIO(pdf)).pages:
+            self.add_page(page)
+        return self.drain()
+
+    def add_page(self, page):
+        numbers = {}
+        queue = []
+
+        def renumber(ref):
+            if ref.idnum not in numbers:
+                numbers[ref.idnum] = self.reserve()
+                queue.append(ref)
+            return IndirectObject(numbers[ref.idnum], 0, None)
+
+        rewritten = set()
+
+        def rewrite(obj):
+            # Point references at the output's object numbers, in place (once per object)
+            if id(obj) in rewritten:
+                return
+            rewritten.add(id(obj))
+            if isinstance(obj, DictionaryObject):
+                items, setitem = list(dict.items(obj)), dict.__setitem__
+            elif isinstance(obj, ArrayObject):
+                items, setitem = list(enumerate(obj)), list.__setitem__
+            else:
+                return
+            for key, value in items:
+                if isinstance(value, IndirectObject):
+                    setitem(obj, key, renumber(value))
+                else:
+                    rewrite(value)
+
+        # Attributes inherited from the source page tree move onto the page itself
+        node = page.get('/Parent')
+        while node is not None:
+            node = node.get_object()
+            for key in INHERITED_PAGE_KEYS:
+                if key in node and key not in page:
+                    dict.__setitem__(page, NameObject(key), dict.__getitem__(node, key))
+            node = node.get('/Parent')
+        dict.pop(page, '/Parent', None)
+
+        number = self.reserve()
+        if page.indirect_reference is not None:
+            numbers[page.indirect_reference.idnum] = number
+        rewrite(page)
+        dict.__setitem__(page, NameObject('/Parent'), IndirectObject(self.PAGES, 0, None))
+        self.write_object(number, page)
+        self.kids.append(number)
+        while queue:
+            ref = queue.pop()
+            obj = ref.get_object()
+            rewrite(obj)
+            self.write_object(numbers[ref.idnum], obj)
+
+    def close(self):
+        """Write the page tree, catalog, cross-reference table and trailer; returns the remaining bytes"""
+        self.write_object(self.PAGES, DictionaryObject({
+            NameObject('/Type'): NameObject('/Pages'),
+            NameObject('/Kids'): ArrayObject(IndirectObject(number, 0, None) for number in self.kids),
+            NameObject('/Count'): NumberObject(len(self.kids)),
+        }))
+        self.write_object(self.CATALOG, DictionaryObject({
+            NameObject('/Type'): NameObject('/Catalog'),
+            NameObject('/Pages'): IndirectObject(self.PAGES, 0, None),
+        }))
+
+        size = self.last_number + 1
+        xref_at = self.position
+        lines = [f'xref\n0 {size}\n', '0000000000 65535 f \n']
+        lines += [f'{self.offsets[number]:010d} 00000 n \n' for number in range(1, size)]
+        lines.append(f'trailer\n<< /Size {size} /Root {self.CATALOG} 0 R >>\nstartxref\n{xref_at}\n%%EOF\n')
+        self.write(''.join(lines).encode())
+        return self.drain()
+
+class VoucherExport:
+    """
+    Stream the vouchers of a set of bookings as a ZIP (one PDF per booking)
+    or as one merged PDF of the same per-booking PDFs. Vouchers come from the
+    voucher cache; missing ones are rendered in the shared process pool and stored.
+    Throughput is logged at the end and kept in `stats`.
+    """
+
+    def __init__(self, bookings, variant='admin', workers=None):
+        self.bookings = bookings
+        self.variant = variant
+        self.workers = workers or settings.VOUCHER_EXPORT_WORKERS
+        self.stats = {'vouchers': 0, 'rendered': 0, 'cached': 0, 'seconds': 0.0}
+
+    def iter_data(self):
+        for booking in self.bookings.iterator(chunk_size=500):
+            yield voucher_data(booking)
+
+    def read_cached(self, data):
+        path = voucher_path(voucher_fingerprint(data, self.variant), self.variant)
+        storage = get_voucher_storage()
+        try:
+            with storage.open(path, 'rb') as f:
+                return f.read()
+        except (FileNotFoundError, OSError):
+            return None
+
+    def store(self, data, pdf):
+        path = voucher_path(voucher_fingerprint(data, self.variant), self.variant)
+        storage = get_voucher_storage()
+        try:
+            if not storage.exists(path):
+                storage.save(path, ContentFile(pdf))
+        except Exception as e:
+            logger.warning(f"Could not cache voucher for {data['booking_reference']}: {e}")
+
+    def iter_pdfs(self):
+        """
+        Yield (data, pdf_bytes) in booking order. At most a few vouchers per
+        worker are in flight, so memory stays flat however many bookings match.
+        """
+        max_in_flight = self.workers * 4
+        pending = deque()
+        for data in self.iter_data():
+            cached = self.read_cached(data)
+            if cached is not None:
+                pending.append((data, cached, None))
+                self.stats['cached'] += 1
+            else:
+                pool = get_export_pool(self.workers)
+                pending.append((data, None, pool.submit(_render_in_worker, data, self.variant)))
+                self.stats['rendered'] += 1
+
+            while pending and (len(pending) >= max_in_flight or pending[0][2] is None):
+                yield self.finish(*pending.popleft())
+
+        while pending:
+            yield self.finish(*pending.popleft())
+
+    def finish(self, data, pdf, future):
+        if future is not None:
+            pdf = future.result()
+            self.store(data, pdf)
+        return data, pdf
+
+    def stream_zip(self):
+        """Yield the bytes of a ZIP archive as each voucher is added"""
+        started = time.perf_counter()
+        buffer = _StreamBuffer()
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for data, pdf in self.iter_pdfs():
+                archive.writestr(f"voucher-{data['booking_reference']}.pdf", pdf)
+                self.stats['vouchers'] += 1
+                yield buffer.drain()
+        yield buffer.drain()
+        self.report(started)
+
+    def stream_merged_pdf(self):
+        """Yield one PDF with every voucher as a page, growing as each voucher is appended"""
+        started = time.perf_counter()
+        writer = MergedPDFWriter()
+        for data, pdf in self.iter_pdfs():
+            yield writer.add_pdf(pdf)
+            self.stats['vouchers'] += 1
+        yield writer.close()
+        self.report(started)
+
+    def stream(self, output):
+        if output == 'pdf':
+            return self.stream_merged_pdf()
+        return self.stream_zip()
+
+    def report(self, started):
+        self.stats['seconds'] = time.perf_counter() - started
+        rate = self.stats['vouchers'] / self.stats['seconds'] if self.stats['seconds'] else 0
+        self.stats['rate'] = rate
+        logger.info(
+            f"Exported {self.stats['vouchers']} vouchers in {self.stats['seconds']:.2f}s "
+            f"({rate:.1f} vouchers/sec, {self.stats['rendered']} rendered, "
+            f"{self.stats['cached']} from cache, {self.workers} workers)"
+        )
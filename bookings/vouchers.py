@@ -0,0 +1,237 @@
+# bookings/vouchers.py
+
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import A4
+import hashlib
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Bump when the voucher layout changes so cached PDFs are regenerated
+VOUCHER_LAYOUT_VERSION = 1
+VOUCHER_VARIANTS = ('customer', 'admin')
+
+def voucher_data(booking):
+    """The booking fields printed on the vouchers; the cache key is derived from these"""
+    return {
+        'booking_reference': booking.booking_reference,
+        'full_name': booking.full_name,
+        'email': booking.email,
+        'phone': booking.phone,
+        'tour_title': booking.tour.title,
+        'tour_location': booking.tour.location,
+        'preferred_date': str(booking.preferred_date),
+        'preferred_time': str(booking.preferred_time) if booking.preferred_time else '',
+        'number_of_travelers': booking.number_of_travelers,
+        'total_amount': str(booking.total_amount),
+        'booking_status': booking.booking_status,
+        'payment_status': booking.get_payment_status_display(),
+    }
+
+def voucher_fingerprint(data, variant):
+    payload = json.dumps([VOUCHER_LAYOUT_VERSION, variant, data], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def voucher_path(fingerprint, variant):
+    return f"vouchers/{variant}/{fingerprint[:2]}/{fingerprint}.pdf"
+
+def draw_customer_voucher(p, data):
+    width, height = A4
+
+    # Header
+    p.setFont("Helvetica-Bold", 20)
+    p.drawString(50, height - 50, "NATA STORIA TRAVEL")
+
+    p.setFont("Helvetica-Bold", 18)
+    p.drawString(50, height - 80, "Tour Booking Voucher")
+
+    # Booking details
+    p.setFont("Helvetica", 14)
+    y_pos = height - 120
+
+    details = [
+        f"Booking Reference: {data['booking_reference']}",
+        f"Customer: {data['full_name']}",
+        f"Email: {data['email']}",
+        f"Tour: {data['tour_title']}",
+        f"Location: {data['tour_location']}",
+        f"Date: {data['preferred_date']}",
+        f"Time: {data['preferred_time'] or 'To be confirmed'}",
+        f"Number of Travelers: {data['number_of_travelers']}",
+    ]
+
+    for detail in details:
+        p.drawString(50, y_pos, detail)
+        y_pos -= 25
+
+    # Price section
+    p.setFont("Helvetica-Bold", 16)
+    y_pos -= 20
+    p.drawString(50, y_pos, f"Total Price: ${data['total_amount']} USD")
+    p.drawString(50, y_pos - 25, f"Payment Status: {data['payment_status']}")
+
+    # Instructions
+    p.setFont("Helvetica", 12)
+    y_pos -= 70
+    instructions = [
+        "IMPORTANT INSTRUCTIONS:",
+        "• Please present this voucher to your tour guide on arrival",
+        "• Arrive 15 minutes before your scheduled time",
+        "• Bring a valid ID for all travelers",
+        "• Contact us if you need to make any changes",
+        "",
+        "Contact Information:",
+        "📧 Email: mimmosafari56@gmail.com",
+        "📞 Phone: +20 109 370 6046",
+        "🌐 Website: www.natastoriatravel.com"
+    ]
+
+    for instruction in instructions:
+        if instruction.startswith("IMPORTANT"):
+            p.setFont("Helvetica-Bold", 12)
+        elif instruction.startswith("Contact"):
+            p.setFont("Helvetica-Bold", 12)
+        else:
+            p.setFont("Helvetica", 11)
+
+        p.drawString(50, y_pos, instruction)
+        y_pos -= 18
+
+    # Footer
+    p.setFont("Helvetica", 10)
+    p.drawString(50, 50, f"Generated on {timezone.now().strftime('%Y-%m-%d %H:%M')} • NATA STORIA TRAVEL Booking System")
+
+def draw_admin_voucher(p, data):
+    width, height = A4
+
+    # Header
+    p.setFont("Helvetica-Bold", 20)
+    p.drawString(50, height - 50, "NATA STORIA TRAVEL - ADMIN VOUCHER")
+
+    p.setFont("Helvetica-Bold", 18)
+    p.drawString(50, height - 80, f"Booking: {data['booking_reference']}")
+
+    # Booking details
+    p.setFont("Helvetica", 14)
+    y_pos = height - 120
+
+    details = [
+        f"Customer: {data['full_name']}",
+        f"Email: {data['email']}",
+        f"Phone: {data['phone']}",
+        f"Tour: {data['tour_title']}",
+        f"Date: {data['preferred_date']}",
+        f"Time: {data['preferred_time'] or 'TBD'}",
+        f"Travelers: {data['number_of_travelers']}",
+        f"Status: {data['booking_status'].upper()}",
+        f"Total: ${data['total_amount']}",
+    ]
+
+    for detail in details:
+        p.drawString(50, y_pos, detail)
+        y_pos -= 25
+
+    # Footer (shared by all admins, so it no longer names the one who downloaded it)
+    p.setFont("Helvetica", 10)
+    p.drawString(50, 50, f"Generated on {timezone.now().strftime('%Y-%m-%d %H:%M')} • NATA STORIA TRAVEL Booking System")
+
+VOUCHER_LAYOUTS = {
+    'customer': draw_customer_voucher,
+    'admin': draw_admin_voucher,
+}
+
+def render_voucher_pdf(data, variant='customer'):
+    """Draw one voucher and return the PDF bytes"""
+    buffer = BytesIO()
+    p = canvas.Canvas(buffer, pagesize=A4)
+    VOUCHER_LAYOUTS[variant](p, data)
+    p.showPage()
+    p.save()
+    return buffer.getvalue()
+
+_storage = None
+
+def get_voucher_storage():
+    """
+    Storage for rendered vouchers, from settings.VOUCHER_STORAGE:
+    'local' (VOUCHER_CACHE_DIR on disk), 'default' (the media storage)
+    or a dotted path to a storage class.
+    """
+    global _storage
+    if _storage is None:
+        name = settings.VOUCHER_STORAGE
+        if name == 'local':
+            _storage = FileSystemStorage(location=settings.VOUCHER_CACHE_DIR)
+        elif name == 'default':
+            _storage = default_storage
+        else:
+            _storage = import_string(name)()
+    return _storage
+
+def store_voucher(data, variant, fingerprint=None):
+    """Render the voucher unless it is already stored. Returns the storage path."""
+    fingerprint = fingerprint or voucher_fingerprint(data, variant)
+    path = voucher_path(fingerprint, variant)
+    storage = get_voucher_storage()
+    if not storage.exists(path):
+        pdf = render_voucher_pdf(data, variant)
+        # Another worker may have stored it meanwhile; the content is equivalent either way
+        if not storage.exists(path):
+            storage.save(path, ContentFile(pdf))
+            logger.info(f"Voucher ({variant}) rendered for booking {data['booking_reference']}")
+    return path
+
+def open_voucher(data, variant, fingerprint=None):
+    """Open the stored voucher, rendering it now if the background worker has not yet"""
+    fingerprint = fingerprint or voucher_fingerprint(data, variant)
+    storage = get_voucher_storage()
+    try:
+        return storage.open(voucher_path(fingerprint, variant), 'rb')
+    except (FileNotFoundError, OSError):
+        return storage.open(store_voucher(data, variant, fingerprint), 'rb')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.VOUCHER_RENDER_WORKERS,
+                thread_name_prefix='voucher-render',
+            )
+    return _executor
+
+def prerender_vouchers(booking_id):
+    """Render every voucher variant for a booking (runs in the worker pool)"""
+    from .models import Booking
+
+    try:
+        booking = Booking.objects.select_related('tour').get(pk=booking_id)
+        data = voucher_data(booking)
+        for variant in VOUCHER_VARIANTS:
+            store_voucher(data, variant)
+    except Booking.DoesNotExist:
+        pass
+    except Exception as e:
+        logger.error(f"Failed to pre-render vouchers for booking {booking_id}: {e}")
+    finally:
+        connections.close_all()
+
+def schedule_voucher_render(booking):
+    """Pre-render the booking's vouchers in the background once the current transaction commits"""
+    if not settings.VOUCHER_PRERENDER:
+        return
+    booking_id = booking.pk
+    transaction.on_commit(lambda: get_executor().submit(prerender_vouchers, booking_id))
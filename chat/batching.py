@@ -0,0 +1,79 @@
+# chat/batching.py
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+INBOX_GROUP = 'admin_inbox'
+PREVIEW_LENGTH = 100
+
+def conversation_group(conversation_id):
+    """Group of the admin sockets that have this conversation open"""
+    return f'conversation_{conversation_id}'
+
+class InboxSummary:
+    """
+    Throttled unread-count deltas for the admin inbox.
+
+    Admin sockets no longer get every message body; they get one `inbox_update`
+    frame per CHAT_INBOX_SUMMARY_WINDOW with, for each conversation that had new
+    user messages, how many arrived and a short preview of the latest. Messages
+    are coalesced per conversation within the window, so a burst in one
+    conversation is a single entry. One summary per process, on the server's event loop.
+    """
+
+    def __init__(self):
+        self.pending = {}
+        self.flush_task = None
+
+    async def add(self, channel_layer, payload):
+        """Count a new user message (its serialized payload) towards the next summary"""
+        conversation_id = payload['conversation']
+        entry = self.pending.setdefault(conversation_id, {'conversation_id': conversation_id, 'unread_delta': 0})
+        entry.update({
+            'unread_delta': entry['unread_delta'] + 1,
+            'user_id': payload['sender'],
+            'sender_name': payload['sender_name'],
+            'last_message': payload['message'][:PREVIEW_LENGTH],
+            'last_message_at': payload['created_at'],
+        })
+
+        window = settings.CHAT_INBOX_SUMMARY_WINDOW
+        if not window:
+            await self.flush(channel_layer)
+        elif self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.ensure_future(self.flush_later(channel_layer, window))
+
+    async def flush_later(self, channel_layer, window):
+        try:
+            await asyncio.sleep(window)
+        finally:
+            # Also when cancelled (loop shutdown or reload), so later messages schedule a new flush
+            if self.flush_task is asyncio.current_task():
+                self.flush_task = None
+        await self.flush(channel_layer)
+
+    async def flush(self, channel_layer):
+        entries, self.pending = list(self.pending.values()), {}
+        if not entries:
+            return
+        text = json.dumps({'type': 'inbox_update', 'conversations': entries})
+        try:
+            await channel_layer.group_send(INBOX_GROUP, {'type': 'chat_message', 'text': text})
+        except Exception as e:
+            logger.error(f"Error sending inbox summary for {len(entries)} conversations: {str(e)}")
+
+inbox_summary = InboxSummary()
+
+def publish_conversation_read(conversation_id):
+    """Tell admin inboxes a conversation has no unread messages any more (from sync code)"""
+    text = json.dumps({'type': 'inbox_update', 'conversations': [{'conversation_id': conversation_id, 'unread_count': 0}]})
+    try:
+        async_to_sync(get_channel_layer().group_send)(INBOX_GROUP, {'type': 'chat_message', 'text': text})
+    except Exception as e:
+        logger.error(f"Error sending inbox read for conversation {conversation_id}: {str(e)}")
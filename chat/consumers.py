@@ -177,12 +177,39 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
 from django.core.exceptions import ObjectDoesNotExist
+from .batching import INBOX_GROUP, conversation_group, inbox_summary
+from .history import history_params, message_page
 from .models import Message, Conversation
 from .serializers import MessageSerializer
 import logging
 
 logger = logging.getLogger(__name__)
 
+def message_payload(message):
+    """The JSON form of a just-saved message; its sender and conversation are already in memory"""
+    sender = message.sender
+    return {
+        'id': message.id,
+        'conversation': message.conversation_id,
+        'message': message.message,
+        'sender': sender.id,
+        'sender_name': sender.get_full_name() or sender.username,
+        'sender_username': sender.username,
+        'sender_email': sender.email,
+        'is_from_admin': message.is_from_admin,
+        'is_read': message.is_read,
+        'created_at': message.created_at.isoformat(),
+    }
+
+def message_frame(payload, is_new_user_message=False):
+    """The WebSocket text frame for a message, encoded once for every recipient"""
+    return json.dumps({
+        'type': 'message',
+        'data': payload,
+        'conversation_id': payload['conversation'],
+        'is_new_user_message': is_new_user_message
+    })
+
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         # Check authentication
@@ -192,11 +219,12 @@ class ChatConsumer(AsyncWebsocketConsumer):
             return
 
         try:
+            self.subscriptions = set()
             if self.scope["user"].is_superuser:
-                # Admin joins admin room to receive all conversation notifications
-                self.room_name = "admin_chat"
+                # Admin joins the inbox summary; conversations are joined when opened
+                self.room_name = INBOX_GROUP
                 await self.channel_layer.group_add(self.room_name, self.channel_name)
-                logger.info(f"Admin user {self.scope['user'].username} joined admin room")
+                logger.info(f"Admin user {self.scope['user'].username} joined admin inbox")
             else:
                 # Regular user joins their personal conversation room
                 self.room_name = f"conversation_user_{self.scope['user'].id}"
@@ -221,6 +249,8 @@ class ChatConsumer(AsyncWebsocketConsumer):
             # Leave room
             if hasattr(self, 'room_name'):
                 await self.channel_layer.group_discard(self.room_name, self.channel_name)
+            for conversation_id in getattr(self, 'subscriptions', ()):
+                await self.channel_layer.group_discard(conversation_group(conversation_id), self.channel_name)
             
             logger.info(f"User {getattr(self.scope.get('user'), 'username', 'Unknown')} disconnected")
         except Exception as e:
@@ -229,6 +259,13 @@ class ChatConsumer(AsyncWebsocketConsumer):
     async def receive(self, text_data):
         try:
             data = json.loads(text_data)
+            if data.get('action') in ('subscribe', 'unsubscribe'):
+                await self.change_subscription(data['action'], data.get('conversation_id'))
+                return
+            if data.get('action') == 'sync':
+                await self.sync(data)
+                return
+
             message_text = data.get('message', '').strip()
             
             if not message_text:
@@ -248,7 +285,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
                     }))
                     return
                 
-                # Save message and get conversation
+                # Save and serialize the message in one database round trip
                 result = await self.save_admin_message(message_text, user_id)
                 if not result:
                     await self.send(text_data=json.dumps({
@@ -257,63 +294,47 @@ class ChatConsumer(AsyncWebsocketConsumer):
                     }))
                     return
                 
-                message, target_user_id = result
-                serialized_message = await self.serialize_message(message)
+                payload, target_user_id = result
+                frame = message_frame(payload)
                 
-                # Send to admin room (for other admins and admin who sent it)
+                # Send to the admins who have this conversation open, the sender included
+                await self.subscribe(payload['conversation'])
                 await self.channel_layer.group_send(
-                    "admin_chat",
-                    {
-                        'type': 'chat_message',
-                        'message': serialized_message,
-                        'conversation_id': message.conversation.id
-                    }
+                    conversation_group(payload['conversation']),
+                    {'type': 'chat_message', 'text': frame}
                 )
                 
                 # Send to target user's room if they're online
                 await self.channel_layer.group_send(
                     f"conversation_user_{target_user_id}",
-                    {
-                        'type': 'chat_message',
-                        'message': serialized_message,
-                        'conversation_id': message.conversation.id
-                    }
+                    {'type': 'chat_message', 'text': frame}
                 )
                 
                 logger.info(f"Admin message sent to user {target_user_id}")
                 
             else:
                 # Regular user sending message to support
-                message = await self.save_user_message(message_text)
-                if not message:
+                payload = await self.save_user_message(message_text)
+                if not payload:
                     await self.send(text_data=json.dumps({
                         'type': 'error',
                         'error': 'Failed to save message'
                     }))
                     return
                 
-                serialized_message = await self.serialize_message(message)
-                
                 # Send to user's own room (confirmation)
                 await self.channel_layer.group_send(
                     f"conversation_user_{self.scope['user'].id}",
-                    {
-                        'type': 'chat_message',
-                        'message': serialized_message,
-                        'conversation_id': message.conversation.id
-                    }
+                    {'type': 'chat_message', 'text': message_frame(payload)}
                 )
                 
-                # Send to admin room (notification for all admins)
+                # Full message to the admins who have this conversation open,
+                # an unread delta to every admin inbox
                 await self.channel_layer.group_send(
-                    "admin_chat",
-                    {
-                        'type': 'chat_message',
-                        'message': serialized_message,
-                        'conversation_id': message.conversation.id,
-                        'is_new_user_message': True
-                    }
+                    conversation_group(payload['conversation']),
+                    {'type': 'chat_message', 'text': message_frame(payload, is_new_user_message=True)}
                 )
+                await inbox_summary.add(self.channel_layer, payload)
                 
                 logger.info(f"User message from {self.scope['user'].username} sent to admins")
 
@@ -330,9 +351,77 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 'error': f'Server error: {str(e)}'
             }))
 
+    async def subscribe(self, conversation_id):
+        if conversation_id not in self.subscriptions:
+            self.subscriptions.add(conversation_id)
+            await self.channel_layer.group_add(conversation_group(conversation_id), self.channel_name)
+
+    async def change_subscription(self, action, conversation_id):
+        """Admins open and close conversations; only open ones stream full messages"""
+        if not self.scope["user"].is_superuser:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'error': 'Only admins can subscribe to conversations'
+            }))
+            return
+        try:
+            conversation_id = int(conversation_id)
+        except (TypeError, ValueError):
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'error': 'conversation_id is required'
+            }))
+            return
+
+        if action == 'subscribe':
+            await self.subscribe(conversation_id)
+        elif conversation_id in self.subscriptions:
+            self.subscriptions.discard(conversation_id)
+            await self.channel_layer.group_discard(conversation_group(conversation_id), self.channel_name)
+        await self.send(text_data=json.dumps({
+            'type': f'{action}d',
+            'conversation_id': conversation_id
+        }))
+
+    async def sync(self, data):
+        """
+        Messages after the last id a reconnecting client has seen, so it does not reload
+        the whole thread. Sent again with the last id received while has_more is true.
+        """
+        try:
+            _, after, limit = history_params({'after': data.get('after') or 0, 'limit': data.get('limit')})
+            conversation_id = int(data['conversation_id']) if self.scope["user"].is_superuser else None
+        except (KeyError, TypeError, ValueError):
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'error': 'sync needs an integer after (and conversation_id for admins)'
+            }))
+            return
+
+        result = await self.missed_messages(conversation_id, after, limit)
+        if result is None:
+            await self.send(text_data=json.dumps({
+                'type': 'sync',
+                'conversation_id': None,
+                'messages': [],
+                'has_more': False
+            }))
+            return
+        conversation_id, payloads, has_more = result
+        await self.send(text_data=json.dumps({
+            'type': 'sync',
+            'conversation_id': conversation_id,
+            'messages': payloads,
+            'has_more': has_more
+        }))
+
     async def chat_message(self, event):
-        """Send message to WebSocket"""
+        """Send message to WebSocket; the frame arrives already encoded"""
         try:
+            if 'text' in event:
+                await self.send(text_data=event['text'])
+                return
+            # Events from processes still running the previous release
             await self.send(text_data=json.dumps({
                 'type': 'message',
                 'data': event['message'],
@@ -342,6 +431,18 @@ class ChatConsumer(AsyncWebsocketConsumer):
         except Exception as e:
             logger.error(f"Error sending chat message: {str(e)}")
 
+    @database_sync_to_async
+    def missed_messages(self, conversation_id, after, limit):
+        """(conversation id, payloads, has_more); users always read their own conversation"""
+        if conversation_id is None:
+            conversation_id = Conversation.objects.filter(
+                user=self.scope["user"]
+            ).values_list('id', flat=True).first()
+            if conversation_id is None:
+                return None
+        messages, has_more = message_page(conversation_id, after=after, limit=limit)
+        return conversation_id, [message_payload(message) for message in messages], has_more
+
     @database_sync_to_async
     def save_user_message(self, message_text):
         """Save message from user to support"""
@@ -359,7 +460,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
             )
             
             logger.info(f"User message saved: ID {message.id} from {self.scope['user'].username}")
-            return message
+            return message_payload(message)
         except Exception as e:
             logger.error(f"Error saving user message: {str(e)}")
             return None
@@ -387,27 +488,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
             )
             
             logger.info(f"Admin message saved: ID {message.id} to user {target_user.username}")
-            return message, user_id
+            return message_payload(message), user_id
         except Exception as e:
             logger.error(f"Error saving admin message: {str(e)}")
             return None
-
-    @database_sync_to_async
-    def serialize_message(self, message):
-        """Serialize message for JSON response"""
-        try:
-            return {
-                'id': message.id,
-                'conversation': message.conversation.id,
-                'message': message.message,
-                'sender': message.sender.id,
-                'sender_name': message.sender.get_full_name() or message.sender.username,
-                'sender_username': message.sender.username,
-                'sender_email': message.sender.email,
-                'is_from_admin': message.is_from_admin,
-                'is_read': message.is_read,
-                'created_at': message.created_at.isoformat(),
-            }
-        except Exception as e:
-            logger.error(f"Error serializing message: {str(e)}")
-            return None
\ No newline at end of file
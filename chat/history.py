@@ -0,0 +1,36 @@
+# chat/history.py
+
+from .models import Message
+
+HISTORY_LIMIT = 50  # Messages per page unless the client asks for fewer
+MAX_HISTORY_LIMIT = 200
+
+def history_params(params):
+    """(before, after, limit) from query or WebSocket parameters; raises ValueError"""
+    try:
+        before = int(params['before']) if params.get('before') not in (None, '') else None
+        after = int(params['after']) if params.get('after') not in (None, '') else None
+        limit = int(params.get('limit') or HISTORY_LIMIT)
+    except (TypeError, ValueError):
+        raise ValueError('before, after and limit must be integers')
+    if before is not None and after is not None:
+        raise ValueError('Use either before or after, not both')
+    return before, after, max(1, min(limit, MAX_HISTORY_LIMIT))
+
+def message_page(conversation_id, before=None, after=None, limit=HISTORY_LIMIT):
+    """
+    One page of a conversation, oldest message first, and whether more exist past it.
+
+    `after` pages forwards from a message id (catching up after a reconnect);
+    otherwise the page is the newest messages, or the newest ones older than `before`.
+    Each page is one range scan of the (conversation, id) index, however long the thread.
+    """
+    messages = Message.objects.filter(conversation_id=conversation_id).select_related('sender')
+    if after is not None:
+        rows = list(messages.filter(id__gt=after).order_by('id')[:limit + 1])
+        return rows[:limit], len(rows) > limit
+
+    if before is not None:
+        messages = messages.filter(id__lt=before)
+    rows = list(messages.order_by('-id')[:limit + 1])
+    return rows[:limit][::-1], len(rows) > limit
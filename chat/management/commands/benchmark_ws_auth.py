@@ -0,0 +1,53 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken, UntypedToken
+
+from chat.middleware import resolve_user
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Compare WebSocket handshake authentication per second with and without the cached user lookup'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--handshakes', type=int, default=2000, help='Handshakes per mode')
+        parser.add_argument('--users', type=int, default=20, help='Distinct users (tokens) reconnecting')
+
+    def uncached_resolve(self, token_key):
+        # The handshake before caching: the token decoded twice and the user read every time
+        UntypedToken(token_key)
+        return User.objects.get(id=UntypedToken(token_key)['user_id'])
+
+    def measure(self, resolve, tokens, handshakes):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for n in range(handshakes):
+                resolve(tokens[n % len(tokens)])
+            seconds = time.perf_counter() - start
+        return handshakes / seconds, len(queries)
+
+    def handle(self, *args, **options):
+        users = list(User.objects.filter(is_active=True)[:options['users']])
+        if not users:
+            raise CommandError('Needs at least one active user')
+        tokens = [str(AccessToken.for_user(user)) for user in users]
+        handshakes = options['handshakes']
+
+        # Warm the cache the way the first connection after a deploy does
+        for token in tokens:
+            resolve_user(token)
+
+        results = [
+            ('decode twice + DB', *self.measure(self.uncached_resolve, tokens, handshakes)),
+            ('decode once + cache', *self.measure(resolve_user, tokens, handshakes)),
+        ]
+        self.stdout.write(f"{'mode':<22}{'handshakes/sec':>16}{'queries':>10}")
+        for name, rate, queries in results:
+            self.stdout.write(f"{name:<22}{rate:>16.1f}{queries:>10}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{results[1][1] / results[0][1]:.1f}x the handshakes for {len(tokens)} users reconnecting"
+        ))
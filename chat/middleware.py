@@ -1,21 +1,122 @@
 from channels.middleware import BaseMiddleware
 from channels.db import database_sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import UntypedToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from django.contrib.auth import get_user_model
 from urllib.parse import parse_qs
+import logging
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
 
 User = get_user_model()
 
-@database_sync_to_async
-def get_user(token_key):
+# What the consumers read from scope['user']; never the password hash or the rest of the profile
+CACHED_USER_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
+
+class CachedUsers:
+    """
+    Users resolved from WebSocket tokens, cached per (user id, token jti).
+
+    Entries carry the user's version stamp; saving or deleting the user replaces
+    the stamp (see chat/signals.py), which retires every entry of that user at once.
+    The stamp and the entry are fetched together, so a cached handshake costs one
+    cache round trip and no database query. If the cache fails, users come from
+    the database until it has been left alone for CHAT_USER_CACHE_RETRY_AFTER.
+
+    Only CACHED_USER_FIELDS are stored; the user comes back as an instance with
+    the other fields deferred, so it still works as a foreign key value.
+    """
+
+    def __init__(self):
+        self.down_until = 0
+        # In model order, as Model.from_db expects the values
+        self.fields = [field.attname for field in User._meta.concrete_fields if field.attname in CACHED_USER_FIELDS]
+
+    def version_key(self, user_id):
+        return f'ws_user_version:{user_id}'
+
+    def entry_key(self, user_id, jti):
+        return f'ws_user:{user_id}:{jti}'
+
+    def available(self):
+        return time.monotonic() >= self.down_until
+
+    def failed(self, e):
+        logger.error(f"WebSocket user cache unavailable: {e}")
+        self.down_until = time.monotonic() + settings.CHAT_USER_CACHE_RETRY_AFTER
+
+    def get(self, user_id, jti):
+        """(user or None, version stamp to store a fresh entry under)"""
+        if not self.available():
+            return None, None
+        version_key = self.version_key(user_id)
+        try:
+            found = cache.get_many([version_key, self.entry_key(user_id, jti)])
+            version = found.get(version_key)
+            if version is None:
+                version = uuid.uuid4().hex[:12]
+                cache.add(version_key, version, timeout=None)
+                return None, version
+        except Exception as e:
+            self.failed(e)
+            return None, None
+        entry = found.get(self.entry_key(user_id, jti))
+        if entry and entry[0] == version:
+            return User.from_db(DEFAULT_DB_ALIAS, self.fields, entry[1]), version
+        return None, version
+
+    def set(self, user_id, jti, version, user, timeout):
+        if version is None or timeout <= 0:
+            return
+        try:
+            values = tuple(getattr(user, name) for name in self.fields)
+            cache.set(self.entry_key(user_id, jti), (version, values), timeout=timeout)
+        except Exception as e:
+            self.failed(e)
+
+    def invalidate(self, user_id):
+        try:
+            cache.set(self.version_key(user_id), uuid.uuid4().hex[:12], timeout=None)
+        except Exception as e:
+            logger.error(f"Could not invalidate cached WebSocket user {user_id}: {e}")
+
+cached_users = CachedUsers()
+
+def resolve_user(token_key):
+    """
+    The active user a JWT belongs to, or AnonymousUser.
+    The token is decoded and its signature and expiry checked once, in process;
+    the user comes from the cache when this token was seen recently.
+    """
     try:
-        UntypedToken(token_key)
-        user = User.objects.get(id=UntypedToken(token_key)['user_id'])
-        return user
-    except (InvalidToken, TokenError, User.DoesNotExist):
+        token = UntypedToken(token_key)
+    except (InvalidToken, TokenError):
         return AnonymousUser()
+    user_id = token.get(api_settings.USER_ID_CLAIM)
+    jti = token.get(api_settings.JTI_CLAIM)
+    if user_id is None:
+        return AnonymousUser()
+
+    user, version = cached_users.get(user_id, jti) if jti else (None, None)
+    if user is None:
+        user = User.objects.only(*cached_users.fields).filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is None or not user.is_active:
+            return AnonymousUser()
+        # Never outlive the token itself
+        expires_in = int(token['exp'] - time.time())
+        cached_users.set(user_id, jti, version, user, min(settings.CHAT_USER_CACHE_TIMEOUT, expires_in))
+    return user
+
+@database_sync_to_async
+def get_user(token_key):
+    return resolve_user(token_key)
 
 class JWTAuthMiddleware(BaseMiddleware):
     def __init__(self, inner):
@@ -28,4 +129,4 @@ class JWTAuthMiddleware(BaseMiddleware):
             scope["user"] = await get_user(token[0])
         else:
             scope["user"] = AnonymousUser()
-        return await super().__call__(scope, receive, send)
\ No newline at end of file
+        return await super().__call__(scope, receive, send)
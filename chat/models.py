@@ -23,7 +23,8 @@
 #         super().save(*args, **kwargs)
 
 # models.py
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
@@ -48,18 +49,40 @@ class Conversation(models.Model):
     def update_last_message(self, message_text):
         """Update the last message and timestamp"""
         self.last_message = message_text
-        self.last_message_at = timezone.now()
-        self.save()
+        self.last_message_at = self.updated_at = timezone.now()
+        Conversation.objects.filter(pk=self.pk).update(
+            last_message=self.last_message, last_message_at=self.last_message_at, updated_at=self.updated_at
+        )
 
     def mark_as_read(self):
         """Mark conversation as read (reset unread count)"""
         self.unread_count = 0
-        self.save()
+        self.updated_at = timezone.now()
+        Conversation.objects.filter(pk=self.pk).update(unread_count=0, updated_at=self.updated_at)
 
     def increment_unread(self):
         """Increment unread count when user sends a message"""
+        Conversation.objects.filter(pk=self.pk).update(unread_count=F('unread_count') + 1, updated_at=timezone.now())
         self.unread_count += 1
-        self.save()
+
+    def record_message(self, message):
+        """
+        Make `message` the last one, counting it as unread unless an admin sent it.
+        One UPDATE; the counter is incremented in SQL so concurrent messages all count.
+        """
+        changes = {
+            'last_message': message.message,
+            'last_message_at': message.created_at,
+            'updated_at': message.created_at,
+        }
+        if not message.is_from_admin:
+            changes['unread_count'] = F('unread_count') + 1
+        Conversation.objects.filter(pk=self.pk).update(**changes)
+
+        self.last_message = message.message
+        self.last_message_at = self.updated_at = message.created_at
+        if not message.is_from_admin:
+            self.unread_count += 1
 
 
 class Message(models.Model):
@@ -73,17 +96,23 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # History pages and reconnect syncs are id ranges within a conversation
+            models.Index(fields=['conversation', 'id'], name='message_conversation_id_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         # Set is_from_admin based on sender
         self.is_from_admin = self.sender.is_superuser
-        super().save(*args, **kwargs)
-        
-        # Update conversation
-        self.conversation.update_last_message(self.message)
-        if not self.is_from_admin:
-            # User sent message, increment unread for admin
-            self.conversation.increment_unread()
+        if not self._state.adding:
+            # Edits leave the conversation's last message and unread count alone
+            super().save(*args, **kwargs)
+            return
+
+        # The message and the conversation's summary commit together
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.conversation.record_message(self)
 
     def __str__(self):
         return f"Message from {self.sender.username}: {self.message[:50]}..."
\ No newline at end of file
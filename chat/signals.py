@@ -0,0 +1,20 @@
+# chat/signals.py
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .middleware import cached_users
+
+User = get_user_model()
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_websocket_user(sender, instance, raw=False, **kwargs):
+    """Profile changes, deactivation and deletion all apply to the next handshake"""
+    if raw:
+        return
+    user_id = instance.pk
+    # After commit, so a handshake in between cannot cache the old row under the new stamp
+    transaction.on_commit(lambda: cached_users.invalidate(user_id))
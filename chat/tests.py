@@ -1,3 +1,366 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import json
+import threading
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+
+from django.db import connection, connections
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import User
+from .batching import INBOX_GROUP, InboxSummary, publish_conversation_read
+from .consumers import ChatConsumer
+from .middleware import cached_users, resolve_user
+from .models import Conversation, Message
+
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+IN_MEMORY_LAYER = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+def make_user(name, **extra):
+    return User.objects.create_user(
+        email=f'{name}@example.com', username=name, password='pw12345!x', first_name=name, last_name='Test', **extra
+    )
+
+class MessageWriteTests(TestCase):
+    """Saving a message is one insert and one UPDATE of the conversation"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user('traveler')
+        cls.admin = make_user('support', is_superuser=True)
+        cls.conversation = Conversation.objects.create(user=cls.user)
+
+    def test_user_message(self):
+        with CaptureQueriesContext(connection) as queries:
+            Message.objects.create(conversation=self.conversation, sender=self.user, message='Hello')
+        writes = [query['sql'].split()[0] for query in queries if query['sql'].split()[0] in ('INSERT', 'UPDATE')]
+        self.assertEqual(writes, ['INSERT', 'UPDATE'])
+
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.last_message, 'Hello')
+        self.assertEqual(self.conversation.unread_count, 1)
+
+    def test_admin_message_is_not_unread(self):
+        Message.objects.create(conversation=self.conversation, sender=self.admin, message='Hi, how can we help?')
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.last_message, 'Hi, how can we help?')
+        self.assertEqual(self.conversation.unread_count, 0)
+
+class ConcurrentMessageTests(TransactionTestCase):
+    """Messages sent at the same time must all be counted as unread"""
+
+    SENDERS = 8
+
+    def test_parallel_sends_count_every_message(self):
+        user = make_user('traveler')
+        conversation = Conversation.objects.create(user=user)
+        barrier = threading.Barrier(self.SENDERS)
+        errors = []
+        # SQLite's shared in-memory test database refuses concurrent writers; there the
+        # inserts take turns, still each from a stale copy. Postgres runs them in parallel.
+        write_lock = threading.Lock() if connection.vendor == 'sqlite' else contextlib.nullcontext()
+
+        def send(number):
+            try:
+                # Every sender holds its own, soon stale, copy of the conversation
+                stale = Conversation.objects.get(pk=conversation.pk)
+                barrier.wait()
+                with write_lock:
+                    Message.objects.create(conversation=stale, sender=user, message=f'Message {number}')
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=send, args=(number,)) for number in range(self.SENDERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.unread_count, self.SENDERS)
+        self.assertEqual(conversation.messages.count(), self.SENDERS)
+
+@override_settings(CACHES=LOCAL_CACHE)
+class WebSocketAuthTests(TestCase):
+    """A reconnect with a known token must not touch the database, yet see user changes"""
+
+    def setUp(self):
+        self.user = make_user('traveler')
+        self.token = str(AccessToken.for_user(self.user))
+        resolve_user(self.token)
+
+    def test_cached_handshake_runs_no_queries(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_user(self.token), self.user)
+
+    def test_cache_holds_only_what_the_consumers_read(self):
+        token = AccessToken(self.token)
+        _, entry = cache.get(cached_users.entry_key(self.user.pk, token['jti']))
+        self.assertNotIn(self.user.password, entry)
+        with self.assertNumQueries(0):
+            user = resolve_user(self.token)
+            self.assertEqual(
+                (user.pk, user.username, user.get_full_name(), user.is_authenticated, user.is_superuser),
+                (self.user.pk, 'traveler', 'traveler Test', True, False),
+            )
+        self.assertIn('password', user.get_deferred_fields())
+
+    def test_deactivation_applies_to_next_handshake(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertIsInstance(resolve_user(self.token), AnonymousUser)
+
+    def test_invalid_token(self):
+        with self.assertNumQueries(0):
+            self.assertIsInstance(resolve_user(self.token[:-2] + 'xx'), AnonymousUser)
+
+class MessageHistoryTests(TestCase):
+    """History is served in keyset pages of the (conversation, id) index"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user('traveler')
+        cls.conversation = Conversation.objects.create(user=cls.user)
+        cls.ids = [
+            Message.objects.create(conversation=cls.conversation, sender=cls.user, message=f'Message {number}').id
+            for number in range(5)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def page(self, **params):
+        response = self.client.get(reverse('get_my_messages'), params)
+        self.assertEqual(response.status_code, 200)
+        return [message['id'] for message in response.data['data']], response.data['has_more']
+
+    def test_pages_back_from_the_latest(self):
+        self.assertEqual(self.page(limit=2), (self.ids[3:], True))
+        self.assertEqual(self.page(limit=2, before=self.ids[3]), (self.ids[1:3], True))
+        self.assertEqual(self.page(limit=2, before=self.ids[1]), (self.ids[:1], False))
+
+    def test_after_returns_only_newer_messages(self):
+        self.assertEqual(self.page(after=self.ids[2]), (self.ids[3:], False))
+        self.assertEqual(self.page(after=self.ids[-1]), ([], False))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('get_my_messages'), {'before': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_reading_does_not_create_a_conversation(self):
+        self.client.force_authenticate(make_user('newcomer'))
+        response = self.client.get(reverse('get_my_messages'))
+        self.assertEqual((response.data['data'], response.data['conversation']), ([], None))
+        self.assertEqual(Conversation.objects.count(), 1)
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER, CHAT_INBOX_SUMMARY_WINDOW=0)
+class ConsumerTestCase(TransactionTestCase):
+    """Sockets of a traveler and a support admin on the in-memory channel layer"""
+
+    def setUp(self):
+        self.user = make_user('traveler')
+        self.admin = make_user('support', is_superuser=True)
+
+    async def connect(self, user):
+        communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), '/ws/chat/')
+        communicator.scope['user'] = user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual((await communicator.receive_json_from())['type'], 'connection_established')
+        return communicator
+
+    async def send(self, communicator, **data):
+        await communicator.send_json_to(data)
+        return await communicator.receive_json_from()
+
+class AdminInboxTests(ConsumerTestCase):
+    """Admins get unread summaries; full messages only for the conversations they opened"""
+
+    async def test_subscribed_admin_gets_full_messages(self):
+        admin = await self.connect(self.admin)
+        user = await self.connect(self.user)
+        await self.send(user, message='Hello')  # Own copy
+        # Not subscribed yet: the summary only
+        self.assertEqual((await admin.receive_json_from())['type'], 'inbox_update')
+        self.assertTrue(await admin.receive_nothing())
+
+        conversation = await database_sync_to_async(Conversation.objects.get)(user=self.user)
+        self.assertEqual(await self.send(admin, action='subscribe', conversation_id=conversation.id),
+                         {'type': 'subscribed', 'conversation_id': conversation.id})
+
+        await self.send(user, message='Anyone there?')
+        frames = [await admin.receive_json_from(), await admin.receive_json_from()]
+        self.assertEqual(sorted(frame['type'] for frame in frames), ['inbox_update', 'message'])
+        message = next(frame for frame in frames if frame['type'] == 'message')
+        self.assertEqual((message['data']['message'], message['is_new_user_message']), ('Anyone there?', True))
+
+        self.assertEqual((await self.send(admin, action='unsubscribe', conversation_id=conversation.id))['type'],
+                         'unsubscribed')
+        await self.send(user, message='Hello?')
+        self.assertEqual((await admin.receive_json_from())['type'], 'inbox_update')
+        self.assertTrue(await admin.receive_nothing())
+        await admin.disconnect()
+        await user.disconnect()
+
+    async def test_users_cannot_subscribe(self):
+        user = await self.connect(self.user)
+        response = await self.send(user, action='subscribe', conversation_id=1)
+        self.assertEqual(response, {'type': 'error', 'error': 'Only admins can subscribe to conversations'})
+        await user.disconnect()
+
+    @override_settings(CHAT_INBOX_SUMMARY_WINDOW=0.2)
+    async def test_summary_coalesces_a_burst_per_conversation(self):
+        admin = await self.connect(self.admin)
+        user = await self.connect(self.user)
+        for number in range(3):
+            await self.send(user, message=f'Message {number}')
+
+        summary = await admin.receive_json_from(timeout=2)
+        self.assertEqual(summary['type'], 'inbox_update')
+        [entry] = summary['conversations']
+        self.assertEqual((entry['unread_delta'], entry['last_message'], entry['user_id']), (3, 'Message 2', self.user.id))
+        self.assertTrue(await admin.receive_nothing(timeout=0.3))
+        await admin.disconnect()
+        await user.disconnect()
+
+    async def test_conversation_read_reaches_admin_inboxes(self):
+        admin = await self.connect(self.admin)
+        await sync_to_async(publish_conversation_read)(42)
+        self.assertEqual(await admin.receive_json_from(), {
+            'type': 'inbox_update', 'conversations': [{'conversation_id': 42, 'unread_count': 0}],
+        })
+        await admin.disconnect()
+
+    async def test_cancelled_flush_does_not_stop_later_summaries(self):
+        summary = InboxSummary()
+        layer = get_channel_layer()
+        channel = await layer.new_channel()
+        await layer.group_add(INBOX_GROUP, channel)
+        payload = {'conversation': 7, 'sender': 1, 'sender_name': 'traveler', 'message': 'Hi', 'created_at': 'now'}
+
+        with override_settings(CHAT_INBOX_SUMMARY_WINDOW=60):
+            await summary.add(layer, payload)
+            await asyncio.sleep(0)
+            summary.flush_task.cancel()
+            await asyncio.sleep(0)
+            self.assertIsNone(summary.flush_task)
+            # Cancelled before it ever ran (it never reaches its finally)
+            await summary.add(layer, payload)
+            summary.flush_task.cancel()
+            await asyncio.sleep(0)
+
+        with override_settings(CHAT_INBOX_SUMMARY_WINDOW=0.01):
+            await summary.add(layer, payload)
+        event = await asyncio.wait_for(layer.receive(channel), 1)
+        self.assertEqual(json.loads(event['text'])['conversations'][0]['unread_delta'], 3)
+
+class MessageFrameTests(ConsumerTestCase):
+    """A message is serialized once when saved and forwarded to every socket as the same text"""
+
+    async def user_message_frames(self, text):
+        tabs = [await self.connect(self.user), await self.connect(self.user)]
+        await tabs[0].send_json_to({'message': text})
+        frames = [await tab.receive_from() for tab in tabs]
+        for tab in tabs:
+            await tab.disconnect()
+        return frames
+
+    def test_one_save_one_frame_no_more_queries(self):
+        Conversation.objects.create(user=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            frames = async_to_sync(self.user_message_frames)('Hello')
+
+        # Conversation lookup, message insert, conversation update; nothing re-read to build the frame
+        statements = [query['sql'].split()[0] for query in queries]
+        self.assertEqual([word for word in statements if word in ('SELECT', 'INSERT', 'UPDATE')], ['SELECT', 'INSERT', 'UPDATE'])
+        self.assertEqual(frames[0], frames[1])
+        frame = json.loads(frames[0])
+        message = Message.objects.get()
+        self.assertEqual(frame['type'], 'message')
+        self.assertEqual((frame['data']['id'], frame['data']['message'], frame['conversation_id']),
+                         (message.id, 'Hello', message.conversation_id))
+
+    async def test_events_from_the_previous_release_are_still_delivered(self):
+        user = await self.connect(self.user)
+        await get_channel_layer().group_send(f'conversation_user_{self.user.id}', {
+            'type': 'chat_message', 'message': {'id': 1, 'message': 'Hello'}, 'conversation_id': 3,
+        })
+        self.assertEqual(await user.receive_json_from(), {
+            'type': 'message', 'data': {'id': 1, 'message': 'Hello'}, 'conversation_id': 3, 'is_new_user_message': False,
+        })
+        await user.disconnect()
+
+class SyncCommandTests(ConsumerTestCase):
+    """The WebSocket sync command pages forward from the last message a client saw"""
+
+    def setUp(self):
+        super().setUp()
+        conversation = Conversation.objects.create(user=self.user)
+        self.conversation_id = conversation.id
+        self.ids = [
+            Message.objects.create(conversation=conversation, sender=self.user, message=f'Message {number}').id
+            for number in range(5)
+        ]
+        other = Conversation.objects.create(user=make_user('stranger'))
+        self.other_id = other.id
+        Message.objects.create(conversation=other, sender=other.user, message='Not yours')
+
+    def sync(self, communicator, **data):
+        return self.send(communicator, action='sync', **data)
+
+    async def test_user_pages_through_own_conversation(self):
+        user = await self.connect(self.user)
+        page = await self.sync(user, after=self.ids[1], limit=2)
+        self.assertEqual(page['type'], 'sync')
+        self.assertEqual(page['conversation_id'], self.conversation_id)
+        self.assertEqual(([message['id'] for message in page['messages']], page['has_more']), (self.ids[2:4], True))
+
+        page = await self.sync(user, after=self.ids[3], limit=2)
+        self.assertEqual(([message['id'] for message in page['messages']], page['has_more']), (self.ids[4:], False))
+        await user.disconnect()
+
+    async def test_user_cannot_sync_another_conversation(self):
+        user = await self.connect(self.user)
+        page = await self.sync(user, conversation_id=self.other_id)
+        self.assertEqual(page['conversation_id'], self.conversation_id)
+        self.assertEqual([message['id'] for message in page['messages']], self.ids)
+        await user.disconnect()
+
+    async def test_user_without_a_conversation_gets_an_empty_sync(self):
+        newcomer = await database_sync_to_async(make_user)('newcomer')
+        socket = await self.connect(newcomer)
+        self.assertEqual(await self.sync(socket, after=0), {
+            'type': 'sync', 'conversation_id': None, 'messages': [], 'has_more': False,
+        })
+        await socket.disconnect()
+
+    async def test_admin_sync_needs_a_conversation(self):
+        admin = await self.connect(self.admin)
+        self.assertEqual((await self.sync(admin, after=0))['type'], 'error')
+
+        page = await self.sync(admin, conversation_id=self.other_id)
+        self.assertEqual(page['conversation_id'], self.other_id)
+        self.assertEqual([message['message'] for message in page['messages']], ['Not yours'])
+        await admin.disconnect()
+
+    async def test_invalid_after(self):
+        user = await self.connect(self.user)
+        self.assertEqual((await self.sync(user, after='abc'))['type'], 'error')
+        await user.disconnect()
 
-# Create your tests here.
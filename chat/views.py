@@ -181,6 +181,8 @@ from django.db.models import Q
 from django.shortcuts import get_object_or_404
 import logging
 
+from .batching import publish_conversation_read
+from .history import history_params, message_page
 from .models import Message, Conversation
 from .serializers import (
     MessageSerializer, 
@@ -308,7 +310,18 @@ def get_conversations(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_conversation_messages(request, conversation_id=None):
-    """Get messages for a specific conversation"""
+    """
+    Get one page of messages for a conversation, oldest first.
+    ?before=<id> pages back through older messages, ?after=<id> fetches newer ones; limit defaults to 50.
+    """
+    try:
+        before, after, limit = history_params(request.query_params)
+    except ValueError as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
     if request.user.is_superuser:
         # Admin can view any conversation
         if not conversation_id:
@@ -317,21 +330,30 @@ def get_conversation_messages(request, conversation_id=None):
                 'error': 'conversation_id is required for admin'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        conversation = get_object_or_404(Conversation, id=conversation_id)
-        # Mark conversation as read when admin views it
-        conversation.mark_as_read()
+        conversation = get_object_or_404(Conversation.objects.select_related('user'), id=conversation_id)
+        # Mark conversation as read when admin views it (and update the other admins' inboxes)
+        if conversation.unread_count:
+            conversation.mark_as_read()
+            publish_conversation_read(conversation.id)
     else:
-        # User can only view their own conversation
-        conversation, created = Conversation.objects.get_or_create(
-            user=request.user
-        )
+        # User can only view their own conversation; reading it does not create one
+        conversation = Conversation.objects.filter(user=request.user).select_related('user').first()
+        if conversation is None:
+            return Response({
+                'success': True,
+                'data': [],
+                'has_more': False,
+                'conversation': None
+            })
     
-    messages = conversation.messages.all().select_related('sender')
+    messages, has_more = message_page(conversation.id, before=before, after=after, limit=limit)
     serializer = MessageSerializer(messages, many=True)
     
     return Response({
         'success': True,
         'data': serializer.data,
+        # Older messages remain unless paging forwards, newer ones when it is
+        'has_more': has_more,
         'conversation': ConversationSerializer(conversation).data
     })
 
@@ -377,7 +399,9 @@ def mark_messages_read(request):
         conversation_id = request.data.get('conversation_id')
         if conversation_id:
             conversation = get_object_or_404(Conversation, id=conversation_id)
-            conversation.mark_as_read()
+            if conversation.unread_count:
+                conversation.mark_as_read()
+                publish_conversation_read(conversation.id)
             # Also mark individual messages as read
             conversation.messages.filter(is_read=False).update(is_read=True)
     else:
@@ -417,7 +441,7 @@ def delete_message(request, message_id):
                 conversation.update_last_message(prev_message.message)
             else:
                 conversation.last_message = ""
-                conversation.save()
+                conversation.save(update_fields=['last_message', 'updated_at'])
         
         message.delete()
         return Response({
@@ -9,6 +9,8 @@ from django.conf import settings
 import logging
 import resend
 
+from notifications.rendering import render_email
+
 
 
 logger = logging.getLogger(__name__)
@@ -46,91 +48,16 @@ def send_contact_email(request):
         # Create email subject with prefix
         email_subject = f'[CONTACT FORM] {subject}'
         
-        # Create HTML email content
-        html_content = f"""
-        <!DOCTYPE html>
-        <html lang="en">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>Contact Form Submission</title>
-        </head>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px;">
-            <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 30px; border-radius: 10px 10px 0 0; text-align: center;">
-                <h1 style="color: white; margin: 0; font-size: 28px;"> NATA STORIA TRAVEL</h1>
-                <p style="color: #f0f0f0; margin: 10px 0 0 0; font-size: 16px;">Contact Form Submission</p>
-            </div>
-            
-            <div style="background: white; padding: 30px; border: 1px solid #ddd; border-top: none;">
-                <h2 style="color: #667eea; margin-top: 0;">New Contact Form Message </h2>
-                
-                <div style="background: #f8f9ff; padding: 20px; border-radius: 8px; border-left: 4px solid #667eea; margin: 25px 0;">
-                    <h3 style="color: #667eea; margin-top: 0;"> Contact Details</h3>
-                    <table style="width: 100%; border-collapse: collapse;">
-                        <tr>
-                            <td style="padding: 8px 0; font-weight: bold; color: #555; width: 120px;">Name:</td>
-                            <td style="padding: 8px 0; color: #333;">{name}</td>
-                        </tr>
-                        <tr>
-                            <td style="padding: 8px 0; font-weight: bold; color: #555;">Email:</td>
-                            <td style="padding: 8px 0; color: #333;"><a href="mailto:{email}" style="color: #667eea;">{email}</a></td>
-                        </tr>
-                        <tr>
-                            <td style="padding: 8px 0; font-weight: bold; color: #555;">Subject:</td>
-                            <td style="padding: 8px 0; color: #333;">{subject}</td>
-                        </tr>
-                    </table>
-                </div>
-                
-                <div style="background: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                    <h3 style="color: #555; margin-top: 0;"> Message:</h3>
-                    <div style="background: white; padding: 15px; border-radius: 5px; border: 1px solid #dee2e6;">
-                        <p style="margin: 0; color: #333; white-space: pre-wrap;">{message}</p>
-                    </div>
-                </div>
-                
-                <div style="text-align: center; margin: 30px 0;">
-                    <p style="font-size: 14px; color: #6c757d; margin: 0;">
-                        This message was sent from the NATA STORIA TRAVEL contact form.
-                    </p>
-                </div>
-            </div>
-            
-            <div style="background: #f8f9fa; padding: 20px; border-radius: 0 0 10px 10px; text-align: center; border: 1px solid #ddd; border-top: none;">
-                <p style="margin: 0; color: #6c757d; font-size: 14px;">
-                    <strong style="color: #667eea;">NATA STORIA TRAVEL</strong><br>
-                    Contact Form Notification System
-                </p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        # Create plain text version
-        plain_content = f"""
-New Contact Form Submission - NATA STORIA TRAVEL
-==============================================
-
-CONTACT DETAILS:
-Name: {name}
-Email: {email}
-Subject: {subject}
-
-MESSAGE:
-{message}
-
----
-This message was sent from the NATA STORIA TRAVEL contact form.
-Please reply directly to {email} to respond to the customer.
-        """
+        # Render HTML and plain text versions from the same context
+        rendered = render_email('emails/contact_form', {'name': name, 'email': email, 'subject': subject, 'message': message})
         
         # Send email using Resend
         params: resend.Emails.SendParams = {
             "from": f"NATA STORIA TRAVEL Contact Form <{settings.DEFAULT_FROM_EMAIL}>",
             "to": ['mimmosafari56@gmail.com'], 
             "subject": email_subject,
-            "html": html_content,  # Fixed: use html_content for HTML email
-            "text": plain_content,  # Add plain text version too
+            "html": rendered.html,
+            "text": rendered.text,
             "reply_to": [email],  # Set customer email as reply-to
         }
         
@@ -168,71 +95,15 @@ def send_auto_reply_email(name, email):
     try:
         subject = 'Thank you for contacting NATA STORIA TRAVEL! '
         
-        html_content = f"""
-        <!DOCTYPE html>
-        <html lang="en">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>Thank You</title>
-        </head>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px;">
-            <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 30px; border-radius: 10px 10px 0 0; text-align: center;">
-                <h1 style="color: white; margin: 0; font-size: 28px;"> NATA STORIA TRAVEL</h1>
-                <p style="color: #f0f0f0; margin: 10px 0 0 0; font-size: 16px;">Thank You for Reaching Out!</p>
-            </div>
-            
-            <div style="background: white; padding: 30px; border: 1px solid #ddd; border-top: none;">
-                <h2 style="color: #667eea; margin-top: 0;">Message Received! </h2>
-                
-                <p style="font-size: 16px;">Dear <strong>{name}</strong>,</p>
-                
-                <p style="font-size: 16px;">Thank you for contacting NATA STORIA TRAVEL! We have received your message and will respond within 24 hours.</p>
-                
-                <div style="background: #f8f9ff; padding: 20px; border-radius: 8px; border-left: 4px solid #667eea; margin: 25px 0;">
-                    <p style="margin: 0; font-size: 16px;">In the meantime, feel free to explore our <strong>amazing tours</strong> and discover the wonders of travel!</p>
-                </div>
-                
-                <div style="text-align: center; margin: 30px 0;">
-                    <p style="font-size: 16px; margin: 0;">Need immediate assistance?</p>
-                    <p style="margin: 10px 0;">
-                         <a href="tel:+201093706046" style="color: #667eea;">+20 109 370 6046</a><br>
-                         <a href="mailto:mimmosafari56@gmail.com" style="color: #667eea;">mimmosafari56@gmail.com</a>
-                    </p>
-                </div>
-            </div>
-            
-            <div style="background: #f8f9fa; padding: 20px; border-radius: 0 0 10px 10px; text-align: center; border: 1px solid #ddd; border-top: none;">
-                <p style="margin: 0; color: #6c757d; font-size: 14px;">
-                    Best regards,<br>
-                    <strong style="color: #667eea;">NATA STORIA TRAVEL Team</strong>
-                </p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        plain_content = f"""
-Dear {name},
-
-Thank you for contacting NATA STORIA TRAVEL! We have received your message and will respond within 24 hours.
-
-In the meantime, feel free to explore our amazing tours and discover the wonders of travel!
-
-Need immediate assistance?
-Phone: +20 109 370 6046
-Email: mimmosafari56@gmail.com
-
-Best regards,
-NATA STORIA TRAVEL Team
-        """
+        # Render HTML and plain text versions from the same context
+        rendered = render_email('emails/contact_auto_reply', {'name': name})
         
         params: resend.Emails.SendParams = {
             "from": f"NATA STORIA TRAVEL <{settings.DEFAULT_FROM_EMAIL}>",
             "to": [email],
             "subject": subject,
-            "html": html_content,
-            "text": plain_content,
+            "html": rendered.html,
+            "text": rendered.text,
         }
         
         response = resend.Emails.send(params)
@@ -0,0 +1,19 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import OutboundEmail
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'reference', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at')
+    list_filter = ('status', 'kind', 'created_at')
+    search_fields = ('reference', 'subject', 'to')
+    readonly_fields = ('provider_message_id', 'last_error', 'sent_at', 'locked_at', 'created_at', 'updated_at')
+
+    actions = ['retry_now']
+
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status='sent').update(
+            status='pending', locked_at=None, attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f'{updated} emails queued for retry.')
+    retry_now.short_description = 'Retry selected emails now'
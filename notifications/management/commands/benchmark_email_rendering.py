@@ -0,0 +1,76 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.template import Context, engines
+
+from notifications.rendering import render_email
+
+SAMPLE_CONTEXT = {
+    'reference': 'BK1A2B3C4D',
+    'full_name': 'Giulia <Rossi>',
+    'email': 'giulia@example.com',
+    'phone': '+39 333 000 0000',
+    'tour_title': 'Pyramids of Giza & Sphinx Day Tour',
+    'preferred_date': '2025-10-20',
+    'preferred_time': '09:30:00',
+    'number_of_travelers': 2,
+    'total_amount': '240.00',
+    'booking_status': 'pending',
+    'special_requests': 'Vegetarian lunch, please',
+    'generated_at': '2025-10-01 at 12:00',
+    'action_text': 'A new booking has been created',
+    'status_color': '#007bff',
+    'additional_info': 'Reason: Change of plans',
+    'cancellation_reason': 'Change of plans',
+    'refund_amount': '240.00',
+    'reason': 'Fully booked on that date',
+    'name': 'Giulia <Rossi>',
+    'subject': 'Question about the Nile cruise',
+    'message': 'Hello,\nis lunch included?',
+}
+
+EMAILS = [
+    'emails/owner_notification',
+    'emails/booking_confirmation',
+    'emails/booking_cancellation',
+    'emails/admin_confirmation',
+    'emails/admin_decline',
+    'emails/contact_form',
+    'emails/contact_auto_reply',
+]
+
+class Command(BaseCommand):
+    help = 'Compare per-email render cost with and without the compiled template cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=500, help='Renders per email and mode')
+
+    def uncached_render(self, name):
+        # Read and compile both templates on every call, as without the cached template loader
+        engine = engines['django'].engine
+        for suffix in ('html', 'txt'):
+            _, origin = engine.find_template(f'{name}.{suffix}')
+            source = origin.loader.get_contents(origin)
+            engine.from_string(source).render(Context(SAMPLE_CONTEXT))
+
+    def time_per_call(self, func, iterations):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        return (time.perf_counter() - start) / iterations * 1_000_000
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+
+        self.stdout.write(f"{'email':<30}{'compile per call':>20}{'cached':>12}{'speedup':>10}")
+        totals = [0.0, 0.0]
+        for name in EMAILS:
+            uncached = self.time_per_call(lambda: self.uncached_render(name), iterations)
+            cached = self.time_per_call(lambda: render_email(name, SAMPLE_CONTEXT), iterations)
+            totals[0] += uncached
+            totals[1] += cached
+            self.stdout.write(f"{name:<30}{uncached:>17.1f} us{cached:>9.1f} us{uncached / cached:>9.1f}x")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Average per email: {totals[0] / len(EMAILS):.1f} us -> {totals[1] / len(EMAILS):.1f} us"
+        ))
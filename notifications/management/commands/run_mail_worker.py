@@ -0,0 +1,32 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from notifications.transports import get_transport
+from notifications.worker import MailWorker
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbound emails (booking confirmations, cancellations, owner notifications)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once the outbox is drained')
+        parser.add_argument('--batch-size', type=int, help='Emails claimed per batch (default: MAIL_WORKER_BATCH_SIZE)')
+        parser.add_argument('--poll-interval', type=float, help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--transport', help='resend, smtp, fake or a dotted path (default: MAIL_TRANSPORT)')
+
+    def handle(self, *args, **options):
+        worker = MailWorker(
+            transport=get_transport(options['transport']),
+            batch_size=options['batch_size'],
+        )
+
+        def shutdown(signum, frame):
+            self.stdout.write('Stopping mail worker after the current batch...')
+            worker.stop()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+
+        self.stdout.write(f'Mail worker started using {worker.transport.__class__.__name__}')
+        total = worker.run(once=options['once'], poll_interval=options['poll_interval'])
+        self.stdout.write(self.style.SUCCESS(f'Mail worker stopped. {total} emails processed.'))
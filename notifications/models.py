@@ -0,0 +1,52 @@
+# notifications/models.py
+
+from django.db import models
+from django.utils import timezone
+
+class OutboundEmail(models.Model):
+    """
+    An email waiting in the outbox until the mail worker delivers it
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    # What the email is about (e.g. 'booking_confirmation') and which record it refers to
+    kind = models.CharField(max_length=50)
+    reference = models.CharField(max_length=100, blank=True)
+
+    # Message content
+    from_email = models.CharField(max_length=254)
+    to = models.JSONField()
+    reply_to = models.JSONField(default=list, blank=True)
+    subject = models.CharField(max_length=255)
+    html_body = models.TextField(blank=True)
+    text_body = models.TextField(blank=True)
+    headers = models.JSONField(default=dict, blank=True)
+
+    # Delivery tracking
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    provider_message_id = models.CharField(max_length=200, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['reference']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} to {', '.join(self.to)} ({self.status})"
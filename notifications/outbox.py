@@ -0,0 +1,41 @@
+# notifications/outbox.py
+
+from django.conf import settings
+
+from .models import OutboundEmail
+
+DEFAULT_SENDER_NAME = 'NATA STORIA TRAVEL'
+
+def default_from_email(sender_name=DEFAULT_SENDER_NAME):
+    return f"{sender_name} <{settings.DEFAULT_FROM_EMAIL}>"
+
+def build_email(to, subject, html='', text='', kind='', reference='',
+                from_email=None, reply_to=None, headers=None):
+    """An unsaved outbox email; see enqueue_email and enqueue_many"""
+    return OutboundEmail(
+        kind=kind,
+        reference=reference,
+        from_email=from_email or default_from_email(),
+        to=list(to),
+        reply_to=list(reply_to or []),
+        subject=subject,
+        html_body=html,
+        text_body=text,
+        headers=headers or {},
+        max_attempts=settings.MAIL_MAX_ATTEMPTS,
+    )
+
+def enqueue_email(to, subject, html='', text='', kind='', reference='',
+                  from_email=None, reply_to=None, headers=None):
+    """
+    Write an email to the outbox. It is delivered later by `manage.py run_mail_worker`,
+    so call this inside the same transaction as the change the email is about.
+    """
+    email = build_email(to, subject, html=html, text=text, kind=kind, reference=reference,
+                        from_email=from_email, reply_to=reply_to, headers=headers)
+    email.save()
+    return email
+
+def enqueue_many(emails, batch_size=500):
+    """Write many emails (dicts of enqueue_email arguments) with bulk inserts"""
+    return OutboundEmail.objects.bulk_create([build_email(**email) for email in emails], batch_size=batch_size)
@@ -0,0 +1,28 @@
+# notifications/rendering.py
+
+from dataclasses import dataclass
+from django.template import engines
+
+@dataclass
+class RenderedEmail:
+    """HTML and plain text bodies rendered from one context"""
+    html: str
+    text: str
+
+def get_email_template(name):
+    """
+    The compiled email template. The engine's cached template loader (on by default
+    since Django 4.1) compiles each template once per process and resets on autoreload.
+    """
+    return engines['django'].get_template(name)
+
+def render_email(name, context):
+    """
+    Render `<name>.html` and `<name>.txt` with the same context.
+    User input is autoescaped in the HTML body; the plain text templates
+    turn autoescaping off so names and messages come through unchanged.
+    """
+    return RenderedEmail(
+        html=get_email_template(f'{name}.html').render(context),
+        text=get_email_template(f'{name}.txt').render(context),
+    )
@@ -0,0 +1,140 @@
+import threading
+import unittest
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .models import OutboundEmail
+from .management.commands.benchmark_email_rendering import EMAILS
+from .outbox import enqueue_email
+from .rendering import render_email
+from .transports import BaseTransport, FakeTransport
+from .worker import MailWorker
+
+class FailingTransport(BaseTransport):
+    def send(self, email):
+        raise RuntimeError('Provider unavailable')
+
+def queue(count=1, **extra):
+    return [
+        enqueue_email([f'guest{number}@example.com'], 'Your booking', text='Thanks', kind='test', reference=f'REF{number}', **extra)
+        for number in range(count)
+    ]
+
+@override_settings(MAIL_MAX_ATTEMPTS=3, MAIL_RETRY_BASE_DELAY=30, MAIL_RETRY_MAX_DELAY=3600)
+class MailWorkerTests(TestCase):
+    """The worker claims due emails, delivers them and reschedules failures"""
+
+    def setUp(self):
+        FakeTransport.outbox = []
+
+    def test_sends_due_emails_through_the_transport(self):
+        emails = queue(3)
+        self.assertEqual(MailWorker(FakeTransport()).run(once=True), 3)
+
+        self.assertEqual([email.pk for email in FakeTransport.outbox], [email.pk for email in emails])
+        for email in OutboundEmail.objects.all():
+            self.assertEqual((email.status, email.attempts), ('sent', 1))
+            self.assertEqual(email.provider_message_id, f'fake-{email.pk}')
+            self.assertIsNone(email.locked_at)
+
+    def test_claim_skips_claimed_and_future_emails(self):
+        queue(2)
+        later = OutboundEmail.objects.create(
+            kind='test', from_email='a@example.com', to=['b@example.com'], subject='Later',
+            next_attempt_at=timezone.now() + timedelta(hours=1),
+        )
+        worker = MailWorker(FakeTransport(), batch_size=1)
+
+        first = worker.claim_batch()
+        self.assertEqual(len(first), 1)
+        self.assertEqual(OutboundEmail.objects.get(pk=first[0].pk).status, 'sending')
+        second = worker.claim_batch()
+        self.assertEqual(len(second), 1)
+        self.assertNotEqual(second[0].pk, first[0].pk)
+        self.assertEqual(worker.claim_batch(), [])
+        self.assertEqual(OutboundEmail.objects.get(pk=later.pk).status, 'pending')
+
+    def test_failure_is_retried_with_backoff_then_given_up(self):
+        email = queue()[0]
+        worker = MailWorker(FailingTransport())
+
+        delays = []
+        for attempt in range(1, 3):
+            before = timezone.now()
+            self.assertEqual(worker.process_batch(), 1)
+            email.refresh_from_db()
+            self.assertEqual((email.status, email.attempts), ('pending', attempt))
+            self.assertEqual(email.last_error, 'Provider unavailable')
+            delays.append((email.next_attempt_at - before).total_seconds())
+            # Nothing is due until the backoff has passed
+            self.assertEqual(worker.process_batch(), 0)
+            OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+
+        # 30s, then doubled to 60s, each with up to 10% jitter
+        self.assertTrue(30 <= delays[0] <= 34)
+        self.assertTrue(60 <= delays[1] <= 67)
+
+        worker.process_batch()
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 3))
+        self.assertEqual(worker.process_batch(), 0)
+
+    def test_release_stale_returns_abandoned_claims(self):
+        stale, recent = queue(2)
+        OutboundEmail.objects.filter(pk=stale.pk).update(status='sending', locked_at=timezone.now() - timedelta(minutes=10))
+        OutboundEmail.objects.filter(pk=recent.pk).update(status='sending', locked_at=timezone.now())
+
+        self.assertEqual(MailWorker(FakeTransport(), stale_after=300).release_stale(), 1)
+        self.assertEqual(OutboundEmail.objects.get(pk=stale.pk).status, 'pending')
+        self.assertEqual(OutboundEmail.objects.get(pk=recent.pk).status, 'sending')
+
+@unittest.skipUnless(connection.features.has_select_for_update_skip_locked, 'Needs SELECT ... FOR UPDATE SKIP LOCKED')
+class ConcurrentClaimTests(TransactionTestCase):
+    """A worker never waits on, or claims, the rows another worker is claiming"""
+
+    def test_locked_rows_are_skipped(self):
+        locked, free = queue(2)
+        holding = threading.Event()
+        done = threading.Event()
+
+        def hold_lock():
+            try:
+                with transaction.atomic():
+                    list(OutboundEmail.objects.select_for_update().filter(pk=locked.pk))
+                    holding.set()
+                    done.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        try:
+            holding.wait(10)
+            claimed = MailWorker(FakeTransport()).claim_batch()
+        finally:
+            done.set()
+            thread.join()
+        self.assertEqual([email.pk for email in claimed], [free.pk])
+
+class RenderEmailTests(SimpleTestCase):
+    """User input is escaped in the HTML bodies and left as typed in the plain text ones"""
+
+    PAYLOAD = '<script>alert("x")</script> & Co'
+
+    def test_user_input_is_escaped_only_in_html(self):
+        context = {
+            field: self.PAYLOAD
+            for field in ('full_name', 'name', 'subject', 'message', 'special_requests', 'reason',
+                          'cancellation_reason', 'additional_info')
+        }
+        for name in EMAILS:
+            with self.subTest(name):
+                rendered = render_email(name, context)
+                self.assertNotIn('<script>', rendered.html)
+                self.assertIn('&lt;script&gt;alert(&quot;x&quot;)&lt;/script&gt; &amp; Co', rendered.html)
+                self.assertIn(self.PAYLOAD, rendered.text)
+                self.assertNotIn('&lt;', rendered.text)
+
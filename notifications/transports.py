@@ -0,0 +1,150 @@
+# notifications/transports.py
+
+from dataclasses import dataclass
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils.module_loading import import_string
+import logging
+import resend
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class DeliveryResult:
+    """Outcome of handing one outbox email to a transport"""
+    email: object
+    success: bool
+    provider_message_id: str = ''
+    error: str = ''
+
+class BaseTransport:
+    """
+    Delivers OutboundEmail rows. Subclasses implement `send` and may override
+    `send_batch` when the provider has a cheaper way to deliver many emails.
+    """
+
+    def send(self, email):
+        """Send one email and return the provider message id (raise on failure)"""
+        raise NotImplementedError
+
+    def send_batch(self, emails):
+        results = []
+        for email in emails:
+            try:
+                results.append(DeliveryResult(email, True, self.send(email) or ''))
+            except Exception as e:
+                results.append(DeliveryResult(email, False, error=str(e)))
+        return results
+
+class ResendTransport(BaseTransport):
+    """Send through the Resend API, using its batch endpoint for multiple emails"""
+    batch_limit = 100  # Resend accepts at most 100 emails per batch call
+
+    def __init__(self):
+        resend.api_key = settings.RESEND_API_KEY
+
+    def build_params(self, email):
+        params: resend.Emails.SendParams = {
+            "from": email.from_email,
+            "to": email.to,
+            "subject": email.subject,
+            "html": email.html_body,
+            "text": email.text_body,
+        }
+        if email.reply_to:
+            params["reply_to"] = email.reply_to
+        if email.headers:
+            params["headers"] = email.headers
+        return params
+
+    def send(self, email):
+        response = resend.Emails.send(self.build_params(email))
+        if not response or not response.get('id'):
+            raise RuntimeError(f"Resend did not accept the email. Response: {response}")
+        return response['id']
+
+    def send_batch(self, emails):
+        if len(emails) == 1:
+            return super().send_batch(emails)
+
+        results = []
+        for start in range(0, len(emails), self.batch_limit):
+            chunk = emails[start:start + self.batch_limit]
+            try:
+                response = resend.Batch.send([self.build_params(email) for email in chunk])
+                sent = (response or {}).get('data') or []
+                if len(sent) != len(chunk):
+                    raise RuntimeError(f"Resend batch returned {len(sent)} ids for {len(chunk)} emails")
+                results.extend(DeliveryResult(email, True, item.get('id', '')) for email, item in zip(chunk, sent))
+            except Exception as e:
+                logger.warning(f"Resend batch of {len(chunk)} emails failed: {e}")
+                results.extend(DeliveryResult(email, False, error=str(e)) for email in chunk)
+        return results
+
+class SMTPTransport(BaseTransport):
+    """Send through Django's SMTP settings, reusing one connection per batch"""
+
+    def build_message(self, email, connection):
+        message = EmailMultiAlternatives(
+            subject=email.subject,
+            body=email.text_body,
+            from_email=email.from_email,
+            to=email.to,
+            reply_to=email.reply_to or None,
+            headers=email.headers or None,
+            connection=connection,
+        )
+        if email.html_body:
+            message.attach_alternative(email.html_body, "text/html")
+        return message
+
+    def send(self, email):
+        result = self.send_batch([email])[0]
+        if not result.success:
+            raise RuntimeError(result.error)
+        return result.provider_message_id
+
+    def send_batch(self, emails):
+        results = []
+        connection = get_connection(backend='django.core.mail.backends.smtp.EmailBackend')
+        try:
+            connection.open()
+        except Exception as e:
+            return [DeliveryResult(email, False, error=str(e)) for email in emails]
+
+        try:
+            for email in emails:
+                try:
+                    sent = self.build_message(email, connection).send(fail_silently=False)
+                    if sent:
+                        results.append(DeliveryResult(email, True))
+                    else:
+                        results.append(DeliveryResult(email, False, error='SMTP server rejected the email'))
+                except Exception as e:
+                    results.append(DeliveryResult(email, False, error=str(e)))
+        finally:
+            connection.close()
+        return results
+
+class FakeTransport(BaseTransport):
+    """
+    In-process transport for tests and local development.
+    Delivered emails are collected in `FakeTransport.outbox`.
+    """
+    outbox = []
+
+    def send(self, email):
+        FakeTransport.outbox.append(email)
+        return f"fake-{email.pk}"
+
+TRANSPORTS = {
+    'resend': ResendTransport,
+    'smtp': SMTPTransport,
+    'fake': FakeTransport,
+}
+
+def get_transport(name=None):
+    """Instantiate the transport named in settings.MAIL_TRANSPORT (or a dotted path)"""
+    name = name or settings.MAIL_TRANSPORT
+    transport_class = TRANSPORTS.get(name) or import_string(name)
+    return transport_class()
@@ -0,0 +1,112 @@
+# notifications/worker.py
+
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+import logging
+import random
+import time
+
+from .models import OutboundEmail
+from .transports import get_transport
+
+logger = logging.getLogger(__name__)
+
+def retry_delay(attempts):
+    """Exponential backoff with a little jitter so failed batches don't retry in lockstep"""
+    delay = min(settings.MAIL_RETRY_BASE_DELAY * (2 ** max(attempts - 1, 0)), settings.MAIL_RETRY_MAX_DELAY)
+    return timedelta(seconds=delay + random.uniform(0, delay * 0.1))
+
+class MailWorker:
+    """
+    Drains the outbox: claims due emails in batches, hands them to the transport
+    and records the outcome, rescheduling failures with backoff.
+    Several workers can run side by side; rows are claimed with SKIP LOCKED.
+    """
+
+    def __init__(self, transport=None, batch_size=None, stale_after=None):
+        self.transport = transport or get_transport()
+        self.batch_size = batch_size or settings.MAIL_WORKER_BATCH_SIZE
+        self.stale_after = timedelta(seconds=stale_after or settings.MAIL_WORKER_STALE_AFTER)
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def release_stale(self):
+        """Put back emails claimed by a worker that died before recording the outcome"""
+        cutoff = timezone.now() - self.stale_after
+        released = OutboundEmail.objects.filter(status='sending', locked_at__lt=cutoff).update(
+            status='pending', locked_at=None
+        )
+        if released:
+            logger.warning(f"Released {released} stale outbox emails")
+        return released
+
+    def claim_batch(self):
+        now = timezone.now()
+        with transaction.atomic():
+            ids = list(
+                OutboundEmail.objects.select_for_update(skip_locked=True)
+                .filter(status='pending', next_attempt_at__lte=now)
+                .order_by('next_attempt_at')
+                .values_list('id', flat=True)[:self.batch_size]
+            )
+            if ids:
+                OutboundEmail.objects.filter(id__in=ids).update(status='sending', locked_at=now)
+        return list(OutboundEmail.objects.filter(id__in=ids).order_by('next_attempt_at')) if ids else []
+
+    def record_results(self, results):
+        now = timezone.now()
+        finished = []
+        for result in results:
+            email = result.email
+            email.attempts += 1
+            email.locked_at = None
+            if result.success:
+                email.status = 'sent'
+                email.sent_at = now
+                email.provider_message_id = result.provider_message_id
+                email.last_error = ''
+                logger.info(f"Sent {email.kind} email {email.pk} for {email.reference}")
+            elif email.attempts >= email.max_attempts:
+                email.status = 'failed'
+                email.last_error = result.error
+                logger.error(f"Giving up on {email.kind} email {email.pk} for {email.reference} after {email.attempts} attempts: {result.error}")
+            else:
+                email.status = 'pending'
+                email.last_error = result.error
+                email.next_attempt_at = now + retry_delay(email.attempts)
+                logger.warning(f"Failed to send {email.kind} email {email.pk} for {email.reference} (attempt {email.attempts}): {result.error}")
+            email.updated_at = now
+            finished.append(email)
+
+        OutboundEmail.objects.bulk_update(finished, [
+            'status', 'attempts', 'locked_at', 'sent_at', 'provider_message_id',
+            'last_error', 'next_attempt_at', 'updated_at',
+        ])
+
+    def process_batch(self):
+        """Send one batch of due emails. Returns how many emails were attempted."""
+        emails = self.claim_batch()
+        if not emails:
+            return 0
+        self.record_results(self.transport.send_batch(emails))
+        return len(emails)
+
+    def run(self, once=False, poll_interval=None):
+        """Keep sending until stopped; with `once`, exit as soon as the outbox is drained"""
+        poll_interval = poll_interval if poll_interval is not None else settings.MAIL_WORKER_POLL_INTERVAL
+        total = 0
+        self.release_stale()
+        while self.running:
+            processed = self.process_batch()
+            total += processed
+            if processed:
+                continue
+            if once:
+                break
+            time.sleep(poll_interval)
+            self.release_stale()
+        return total
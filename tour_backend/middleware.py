@@ -0,0 +1,49 @@
+# tour_backend/middleware.py
+
+from django.conf import settings
+from django.db import connection
+import logging
+
+logger = logging.getLogger(__name__)
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+class QueryCounter:
+    """execute_wrapper that counts the statements sent to the database"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+class QueryBudgetMiddleware:
+    """
+    Count the queries each request runs and compare them with QUERY_BUDGETS (URL name -> queries).
+
+    Over budget is logged as a warning, or raised when QUERY_BUDGET_STRICT is on
+    (the tests), so a change that adds queries to a hot path fails there first.
+    In DEBUG the count is also sent back in an X-Query-Count header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+
+        if settings.DEBUG:
+            response['X-Query-Count'] = str(counter.count)
+
+        match = request.resolver_match
+        budget = settings.QUERY_BUDGETS.get(match.url_name) if match else None
+        if budget is not None and counter.count > budget:
+            message = f"{request.method} {request.path} ran {counter.count} queries, budget for {match.url_name} is {budget}"
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,145 @@
+# tour_backend/pagination.py
+
+from django.db.models import Q
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+import base64
+import datetime
+import json
+
+def cursor_value(value):
+    """JSON-friendly form of an ordering value, keeping full datetime precision"""
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+class KeysetPagination:
+    """
+    Cursor pagination over a fixed ordering, e.g. ('-created_at', 'id').
+    The last field must be unique so every row has a stable position.
+    Pages are fetched with a WHERE on the ordering columns instead of OFFSET,
+    so deep pages cost the same as the first one.
+    """
+    page_size = 50
+    max_page_size = 500
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+
+    def __init__(self, ordering, page_size=None, max_page_size=None):
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.page_size = page_size or self.page_size
+        self.max_page_size = max_page_size or self.max_page_size
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.GET.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, row):
+        values = [row[name] for name in self.fields]
+        payload = json.dumps(values, default=cursor_value, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def cursor_field(self, queryset, name):
+        """The model field, or for an annotation (e.g. a search rank) its output field"""
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        return queryset.model._meta.get_field(name)
+
+    def decode_cursor(self, cursor, queryset):
+        """Return the ordering values stored in the cursor (raises ValueError if it is invalid)"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except Exception:
+            raise ValueError('Invalid cursor')
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            raise ValueError('Invalid cursor')
+        try:
+            return [self.cursor_field(queryset, name).to_python(value) for name, value in zip(self.fields, values)]
+        except Exception:
+            raise ValueError('Invalid cursor')
+
+    def after(self, values):
+        """Q matching rows that come after `values` in the ordering"""
+        condition = Q()
+        for position in range(len(self.ordering) - 1, -1, -1):
+            name = self.fields[position]
+            lookup = 'lt' if self.ordering[position].startswith('-') else 'gt'
+            step = Q(**{f'{name}__{lookup}': values[position]})
+            if position < len(self.ordering) - 1:
+                step |= Q(**{name: values[position]}) & condition
+            condition = step
+        return condition
+
+    def paginate(self, queryset, request):
+        """
+        Return (rows, next_cursor) for the requested page.
+        `queryset` may be a .values() queryset as long as it includes the ordering fields.
+        """
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.GET.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.after(self.decode_cursor(cursor, queryset)))
+
+        page_size = self.get_page_size(request)
+        rows = list(queryset[:page_size + 1])
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            if not isinstance(last, dict):
+                last = {name: getattr(last, name) for name in self.fields}
+            next_cursor = self.encode_cursor(last)
+        return rows, next_cursor
+
+
+class KeysetListPagination(BasePagination):
+    """
+    DRF pagination class over KeysetPagination for generic list views.
+    Subclasses set `ordering`, which replaces any other ordering of the queryset.
+    Querysets ranked by a search (annotated with `rank_field`, see tours/search.py)
+    are paged by relevance first, then by `ordering`.
+    """
+    ordering = None
+    page_size = None
+    ordering_query_param = 'ordering'
+    rank_field = 'search_rank'
+
+    def get_ordering(self, queryset):
+        if self.rank_field in queryset.query.annotations:
+            return (f'-{self.rank_field}',) + tuple(self.ordering)
+        return self.ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        keyset = KeysetPagination(self.get_ordering(queryset), page_size=self.page_size)
+        if request.query_params.get(self.ordering_query_param):
+            raise ParseError(f"`{self.ordering_query_param}` cannot be combined with cursor pagination")
+        try:
+            rows, self.next_cursor = keyset.paginate(queryset, request)
+        except ValueError as e:
+            raise ParseError(str(e))
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'results': data,
+            'next_cursor': self.next_cursor,
+            'has_more': self.next_cursor is not None,
+        })
+
+class OptInKeysetPagination(KeysetListPagination):
+    """
+    Only pages when the client sends `cursor` or `page_size`;
+    other requests still get the full list.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = {KeysetPagination.cursor_query_param, KeysetPagination.page_size_query_param}
+        if not params & set(request.query_params):
+            return None
+        return super().paginate_queryset(queryset, request, view)
@@ -1,6 +1,7 @@
 
 
 import os
+import sys
 from pathlib import Path
 from datetime import timedelta
 import cloudinary
@@ -53,6 +54,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third party apps
     'rest_framework',
@@ -72,7 +74,8 @@ INSTALLED_APPS = [
 
     'channels',
     'chat',
-    'contact'
+    'contact',
+    'notifications',
 
 ]
 
@@ -102,6 +105,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'tour_backend.middleware.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'tour_backend.urls'
@@ -176,6 +180,40 @@ CHANNEL_LAYERS = {
         },
     },
 }
+
+# Shared cache on the channel layer's Redis: tour catalog responses (tours/cache.py), the stats
+# refresh debounce (tours/stats.py) and WebSocket users (chat/middleware.py).
+# Test runs and setups without REDIS_URL use a per-process LocMem cache instead.
+TESTING = sys.argv[1:2] == ['test']
+if TESTING or not os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'TIMEOUT': 300,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'tour_backend',
+            'TIMEOUT': 300,
+            'OPTIONS': {
+                'socket_connect_timeout': 0.5,
+                'socket_timeout': 0.5,
+            },
+        },
+    }
+
+TOUR_CACHE_TIMEOUT = 600  # seconds a catalog response stays in Redis (entries are also dropped by version bumps)
+TOUR_CACHE_LOCAL_SIZE = 256  # responses kept in each process in front of Redis
+TOUR_CACHE_RETRY_AFTER = 30  # seconds to serve uncached after Redis errors
+CHAT_USER_CACHE_TIMEOUT = 60  # seconds a WebSocket handshake may reuse a user resolved from the same token
+CHAT_USER_CACHE_RETRY_AFTER = 30  # seconds to resolve users from the database after cache errors
+CHAT_INBOX_SUMMARY_WINDOW = float(os.environ.get('CHAT_INBOX_SUMMARY_WINDOW', 1))  # seconds of unread deltas coalesced per admin inbox update; 0 sends each at once
+TOUR_STATS_REFRESH_DELAY = 10  # seconds catalog changes are batched before the stats snapshot is rebuilt
+AUTOCOMPLETE_MAX_AGE = 300  # seconds before the in-memory suggestion index is rebuilt to pick up new ratings
 # Internationalization
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
@@ -289,6 +327,30 @@ EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASS')
 
 
 DEFAULT_FROM_EMAIL = 'support@nata-storia-travel.com'
+
+# Outbound email queue (see notifications app, delivered by `manage.py run_mail_worker`)
+MAIL_TRANSPORT = os.environ.get('MAIL_TRANSPORT', 'resend')  # resend, smtp or fake
+MAIL_WORKER_BATCH_SIZE = int(os.environ.get('MAIL_WORKER_BATCH_SIZE', 50))
+MAIL_WORKER_POLL_INTERVAL = float(os.environ.get('MAIL_WORKER_POLL_INTERVAL', 2))
+MAIL_WORKER_STALE_AFTER = 300  # seconds before a claimed but unfinished email is retried
+MAIL_MAX_ATTEMPTS = 6
+MAIL_RETRY_BASE_DELAY = 30  # seconds, doubled on every failed attempt
+MAIL_RETRY_MAX_DELAY = 3600
+
+# Booking vouchers are rendered once per content change and cached (see bookings/vouchers.py)
+VOUCHER_STORAGE = os.environ.get('VOUCHER_STORAGE', 'local')  # local, default (media storage) or a storage class path
+VOUCHER_CACHE_DIR = os.environ.get('VOUCHER_CACHE_DIR', os.path.join(BASE_DIR, 'voucher_cache'))
+VOUCHER_PRERENDER = os.environ.get('VOUCHER_PRERENDER', 'True') == 'True'
+VOUCHER_RENDER_WORKERS = int(os.environ.get('VOUCHER_RENDER_WORKERS', 2))
+VOUCHER_EXPORT_WORKERS = int(os.environ.get('VOUCHER_EXPORT_WORKERS', os.cpu_count() or 2))  # processes for bulk exports
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60  # seconds a stored Idempotency-Key response is replayed
+
+# Most queries a request to these URL names may run (see tour_backend.middleware)
+QUERY_BUDGETS = {
+    'create_booking': 28,  # 27 for a first booking that reserves a slot, counted under SQLite
+}
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', 'False') == 'True'  # raise instead of logging
+
 AUTH_USER_MODEL = 'accounts.User'
 # Stripe Configuration (add your keys)
 # STRIPE_PUBLISHABLE_KEY = 'pk_test_your_stripe_publishable_key'
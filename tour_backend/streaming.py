@@ -0,0 +1,27 @@
+# tour_backend/streaming.py
+
+from asgiref.sync import sync_to_async
+
+_DONE = object()
+
+async def async_stream(iterable):
+    """
+    Serve a blocking iterable (database cursor, file reads) as a StreamingHttpResponse body.
+
+    Under ASGI, Django collects a synchronous iterator into a list before sending the first byte.
+    This pulls one chunk at a time in the thread that runs the sync views, so the response is
+    sent as it is produced and database cursors stay on the connection that opened them.
+    """
+    iterator = iter(iterable)
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    try:
+        while True:
+            chunk = await next_chunk(iterator, _DONE)
+            if chunk is _DONE:
+                return
+            yield chunk
+    finally:
+        # The client may have gone away mid-stream; let generators release cursors and files
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await sync_to_async(close, thread_sensitive=True)()
@@ -0,0 +1,212 @@
+# tours/autocomplete.py
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.functions import Greatest
+import logging
+import math
+import re
+import threading
+import time
+import unicodedata
+
+from .cache import catalog_cache
+from .models import Tour
+
+logger = logging.getLogger(__name__)
+
+MAX_TOUR_SUGGESTIONS = 10
+MAX_LOCATION_SUGGESTIONS = 5
+FUZZY_MIN_SIMILARITY = 0.3
+
+def normalize(text):
+    """Lowercase and strip accents so 'Città' and 'citta' match"""
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+
+def tokenize(text):
+    return re.findall(r'\w+', normalize(text))
+
+class TrieNode:
+    __slots__ = ('children', 'entries')
+
+    def __init__(self):
+        self.children = {}
+        self.entries = set()
+
+class SuggestionIndex:
+    """
+    Prefix trie over the words of active tour titles and locations.
+    Every node keeps the ids of the suggestions having a word with that prefix,
+    so a lookup is one walk per query word plus a set intersection.
+    """
+
+    def __init__(self, rows):
+        self.root = TrieNode()
+        self.entries = []
+        self.location_counts = {}
+
+        for row in rows:
+            location_key = normalize(row['location'])
+            if location_key not in self.location_counts:
+                self.location_counts[location_key] = [row['location'], 0]
+            self.location_counts[location_key][1] += 1
+
+            popularity = math.log1p(row['review_count']) * float(row['rating']) / 5 + (0.5 if row['is_featured'] else 0)
+            self.add({
+                'title': row['title'],
+                'slug': row['slug'],
+                'location': row['location'],
+                'type': 'tour',
+            }, row['title'], popularity)
+
+        for location, tour_count in self.location_counts.values():
+            self.add({
+                'title': location,
+                'location': location,
+                'type': 'location',
+            }, location, math.log1p(tour_count))
+
+        top = max((entry[3] for entry in self.entries), default=0)
+        self.max_popularity = top or 1
+
+    def add(self, suggestion, text, popularity):
+        entry_id = len(self.entries)
+        self.entries.append((suggestion, normalize(text), tokenize(text), popularity))
+        for word in set(tokenize(text)):
+            node = self.root
+            for char in word:
+                node = node.children.setdefault(char, TrieNode())
+                node.entries.add(entry_id)
+
+    def lookup(self, word):
+        node = self.root
+        for char in word:
+            node = node.children.get(char)
+            if node is None:
+                return set()
+        return node.entries
+
+    def score(self, entry, words, query):
+        _, text, tokens, popularity = entry
+        # How much of each matched word the query covers, rewarding matches at the start
+        similarity = sum(
+            max((len(word) / len(token) for token in tokens if token.startswith(word)), default=0)
+            for word in words
+        ) / len(words)
+        if text.startswith(query):
+            similarity += 0.5
+        return 0.7 * similarity + 0.3 * popularity / self.max_popularity
+
+    def search(self, query):
+        words = tokenize(query)
+        if not words:
+            return []
+        matches = None
+        for word in words:
+            found = self.lookup(word)
+            matches = set(found) if matches is None else matches & found
+            if not matches:
+                return []
+        normalized_query = ' '.join(words)
+        ranked = sorted(matches, key=lambda entry_id: -self.score(self.entries[entry_id], words, normalized_query))
+        return [self.entries[entry_id][0] for entry_id in ranked]
+
+class Autocomplete:
+    """
+    Process-wide suggestion index, rebuilt when the catalog's 'tours' version
+    stamp changes (a Tour saved in any process), when a Tour is saved in this one,
+    and every AUTOCOMPLETE_MAX_AGE seconds so ratings stay roughly current.
+    """
+
+    def __init__(self):
+        self.index = None
+        self.version = None
+        self.built_at = 0
+        self.stale = True
+        self.lock = threading.Lock()
+
+    def invalidate(self):
+        self.stale = True
+
+    def current_version(self):
+        if not catalog_cache.available():
+            return None
+        try:
+            return catalog_cache.versions(('tours',))
+        except Exception as e:
+            catalog_cache.redis_failed(e)
+            return None
+
+    def is_fresh(self, version):
+        expired = time.monotonic() - self.built_at > settings.AUTOCOMPLETE_MAX_AGE
+        return self.index is not None and not self.stale and not expired and (version is None or version == self.version)
+
+    def get_index(self):
+        """The current index; only a rebuild touches the database"""
+        version = self.current_version()
+        if self.is_fresh(version):
+            return self.index
+
+        with self.lock:
+            # Threads that queued behind a rebuild use its result
+            if self.is_fresh(version):
+                return self.index
+            # Clear the flag first so a save during the rebuild triggers another one
+            self.stale = False
+            rows = Tour.objects.filter(is_active=True).values(
+                'title', 'slug', 'location', 'review_count', 'rating', 'is_featured'
+            )
+            self.index = SuggestionIndex(rows)
+            self.version = version
+            self.built_at = time.monotonic()
+            logger.info(f"Built tour autocomplete index with {len(self.index.entries)} suggestions")
+            return self.index
+
+    def fuzzy_tours(self, query):
+        """Typo-tolerant fallback using the pg_trgm indexes; substring match elsewhere"""
+        active = Tour.objects.filter(is_active=True)
+        if connection.vendor != 'postgresql':
+            return list(
+                active.filter(Q(title__icontains=query) | Q(location__icontains=query))
+                .order_by('-review_count').values('title', 'slug', 'location')[:MAX_TOUR_SUGGESTIONS]
+            )
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        return list(
+            active.annotate(
+                similarity=Greatest(
+                    TrigramWordSimilarity(query, 'title'),
+                    TrigramWordSimilarity(query, 'location'),
+                )
+            ).filter(
+                Q(title__trigram_word_similar=query) | Q(location__trigram_word_similar=query),
+                similarity__gte=FUZZY_MIN_SIMILARITY,
+            ).order_by('-similarity', '-review_count').values('title', 'slug', 'location')[:MAX_TOUR_SUGGESTIONS]
+        )
+
+    def suggest(self, query):
+        """Tour and location suggestions for a partial query, best first"""
+        ranked = self.get_index().search(query)
+        if not ranked:
+            ranked = [dict(tour, type='tour') for tour in self.fuzzy_tours(query)]
+
+        suggestions = []
+        seen_locations = set()
+        tours = locations = 0
+        for suggestion in ranked:
+            if suggestion['type'] == 'tour':
+                if tours >= MAX_TOUR_SUGGESTIONS:
+                    continue
+                tours += 1
+                seen_locations.add(suggestion['location'])
+                suggestions.append(suggestion)
+            elif suggestion['location'] not in seen_locations and locations < MAX_LOCATION_SUGGESTIONS:
+                locations += 1
+                seen_locations.add(suggestion['location'])
+                suggestions.append(suggestion)
+        # Tours first, then the locations not already covered by a tour, as before
+        return [s for s in suggestions if s['type'] == 'tour'] + [s for s in suggestions if s['type'] == 'location']
+
+autocomplete = Autocomplete()
@@ -0,0 +1,110 @@
+# tours/availability.py
+
+from calendar import monthrange
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+import datetime
+
+from .cache import catalog_cache
+from .models import TourAvailability, TourDayCapacity
+
+def refresh_day_capacity(tour_id, date):
+    """Recompute the capacity rollup of one tour day from its active slots"""
+    totals = TourAvailability.objects.filter(tour_id=tour_id, date=date, is_active=True).aggregate(
+        seats_left=Sum('available_spots'), largest_party=Max('available_spots'), slot_count=Count('id')
+    )
+    if totals['slot_count']:
+        TourDayCapacity.objects.update_or_create(tour_id=tour_id, date=date, defaults=totals)
+    else:
+        TourDayCapacity.objects.filter(tour_id=tour_id, date=date).delete()
+    # Calendars cached under the old stamp go stale once this commits
+    transaction.on_commit(lambda: catalog_cache.bump('availability'))
+
+def adjust_day_capacity(tour_id, date, seats):
+    """
+    Move the rollup of one tour day by `seats` (negative when taken) after a slot changed hands.
+    One UPDATE: the seat total shifts and only the largest party is re-read from the slots.
+    """
+    largest_party = TourAvailability.objects.filter(
+        tour_id=OuterRef('tour_id'), date=OuterRef('date'), is_active=True
+    ).order_by('-available_spots').values('available_spots')[:1]
+    adjusted = TourDayCapacity.objects.filter(tour_id=tour_id, date=date).update(
+        seats_left=F('seats_left') + seats, largest_party=Coalesce(Subquery(largest_party), 0)
+    )
+    if not adjusted:
+        # No rollup row yet (e.g. before rebuild_day_capacity ran)
+        refresh_day_capacity(tour_id, date)
+        return
+    transaction.on_commit(lambda: catalog_cache.bump('availability'))
+
+def rebuild_day_capacity():
+    """Rebuild every rollup row from the slots; returns the number of tour days"""
+    rows = TourAvailability.objects.filter(is_active=True).values('tour_id', 'date').annotate(
+        seats_left=Sum('available_spots'), largest_party=Max('available_spots'), slot_count=Count('id')
+    ).order_by()
+    with transaction.atomic():
+        TourDayCapacity.objects.all().delete()
+        created = TourDayCapacity.objects.bulk_create(
+            [TourDayCapacity(**row) for row in rows.iterator(chunk_size=2000)], batch_size=2000
+        )
+    catalog_cache.bump('availability')
+    return len(created)
+
+def reserve_seats(tour, date, travelers, start_time=None):
+    """
+    Take `travelers` seats from a slot of `tour` on `date` (at `start_time` if given).
+    Returns the slot, or None when the tour does not sell by slots at all.
+    Raises ValueError when no slot of that day has room for the whole party.
+
+    Each attempt is a conditional UPDATE (... WHERE available_spots >= travelers),
+    so concurrent bookings can never oversell a slot. Call inside the booking's transaction.
+    """
+    slots = TourAvailability.objects.filter(tour=tour, is_active=True)
+    candidates = slots.filter(date=date)
+    if start_time is not None:
+        candidates = candidates.filter(start_time=start_time)
+
+    candidate_slots = list(candidates.filter(available_spots__gte=travelers).order_by('start_time', 'id'))
+    for slot in candidate_slots:
+        taken = TourAvailability.objects.filter(pk=slot.pk, available_spots__gte=travelers).update(
+            available_spots=F('available_spots') - travelers
+        )
+        if taken:
+            adjust_day_capacity(tour.pk, date, -travelers)
+            slot.available_spots -= travelers  # Others may have taken seats meanwhile; refresh_from_db for the exact count
+            return slot
+
+    if candidate_slots or candidates.exists():
+        raise ValueError(f"Not enough availability on {date} for {travelers} travelers.")
+    if slots.exists():
+        raise ValueError(f"This tour has no departures on {date}.")
+    return None
+
+def release_seats(slot_id, travelers):
+    """Give `travelers` seats back to a slot"""
+    released = TourAvailability.objects.filter(pk=slot_id).update(available_spots=F('available_spots') + travelers)
+    if released:
+        slot = TourAvailability.objects.filter(pk=slot_id).values('tour_id', 'date', 'is_active').first()
+        # Inactive slots are not part of the rollup
+        if slot['is_active']:
+            adjust_day_capacity(slot['tour_id'], slot['date'], travelers)
+
+def month_calendar(tour_ids, year, month, travelers=1):
+    """
+    Bookable days of a month for each tour, as {tour_id: bitmap} where
+    bit 0 is day 1. A day is set when one slot can take all `travelers`.
+    Past days are never set. One query over the rollup, whatever the number of tours.
+    """
+    first = datetime.date(year, month, 1)
+    last = first.replace(day=monthrange(year, month)[1])
+    first = max(first, timezone.localdate())
+
+    bitmaps = {str(tour_id): 0 for tour_id in tour_ids}
+    days = TourDayCapacity.objects.filter(
+        tour_id__in=tour_ids, date__gte=first, date__lte=last, largest_party__gte=travelers
+    ).values_list('tour_id', 'date')
+    for tour_id, date in days:
+        bitmaps[str(tour_id)] |= 1 << (date.day - 1)
+    return bitmaps
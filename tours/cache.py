@@ -0,0 +1,195 @@
+# tours/cache.py
+
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.translation import get_language
+from functools import wraps
+from rest_framework.response import Response
+import hashlib
+import logging
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# What each cached endpoint depends on; saving or deleting a model bumps its scope
+SCOPES = ('tours', 'categories', 'reviews')
+STATS_FLUSH_EVERY = 100
+
+class LocalLRU:
+    """Small thread-safe LRU kept in each process in front of Redis"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+class CatalogCache:
+    """
+    Two-tier response cache for the public tour catalog endpoints.
+
+    Keys include a version stamp per scope the endpoint depends on. Stamps live
+    in Redis and are replaced when a model in that scope changes, so every process
+    stops using old entries at once; old entries simply expire. Each request reads
+    the stamps (one round trip), then looks in the local LRU before Redis.
+    If Redis fails the cache steps aside and responses are built uncached.
+    """
+
+    def __init__(self):
+        self.local = LocalLRU(settings.TOUR_CACHE_LOCAL_SIZE)
+        self.counters = {'local_hits': 0, 'redis_hits': 0, 'misses': 0, 'bypassed': 0}
+        self.unflushed = dict.fromkeys(self.counters, 0)
+        self.lock = threading.Lock()
+        self.disabled_until = 0
+
+    # Redis access (fail open)
+
+    def available(self):
+        return time.monotonic() >= self.disabled_until
+
+    def redis_failed(self, error):
+        logger.warning(f"Tour catalog cache unavailable, serving uncached: {error}")
+        self.disabled_until = time.monotonic() + settings.TOUR_CACHE_RETRY_AFTER
+
+    def version_key(self, scope):
+        return f"tours:version:{scope}"
+
+    def versions(self, scopes):
+        keys = [self.version_key(scope) for scope in scopes]
+        found = cache.get_many(keys)
+        for key in keys:
+            if key not in found:
+                # First use or evicted: start a fresh stamp so nothing older can match
+                cache.add(key, uuid.uuid4().hex[:12], timeout=None)
+                found[key] = cache.get(key)
+        return '.'.join(str(found[key]) for key in keys)
+
+    def bump(self, *scopes):
+        """Invalidate every cached response that depends on any of `scopes`"""
+        try:
+            cache.set_many({self.version_key(scope): uuid.uuid4().hex[:12] for scope in scopes}, timeout=None)
+        except Exception as e:
+            logger.error(f"Could not invalidate tour catalog cache for {scopes}: {e}")
+
+    # Counters
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+            self.unflushed[name] += 1
+            if sum(self.unflushed.values()) < STATS_FLUSH_EVERY:
+                return
+            pending, self.unflushed = self.unflushed, dict.fromkeys(self.counters, 0)
+        if not self.available():
+            return
+        try:
+            for name, value in pending.items():
+                if value:
+                    key = f"tours:cache_stats:{name}"
+                    cache.add(key, 0, timeout=None)
+                    cache.incr(key, value)
+        except Exception as e:
+            logger.warning(f"Could not record tour catalog cache stats: {e}")
+
+    def stats(self):
+        """Counters for this process and, when reachable, across all processes"""
+        with self.lock:
+            result = {'process': dict(self.counters)}
+        try:
+            shared = cache.get_many([f"tours:cache_stats:{name}" for name in self.counters])
+            result['shared'] = {name: shared.get(f"tours:cache_stats:{name}", 0) for name in self.counters}
+        except Exception:
+            result['shared'] = None
+        return result
+
+    # Responses
+
+    def make_key(self, request, endpoint, versions, daily=False):
+        params = sorted((key, sorted(request.GET.getlist(key))) for key in request.GET)
+        fingerprint = hashlib.md5(
+            repr((request.get_host(), request.path, get_language(), params)).encode()
+        ).hexdigest()
+        if daily:
+            # Responses that depend on today's date (e.g. past days are not bookable) end at midnight
+            versions = f"{versions}:{timezone.localdate().isoformat()}"
+        return f"tours:response:{endpoint}:{versions}:{fingerprint}"
+
+    def respond(self, request, endpoint, scopes, build, daily=False):
+        """Return the cached response data for this request, or build, store and return it"""
+        if request.method != 'GET' or not self.available():
+            self.count('bypassed')
+            return self.tag(build(), 'BYPASS')
+
+        try:
+            key = self.make_key(request, endpoint, self.versions(scopes), daily)
+            data = self.local.get(key)
+            if data is not None:
+                self.count('local_hits')
+                return self.tag(Response(data), 'HIT')
+
+            data = cache.get(key)
+            if data is not None:
+                self.local.set(key, data)
+                self.count('redis_hits')
+                return self.tag(Response(data), 'HIT')
+        except Exception as e:
+            self.redis_failed(e)
+            self.count('bypassed')
+            return self.tag(build(), 'BYPASS')
+
+        response = build()
+        self.count('misses')
+        if response.status_code == 200:
+            self.local.set(key, response.data)
+            try:
+                cache.set(key, response.data, timeout=settings.TOUR_CACHE_TIMEOUT)
+            except Exception as e:
+                self.redis_failed(e)
+        return self.tag(response, 'MISS')
+
+    def tag(self, response, state):
+        response['X-Cache'] = state
+        return response
+
+catalog_cache = CatalogCache()
+
+class CachedCatalogMixin:
+    """Serve a list view through the catalog cache"""
+    cache_endpoint = None
+    cache_scopes = ('tours', 'categories', 'reviews')  # reviews move tour ratings
+
+    def list(self, request, *args, **kwargs):
+        return catalog_cache.respond(
+            request, self.cache_endpoint, self.cache_scopes,
+            lambda: super(CachedCatalogMixin, self).list(request, *args, **kwargs)
+        )
+
+def cached_catalog_view(endpoint, scopes=SCOPES, daily=False):
+    """Serve a function view through the catalog cache (place it below @api_view)"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return catalog_cache.respond(request, endpoint, scopes, lambda: view(request, *args, **kwargs), daily)
+        return wrapper
+    return decorator
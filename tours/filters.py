@@ -0,0 +1,23 @@
+# tours/filters.py
+
+from rest_framework.filters import BaseFilterBackend
+
+from .search import rank_order, search_tours
+
+class TourSearchFilter(BaseFilterBackend):
+    """
+    `?search=` over title, location and descriptions using the tour search vector.
+    Results are ordered by relevance unless the client asked for an `ordering`.
+    Place it after OrderingFilter so the relevance order is not overridden.
+    """
+    search_param = 'search'
+    ordering_param = 'ordering'
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '')
+        if not text.strip():
+            return queryset
+        queryset = search_tours(queryset, text)
+        if request.query_params.get(self.ordering_param):
+            return queryset
+        return rank_order(queryset, *queryset.query.order_by)
@@ -0,0 +1,40 @@
+# tours/identity.py
+
+from django.core.exceptions import ValidationError
+
+from .models import Tour
+
+class TourIdentityMap:
+    """
+    The tours loaded while handling one request, by id.
+
+    Validation, creation and email rendering of a booking all ask this map,
+    so each tour is read from the database once per request.
+    """
+
+    def __init__(self):
+        self.tours = {}
+
+    def get(self, tour_id):
+        """The active tour with this id, or None"""
+        key = str(tour_id)
+        if key not in self.tours:
+            try:
+                self.tours[key] = Tour.objects.filter(id=tour_id, is_active=True).first()
+            except ValidationError:
+                # Not a valid id at all
+                self.tours[key] = None
+        return self.tours[key]
+
+    def add(self, tour):
+        self.tours[str(tour.pk)] = tour
+
+def tour_identity_map(request=None):
+    """The map shared by everything handling `request`; a private one without a request"""
+    if request is None:
+        return TourIdentityMap()
+    # DRF wraps the HttpRequest; keep the map on the inner one so middleware and views share it
+    http_request = getattr(request, '_request', request)
+    if not hasattr(http_request, 'tour_identity_map'):
+        http_request.tour_identity_map = TourIdentityMap()
+    return http_request.tour_identity_map
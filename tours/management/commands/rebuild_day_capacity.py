@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from tours.availability import rebuild_day_capacity
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-day capacity rollup from the availability slots (e.g. after bulk slot imports)'
+
+    def handle(self, *args, **options):
+        days = rebuild_day_capacity()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt capacity for {days} tour days.'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from tours.cache import catalog_cache
+from tours.ratings import expected_rating, find_rating_drift, fix_rating_drift
+from tours.stats import schedule_tour_stats_refresh
+
+class Command(BaseCommand):
+    help = 'Recompute tour rating totals from active reviews and report (and fix) any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report drift, do not fix it')
+
+    def handle(self, *args, **options):
+        drifted = find_rating_drift()
+        for tour, expected_sum, expected_count in drifted:
+            self.stdout.write(
+                f"{tour.title}: sum {tour.rating_sum} -> {expected_sum}, "
+                f"count {tour.review_count} -> {expected_count}, "
+                f"rating {tour.rating} -> {expected_rating(expected_sum, expected_count)}"
+            )
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('All tour ratings match their reviews.'))
+            return
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(drifted)} tours drifted (not fixed, --dry-run).'))
+            return
+
+        fix_rating_drift(drifted)
+        catalog_cache.bump('tours')
+        schedule_tour_stats_refresh()
+        self.stdout.write(self.style.SUCCESS(f'Fixed {len(drifted)} tours.'))
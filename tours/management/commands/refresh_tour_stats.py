@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from tours.stats import refresh_tour_stats
+
+class Command(BaseCommand):
+    help = 'Rebuild the tour statistics snapshot served by /api/tours/stats/ (run periodically, e.g. from cron)'
+
+    def handle(self, *args, **options):
+        snapshot = refresh_tour_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"Tour stats refreshed: {snapshot.total_tours} tours, {snapshot.total_categories} categories, "
+            f"{snapshot.total_reviews} reviews"
+        ))
@@ -0,0 +1,27 @@
+# tours/media.py
+
+from django.core.files.storage import default_storage
+from functools import lru_cache
+from rest_framework import serializers
+
+@lru_cache(maxsize=4096)
+def media_url(name):
+    """
+    Public URL of a stored file, built by the storage backend once per process.
+    Uploads get a new name when replaced, so a cached URL never goes stale.
+    """
+    return default_storage.url(name)
+
+class MediaURLField(serializers.Field):
+    """Read-only image/file field whose URL comes from `media_url` rather than the storage on every row"""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        url = media_url(str(value))
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
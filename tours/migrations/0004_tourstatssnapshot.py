@@ -0,0 +1,32 @@
+# Generated by Django 4.2 on 2026-10-17 19:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tours', '0003_alter_tourreview_unique_together'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TourStatsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_tours', models.IntegerField(default=0)),
+                ('total_categories', models.IntegerField(default=0)),
+                ('average_rating', models.DecimalField(decimal_places=2, default=0, max_digits=3)),
+                ('total_reviews', models.IntegerField(default=0)),
+                ('featured_tours', models.IntegerField(default=0)),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('max_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('avg_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('popular_locations', models.JSONField(default=list)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Tour Stats Snapshot',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-17 19:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tours', '0004_tourstatssnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tour',
+            name='rating_sum',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from decimal import Decimal
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def backfill_rating_totals(apps, schema_editor):
+    Tour = apps.get_model('tours', 'Tour')
+    TourReview = apps.get_model('tours', 'TourReview')
+
+    totals = {
+        row['tour_id']: (row['total'] or 0, row['count'])
+        for row in TourReview.objects.filter(is_active=True).values('tour_id').annotate(
+            total=Sum('rating'), count=Count('id')
+        )
+    }
+    tours = []
+    for tour in Tour.objects.only('id', 'rating', 'rating_sum', 'review_count'):
+        rating_sum, review_count = totals.get(tour.pk, (0, 0))
+        tour.rating_sum = rating_sum
+        tour.review_count = review_count
+        tour.rating = (Decimal(rating_sum) / review_count).quantize(Decimal('0.01')) if review_count else Decimal('0.00')
+        tours.append(tour)
+    Tour.objects.bulk_update(tours, ['rating_sum', 'review_count', 'rating'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tours', '0005_tour_rating_sum'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rating_totals, migrations.RunPython.noop),
+    ]
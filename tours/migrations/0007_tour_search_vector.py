@@ -0,0 +1,61 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+# Weighted columns and text search configurations at the time of this migration
+SEARCH_FIELDS = (('title', 'A'), ('location', 'B'), ('short_description', 'C'), ('description', 'D'))
+SEARCH_CONFIGS = ('english', 'italian')
+
+
+def create_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return  # SQLite fallback searches with icontains and has no use for the index
+    Tour = apps.get_model('tours', 'Tour')
+    schema_editor.add_index(Tour, django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='tour_search_vector_gin'))
+
+
+def drop_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Tour = apps.get_model('tours', 'Tour')
+    schema_editor.remove_index(Tour, django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='tour_search_vector_gin'))
+
+
+def backfill_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Tour = apps.get_model('tours', 'Tour')
+    vector = None
+    for config in SEARCH_CONFIGS:
+        for field, weight in SEARCH_FIELDS:
+            part = SearchVector(field, weight=weight, config=config)
+            vector = part if vector is None else vector + part
+    Tour.objects.update(search_vector=vector)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tours', '0006_backfill_tour_rating_sum'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tour',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='tour',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='tour_search_vector_gin'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_gin_index, drop_gin_index),
+            ],
+        ),
+        migrations.RunPython(backfill_search_vectors, migrations.RunPython.noop),
+    ]
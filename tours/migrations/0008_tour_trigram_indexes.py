@@ -0,0 +1,49 @@
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+TRIGRAM_INDEXES = (
+    ('title', 'tour_title_trgm'),
+    ('location', 'tour_location_trgm'),
+)
+
+
+def trigram_index(field, name):
+    return django.contrib.postgres.indexes.GinIndex(fields=[field], name=name, opclasses=['gin_trgm_ops'])
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return  # SQLite fallback has no fuzzy matching
+    Tour = apps.get_model('tours', 'Tour')
+    for field, name in TRIGRAM_INDEXES:
+        schema_editor.add_index(Tour, trigram_index(field, name))
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Tour = apps.get_model('tours', 'Tour')
+    for field, name in TRIGRAM_INDEXES:
+        schema_editor.remove_index(Tour, trigram_index(field, name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tours', '0007_tour_search_vector'),
+    ]
+
+    operations = [
+        # No-op outside Postgres
+        TrigramExtension(),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='tour', index=trigram_index(field, name))
+                for field, name in TRIGRAM_INDEXES
+            ],
+            database_operations=[
+                migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+            ],
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2 on 2026-10-17 19:30
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+import django.db.models.deletion
+
+
+def backfill_day_capacity(apps, schema_editor):
+    TourAvailability = apps.get_model('tours', 'TourAvailability')
+    TourDayCapacity = apps.get_model('tours', 'TourDayCapacity')
+
+    rows = TourAvailability.objects.filter(is_active=True).values('tour_id', 'date').annotate(
+        seats_left=Sum('available_spots'), largest_party=Max('available_spots'), slot_count=Count('id')
+    ).order_by()
+    TourDayCapacity.objects.bulk_create(
+        [TourDayCapacity(**row) for row in rows.iterator(chunk_size=2000)], batch_size=2000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tours', '0008_tour_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TourDayCapacity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('seats_left', models.IntegerField(default=0)),
+                ('largest_party', models.IntegerField(default=0)),
+                ('slot_count', models.IntegerField(default=0)),
+                ('tour', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_capacity', to='tours.tour')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='tourdaycapacity',
+            index=models.Index(fields=['date', 'largest_party'], name='tours_tourd_date_4f48b3_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='tourdaycapacity',
+            unique_together={('tour', 'date')},
+        ),
+        migrations.RunPython(backfill_day_capacity, migrations.RunPython.noop),
+    ]
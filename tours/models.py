@@ -1,6 +1,8 @@
 # tours/models.py
 
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils.text import slugify
 import uuid
@@ -75,6 +77,7 @@ class Tour(models.Model):
         validators=[MinValueValidator(0), MaxValueValidator(5)]
     )
     review_count = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)  # Sum of active review ratings, kept in step by tours/ratings.py
     
     # Availability
     is_active = models.BooleanField(default=True)
@@ -85,6 +88,9 @@ class Tour(models.Model):
     # SEO and Meta
     meta_description = models.CharField(max_length=160, blank=True)
     meta_keywords = models.CharField(max_length=200, blank=True)
+
+    # Full-text search (Postgres only, maintained by tours/search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -98,6 +104,9 @@ class Tour(models.Model):
             models.Index(fields=['rating']),
             models.Index(fields=['is_active']),
             models.Index(fields=['category']),
+            GinIndex(fields=['search_vector'], name='tour_search_vector_gin'),
+            GinIndex(fields=['title'], name='tour_title_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['location'], name='tour_location_trgm', opclasses=['gin_trgm_ops']),
         ]
 
     def save(self, *args, **kwargs):
@@ -172,6 +181,26 @@ class TourAvailability(models.Model):
     def is_available(self):
         return self.is_active and self.available_spots > 0
 
+class TourDayCapacity(models.Model):
+    """
+    Per-day rollup of a tour's active availability slots, kept in step by
+    tours/availability.py so calendars never scan the slots themselves.
+    """
+    tour = models.ForeignKey(Tour, related_name='day_capacity', on_delete=models.CASCADE)
+    date = models.DateField()
+    seats_left = models.IntegerField(default=0)  # Across all slots of the day
+    largest_party = models.IntegerField(default=0)  # Most seats left in any single slot
+    slot_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['tour', 'date']
+        indexes = [
+            models.Index(fields=['date', 'largest_party']),
+        ]
+
+    def __str__(self):
+        return f"{self.tour_id} {self.date}: {self.seats_left} seats left"
+
 class TourReview(models.Model):
     """
     Customer reviews for tours
@@ -187,4 +216,27 @@ class TourReview(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     # class Meta:
-    #     unique_together = ['tour', 'user']
\ No newline at end of file
+    #     unique_together = ['tour', 'user']
+
+
+class TourStatsSnapshot(models.Model):
+    """
+    Precomputed catalog statistics served by the stats endpoint.
+    A single row, rebuilt by `manage.py refresh_tour_stats` or shortly after catalog changes.
+    """
+    total_tours = models.IntegerField(default=0)
+    total_categories = models.IntegerField(default=0)
+    average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    total_reviews = models.IntegerField(default=0)
+    featured_tours = models.IntegerField(default=0)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    avg_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    popular_locations = models.JSONField(default=list)  # [{'location': ..., 'tour_count': ...}]
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Tour Stats Snapshot"
+
+    def __str__(self):
+        return f"Tour stats ({self.refreshed_at:%Y-%m-%d %H:%M})"
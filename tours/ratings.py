@@ -0,0 +1,70 @@
+# tours/ratings.py
+
+from decimal import Decimal
+from django.db.models import Count, DecimalField, F, FloatField, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Now
+
+from .models import Tour, TourReview
+
+RATING_FIELD = DecimalField(max_digits=3, decimal_places=2)
+
+def review_contribution(rating, is_active):
+    """(sum, count) a review adds to its tour's rating"""
+    return (rating, 1) if is_active else (0, 0)
+
+def apply_rating_delta(tour_id, sum_delta, count_delta):
+    """
+    Shift a tour's running rating sum and review count and recompute the average,
+    all in one UPDATE so concurrent reviews never lose each other's changes.
+    """
+    if not sum_delta and not count_delta:
+        return
+    new_sum = F('rating_sum') + sum_delta
+    new_count = F('review_count') + count_delta
+    Tour.objects.filter(pk=tour_id).update(
+        rating_sum=new_sum,
+        review_count=new_count,
+        # SET expressions see the old row, so the average is built from the new totals here;
+        # the float cast keeps SQLite (where NUMERIC stays an integer) from dividing integers
+        rating=Coalesce(
+            Cast(Cast(new_sum, FloatField()) / NullIf(new_count, 0), RATING_FIELD),
+            Value(Decimal('0.00')),
+            output_field=RATING_FIELD,
+        ),
+        updated_at=Now(),  # update() skips auto_now; list clients diff on it
+    )
+
+def expected_rating(rating_sum, review_count):
+    if not review_count:
+        return Decimal('0.00')
+    return (Decimal(rating_sum) / review_count).quantize(Decimal('0.01'))
+
+def find_rating_drift():
+    """
+    Compare every tour's stored rating totals with its active reviews in one GROUP BY pass.
+    Returns a list of (tour, expected_sum, expected_count) for tours that drifted.
+    """
+    totals = {
+        row['tour_id']: (row['total'] or 0, row['count'])
+        for row in TourReview.objects.filter(is_active=True).values('tour_id').annotate(
+            total=Sum('rating'), count=Count('id')
+        )
+    }
+
+    drifted = []
+    for tour in Tour.objects.only('id', 'title', 'rating', 'rating_sum', 'review_count').iterator(chunk_size=2000):
+        expected_sum, expected_count = totals.get(tour.pk, (0, 0))
+        if (tour.rating_sum, tour.review_count, tour.rating) != (
+            expected_sum, expected_count, expected_rating(expected_sum, expected_count)
+        ):
+            drifted.append((tour, expected_sum, expected_count))
+    return drifted
+
+def fix_rating_drift(drifted):
+    tours = []
+    for tour, expected_sum, expected_count in drifted:
+        tour.rating_sum = expected_sum
+        tour.review_count = expected_count
+        tour.rating = expected_rating(expected_sum, expected_count)
+        tours.append(tour)
+    Tour.objects.bulk_update(tours, ['rating_sum', 'review_count', 'rating'], batch_size=500)
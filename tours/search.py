@@ -0,0 +1,94 @@
+# tours/search.py
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+import re
+
+# Postgres text search configuration for each site language
+SEARCH_CONFIGS = {
+    'en': 'english',
+    'it': 'italian',
+}
+
+# Tour columns that feed the search vector, with their weight
+SEARCH_FIELDS = (
+    ('title', 'A'),
+    ('location', 'B'),
+    ('short_description', 'C'),
+    ('description', 'D'),
+)
+
+def search_configs():
+    return [SEARCH_CONFIGS[code] for code, _ in settings.LANGUAGES if code in SEARCH_CONFIGS]
+
+def full_text_enabled():
+    """Full-text search needs Postgres; SQLite (local runs) falls back to icontains"""
+    return connection.vendor == 'postgresql'
+
+def build_search_vector():
+    """Weighted vector over the searchable columns, stemmed once per site language"""
+    from django.contrib.postgres.search import SearchVector
+
+    vector = None
+    for config in search_configs():
+        for field, weight in SEARCH_FIELDS:
+            part = SearchVector(field, weight=weight, config=config)
+            vector = part if vector is None else vector + part
+    return vector
+
+def update_search_vector(queryset):
+    """Recompute the stored search vector for every tour in `queryset` (one UPDATE)"""
+    if full_text_enabled():
+        queryset.update(search_vector=build_search_vector())
+
+def build_search_query(text, prefix=False):
+    """
+    Query matching `text` in any site language. With `prefix`, every word
+    may be the start of a longer one (for search-as-you-type).
+    """
+    from django.contrib.postgres.search import SearchQuery
+
+    query = None
+    if prefix:
+        words = re.findall(r'\w+', text)
+        if not words:
+            return None
+        raw = ' & '.join(f"{word}:*" for word in words)
+        parts = [SearchQuery(raw, config=config, search_type='raw') for config in search_configs()]
+    else:
+        parts = [SearchQuery(text, config=config, search_type='websearch') for config in search_configs()]
+    for part in parts:
+        query = part if query is None else query | part
+    return query
+
+def search_tours(queryset, text, prefix=False):
+    """
+    Filter tours matching `text`. On Postgres this uses the indexed search vector
+    and annotates `search_rank`; elsewhere it matches substrings of the same columns.
+    """
+    text = text.strip()
+    if not text:
+        return queryset
+
+    if not full_text_enabled():
+        condition = Q()
+        for field, _ in SEARCH_FIELDS:
+            condition |= Q(**{f'{field}__icontains': text})
+        return queryset.filter(condition)
+
+    from django.contrib.postgres.search import SearchRank
+
+    query = build_search_query(text, prefix=prefix)
+    if query is None:
+        return queryset.none()
+    # ts_rank is a real; as double precision it round-trips exactly through cursors
+    rank = Cast(SearchRank(F('search_vector'), query), FloatField())
+    return queryset.filter(search_vector=query).annotate(search_rank=rank)
+
+def rank_order(queryset, *tiebreakers):
+    """Order search results by relevance when they were ranked"""
+    if 'search_rank' in queryset.query.annotations:
+        return queryset.order_by('-search_rank', *tiebreakers)
+    return queryset.order_by(*tiebreakers) if tiebreakers else queryset
@@ -41,10 +41,37 @@ class TourReviewSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('user', 'is_verified', 'created_at', 'updated_at')
 
-class TourListSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    Accept `fields=[...]` to output only those fields.
+    `source_columns` maps computed fields to the model columns they read,
+    so views can narrow the query to match with `.only()`.
+    """
+    source_columns = {}
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def columns_for(cls, fields):
+        columns = set()
+        for name in fields:
+            columns.update(cls.source_columns.get(name, (name,)))
+        return columns
+
+class TourListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for tour list (minimal data for performance)
     """
+    source_columns = {
+        'category_name': ('category__name',),
+        'discount_percentage': ('price', 'original_price'),
+        'is_on_sale': ('price', 'original_price'),
+    }
+
     category_name = serializers.CharField(source='category.name', read_only=True)
     discount_percentage = serializers.ReadOnlyField()
     is_on_sale = serializers.ReadOnlyField()
@@ -64,8 +91,9 @@ class TourDetailSerializer(serializers.ModelSerializer):
     """
     category = TourCategorySerializer(read_only=True)
     images = TourImageSerializer(many=True, read_only=True)
-    availability_slots = TourAvailabilitySerializer(many=True, read_only=True)
-    reviews = TourReviewSerializer(many=True, read_only=True)
+    # Bounded slices prefetched by TourDetailView; full lists have their own endpoints
+    availability_slots = TourAvailabilitySerializer(source='upcoming_slots', many=True, read_only=True)
+    reviews = TourReviewSerializer(source='latest_reviews', many=True, read_only=True)
     
     # Computed fields
     discount_percentage = serializers.ReadOnlyField()
@@ -75,7 +103,7 @@ class TourDetailSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Tour
-        fields = '__all__'
+        exclude = ('search_vector', 'rating_sum')
 
 class CreateTourReviewSerializer(serializers.ModelSerializer):
     """
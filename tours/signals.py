@@ -0,0 +1,106 @@
+# tours/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .autocomplete import autocomplete
+from .availability import refresh_day_capacity
+from .cache import catalog_cache
+from .models import Tour, TourAvailability, TourCategory, TourImage, TourReview
+from .ratings import apply_rating_delta, review_contribution
+from .search import update_search_vector
+from .stats import schedule_tour_stats_refresh
+
+# Catalog cache scopes touched by each model
+CACHE_SCOPES = {
+    Tour: ('tours',),
+    TourImage: ('tours',),
+    TourCategory: ('categories',),
+    TourReview: ('reviews',),
+}
+
+@receiver(post_save, sender=Tour)
+@receiver(post_save, sender=TourImage)
+@receiver(post_save, sender=TourCategory)
+@receiver(post_save, sender=TourReview)
+@receiver(post_delete, sender=Tour)
+@receiver(post_delete, sender=TourImage)
+@receiver(post_delete, sender=TourCategory)
+@receiver(post_delete, sender=TourReview)
+def invalidate_catalog_cache(sender, **kwargs):
+    # Bump after commit so no request can cache the pre-change rows under the new version
+    scopes = CACHE_SCOPES[sender]
+    transaction.on_commit(lambda: catalog_cache.bump(*scopes))
+
+@receiver(post_save, sender=Tour)
+@receiver(post_save, sender=TourCategory)
+@receiver(post_save, sender=TourReview)
+@receiver(post_delete, sender=Tour)
+@receiver(post_delete, sender=TourCategory)
+@receiver(post_delete, sender=TourReview)
+def refresh_stats_snapshot(sender, **kwargs):
+    transaction.on_commit(schedule_tour_stats_refresh)
+
+@receiver(pre_save, sender=TourReview)
+def remember_review_rating(sender, instance, raw=False, **kwargs):
+    """Keep what the review counted for before this save, so post_save can apply the difference"""
+    instance._previous_rating = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._previous_rating = TourReview.objects.filter(pk=instance.pk).values_list(
+        'tour_id', 'rating', 'is_active'
+    ).first()
+
+@receiver(post_save, sender=TourReview)
+def update_tour_rating_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    new_sum, new_count = review_contribution(instance.rating, instance.is_active)
+    previous = getattr(instance, '_previous_rating', None)
+    if previous is None:
+        apply_rating_delta(instance.tour_id, new_sum, new_count)
+        return
+
+    old_tour_id, old_rating, old_active = previous
+    old_sum, old_count = review_contribution(old_rating, old_active)
+    if old_tour_id == instance.tour_id:
+        apply_rating_delta(instance.tour_id, new_sum - old_sum, new_count - old_count)
+    else:
+        apply_rating_delta(old_tour_id, -old_sum, -old_count)
+        apply_rating_delta(instance.tour_id, new_sum, new_count)
+
+@receiver(post_delete, sender=TourReview)
+def update_tour_rating_on_delete(sender, instance, **kwargs):
+    old_sum, old_count = review_contribution(instance.rating, instance.is_active)
+    apply_rating_delta(instance.tour_id, -old_sum, -old_count)
+
+@receiver(post_save, sender=Tour)
+def refresh_search_vector(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    update_search_vector(Tour.objects.filter(pk=instance.pk))
+
+@receiver(post_save, sender=Tour)
+@receiver(post_delete, sender=Tour)
+def invalidate_autocomplete(sender, **kwargs):
+    # Other processes notice through the 'tours' version bump
+    transaction.on_commit(autocomplete.invalidate)
+
+@receiver(pre_save, sender=TourAvailability)
+def remember_slot_day(sender, instance, raw=False, **kwargs):
+    """A slot moved to another day leaves its old day to be recomputed too"""
+    instance._previous_day = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._previous_day = TourAvailability.objects.filter(pk=instance.pk).values_list('tour_id', 'date').first()
+
+@receiver(post_save, sender=TourAvailability)
+@receiver(post_delete, sender=TourAvailability)
+def refresh_slot_day_capacity(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    refresh_day_capacity(instance.tour_id, instance.date)
+    previous = getattr(instance, '_previous_day', None)
+    if previous and previous != (instance.tour_id, instance.date):
+        refresh_day_capacity(*previous)
@@ -0,0 +1,106 @@
+# tours/stats.py
+
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Avg, Count, IntegerField, Max, Min, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+import logging
+import threading
+
+from .cache import catalog_cache
+from .models import Tour, TourCategory, TourReview, TourStatsSnapshot
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_ID = 1
+
+def _count_subquery(queryset):
+    """Scalar subquery counting `queryset`, usable inside another query"""
+    return Subquery(
+        queryset.annotate(group=Value(1)).values('group').annotate(total=Count('*')).values('total'),
+        output_field=IntegerField(),
+    )
+
+def compute_tour_stats():
+    """
+    Catalog statistics in two queries: one conditional aggregation over tours
+    (with the category and review counts as scalar subqueries) and the location rollup.
+    """
+    active = Q(is_active=True)
+    totals = Tour.objects.aggregate(
+        total_tours=Count('id', filter=active),
+        featured_tours=Count('id', filter=active & Q(is_featured=True)),
+        average_rating=Avg('rating', filter=active),
+        min_price=Min('price', filter=active),
+        max_price=Max('price', filter=active),
+        avg_price=Avg('price', filter=active),
+        total_categories=Max(Coalesce(_count_subquery(TourCategory.objects.filter(is_active=True)), 0)),
+        total_reviews=Max(Coalesce(_count_subquery(TourReview.objects.filter(is_active=True)), 0)),
+    )
+
+    popular_locations = Tour.objects.filter(is_active=True).values('location').annotate(
+        tour_count=Count('id')
+    ).order_by('-tour_count')[:5]
+
+    return {
+        'total_tours': totals['total_tours'],
+        'total_categories': totals['total_categories'] or 0,
+        'average_rating': Decimal(totals['average_rating'] or 0).quantize(Decimal('0.01')),
+        'total_reviews': totals['total_reviews'] or 0,
+        'featured_tours': totals['featured_tours'],
+        'min_price': totals['min_price'],
+        'max_price': totals['max_price'],
+        'avg_price': Decimal(totals['avg_price']).quantize(Decimal('0.01')) if totals['avg_price'] is not None else None,
+        'popular_locations': list(popular_locations),
+    }
+
+def refresh_tour_stats():
+    """Recompute the snapshot row and drop cached stats responses"""
+    snapshot, _ = TourStatsSnapshot.objects.update_or_create(pk=SNAPSHOT_ID, defaults=compute_tour_stats())
+    catalog_cache.bump('stats')
+    return snapshot
+
+def get_tour_stats_snapshot():
+    """The current snapshot, built on first use"""
+    snapshot = TourStatsSnapshot.objects.filter(pk=SNAPSHOT_ID).first()
+    return snapshot or refresh_tour_stats()
+
+_timer = None
+_timer_lock = threading.Lock()
+
+def _refresh_later():
+    global _timer
+    # Changes from now on need another refresh, so let them schedule one
+    with _timer_lock:
+        _timer = None
+    try:
+        cache.delete('tours:stats_refresh_pending')
+    except Exception:
+        pass
+    try:
+        refresh_tour_stats()
+    except Exception as e:
+        logger.error(f"Failed to refresh tour stats: {e}")
+    finally:
+        connections.close_all()
+
+def schedule_tour_stats_refresh():
+    """
+    Refresh the snapshot TOUR_STATS_REFRESH_DELAY seconds from now, coalescing
+    every catalog change in that window (across processes) into one refresh.
+    """
+    global _timer
+    delay = settings.TOUR_STATS_REFRESH_DELAY
+    with _timer_lock:
+        if _timer is not None and _timer.is_alive():
+            return
+        try:
+            if not cache.add('tours:stats_refresh_pending', 1, timeout=delay):
+                return  # Another process already has a refresh scheduled
+        except Exception:
+            pass  # No shared cache: debounce within this process only
+        _timer = threading.Timer(delay, _refresh_later)
+        _timer.daemon = True
+        _timer.start()
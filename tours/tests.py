@@ -1,3 +1,398 @@
-from django.test import TestCase
+from datetime import time, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+import threading
+import time as clock
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from accounts.models import User
+from . import stats as tour_stats
+from .autocomplete import Autocomplete, SuggestionIndex
+from .cache import catalog_cache
+from .models import Tour, TourAvailability, TourCategory, TourReview
+from .ratings import find_rating_drift, fix_rating_drift
+from .search import full_text_enabled, update_search_vector
+from .stats import refresh_tour_stats
+from .views import TOUR_DETAIL_REVIEWS, TOUR_DETAIL_SLOTS, TourListPagination
+
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+def make_tour(title='Pyramids of Giza', **extra):
+    category, _ = TourCategory.objects.get_or_create(name='Culture')
+    fields = dict(
+        title=title, description='Great pyramids tour', short_description='Pyramids', location='Giza',
+        price=Decimal('100.00'), duration='3 hours', max_persons=10,
+        category=category, cover_photo='tour_images/a.jpg', includes='Guide',
+    )
+    fields.update(extra)
+    return Tour.objects.create(**fields)
+
+@override_settings(CACHES=LOCAL_CACHE, ALLOWED_HOSTS=['*'])
+class TourDetailSizeTests(TestCase):
+    """The detail endpoint must stay the same size however many slots and reviews a tour has"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='guide@example.com', username='guide', password='pw12345!x', first_name='Gui', last_name='De'
+        )
+        category = TourCategory.objects.create(name='Culture')
+        cls.tour = Tour.objects.create(
+            title='Pyramids of Giza', description='Great pyramids tour', short_description='Pyramids',
+            location='Giza', price=Decimal('100.00'), duration='3 hours', max_persons=10,
+            category=category, cover_photo='tour_images/a.jpg', includes='Guide',
+        )
+        today = timezone.localdate()
+        TourAvailability.objects.bulk_create([
+            TourAvailability(
+                tour=cls.tour, user=cls.user, date=today + timedelta(days=offset),
+                start_time=time(9), end_time=time(12), available_spots=10,
+            )
+            for offset in range(-100, 200)
+        ])
+        TourReview.objects.bulk_create([
+            TourReview(tour=cls.tour, user=cls.user, rating=5, title=f'Review {n}', comment='Great ' * 50)
+            for n in range(300)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def get_detail(self):
+        return self.client.get(f'/api/tours/{self.tour.id}/')
+
+    def test_detail_embeds_bounded_slices(self):
+        response = self.get_detail()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['reviews']), TOUR_DETAIL_REVIEWS)
+        self.assertLessEqual(len(response.data['availability_slots']), TOUR_DETAIL_SLOTS)
+        today = timezone.localdate().isoformat()
+        self.assertTrue(all(slot['date'] >= today for slot in response.data['availability_slots']))
+        self.assertNotIn('search_vector', response.data)
+
+    def test_detail_query_count(self):
+        # Tour with category, images, slots, reviews with their users
+        with self.assertNumQueries(4):
+            self.get_detail()
+
+    def test_detail_payload_size(self):
+        self.assertLess(len(self.get_detail().content), 64 * 1024)
+
+    def test_slots_endpoint_pages_through_future_slots(self):
+        seen = []
+        params = {'page_size': 40}
+        while True:
+            response = self.client.get(f'/api/tours/{self.tour.id}/slots/', params)
+            self.assertEqual(response.status_code, 200)
+            seen += [slot['id'] for slot in response.data['results']]
+            if not response.data['has_more']:
+                break
+            params['cursor'] = response.data['next_cursor']
+        self.assertEqual(len(seen), 200)
+        self.assertEqual(len(set(seen)), 200)
+
+@override_settings(CACHES=LOCAL_CACHE, ALLOWED_HOSTS=['*'])
+class TourSearchPagingTests(TestCase):
+    """Cursor pages of a search follow relevance, not catalog order"""
+    RELEVANCE = ['Pyramids of Giza', 'Giza plateau', 'Desert safari']
+
+    @classmethod
+    def setUpTestData(cls):
+        category = TourCategory.objects.create(name='Culture')
+        # Most relevant for "pyramids" first, so it is the oldest and last in catalog order
+        for title, description, price in (
+            ('Pyramids of Giza', 'Pyramids, pyramids and more pyramids', '30.00'),
+            ('Giza plateau', 'The pyramids and the pyramids museum', '20.00'),
+            ('Desert safari', 'Dunes with a view of the pyramids', '10.00'),
+        ):
+            Tour.objects.create(
+                title=title, description=description, short_description=title, location='Giza',
+                price=Decimal(price), duration='3 hours', max_persons=10,
+                category=category, cover_photo='tour_images/a.jpg', includes='Guide',
+            )
+
+    def page_through(self, queryset):
+        titles = []
+        cursor = None
+        while True:
+            params = {'page_size': 1, **({'cursor': cursor} if cursor else {})}
+            request = Request(APIRequestFactory().get('/api/tours/', params))
+            paginator = TourListPagination()
+            titles += [tour.title for tour in paginator.paginate_queryset(queryset, request)]
+            cursor = paginator.next_cursor
+            if cursor is None:
+                return titles
+
+    def test_ranked_pages_follow_the_rank(self):
+        ranked = Tour.objects.annotate(search_rank=Cast(F('price'), FloatField()))
+        self.assertEqual(self.page_through(ranked), self.RELEVANCE)
+
+    def test_unranked_pages_follow_the_catalog(self):
+        self.assertEqual(self.page_through(Tour.objects.all()), self.RELEVANCE[::-1])
+
+    @skipUnless(full_text_enabled(), 'Relevance ranking needs Postgres full-text search')
+    def test_paged_search_keeps_relevance_order(self):
+        update_search_vector(Tour.objects.all())
+        titles = []
+        params = {'search': 'pyramids', 'page_size': 1}
+        while True:
+            response = APIClient().get('/api/tours/', params)
+            titles += [tour['title'] for tour in response.data['results']]
+            if not response.data['next_cursor']:
+                break
+            params['cursor'] = response.data['next_cursor']
+        self.assertEqual(titles, self.RELEVANCE)
+
+@override_settings(CACHES=LOCAL_CACHE)
+class AutocompleteIndexTests(TransactionTestCase):
+    """Concurrent requests for a stale index rebuild it once"""
+
+    def setUp(self):
+        # Commits are real here; a stats refresh timer would fire during later tests
+        with mock.patch('tours.signals.schedule_tour_stats_refresh'):
+            make_tour()
+
+    def test_threads_queued_behind_a_rebuild_reuse_it(self):
+        autocomplete = Autocomplete()
+        build_index = SuggestionIndex
+        builds = []
+
+        def build(rows):
+            builds.append(threading.get_ident())
+            clock.sleep(0.2)  # Long enough for the other threads to queue on the lock
+            return build_index(rows)
+
+        def get_index():
+            try:
+                autocomplete.get_index()
+            finally:
+                connection.close()
+
+        with mock.patch('tours.autocomplete.SuggestionIndex', side_effect=build):
+            threads = [threading.Thread(target=get_index) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(builds), 1)
+
+        autocomplete.invalidate()
+        with mock.patch('tours.autocomplete.SuggestionIndex', side_effect=build):
+            autocomplete.get_index()
+        self.assertEqual(len(builds), 2)
+
+@override_settings(CACHES=LOCAL_CACHE, ALLOWED_HOSTS=['*'])
+class TourCalendarCacheTests(TestCase):
+    """Cached calendars are per tour and never outlive the day they were built on"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='guide@example.com', username='guide', password='pw12345!x', first_name='Gui', last_name='De'
+        )
+        cls.today = timezone.localdate()
+        cls.tours = [make_tour(), make_tour('Nile cruise')]
+        TourAvailability.objects.create(
+            tour=cls.tours[0], user=cls.user, date=cls.today, start_time=time(23, 0), end_time=time(23, 30),
+            available_spots=4,
+        )
+
+    def setUp(self):
+        cache.clear()
+        catalog_cache.local.clear()
+
+    def calendar(self, tour):
+        response = APIClient().get(f'/api/tours/{tour.id}/calendar/', {'month': self.today.strftime('%Y-%m')})
+        self.assertEqual(response.status_code, 200)
+        return response['X-Cache'], response.data['tours'][str(tour.id)]
+
+    def test_each_tour_has_its_own_entry(self):
+        today_bit = 1 << (self.today.day - 1)
+        self.assertEqual(self.calendar(self.tours[0]), ('MISS', today_bit))
+        self.assertEqual(self.calendar(self.tours[1]), ('MISS', 0))
+        self.assertEqual(self.calendar(self.tours[0]), ('HIT', today_bit))
+
+    def test_entries_end_at_midnight(self):
+        self.calendar(self.tours[0])
+        tomorrow = self.today + timedelta(days=1)
+        if tomorrow.month != self.today.month:
+            self.skipTest('Needs tomorrow in the same month')
+        with mock.patch('django.utils.timezone.localdate', return_value=tomorrow):
+            # Yesterday's slot is in the past now
+            self.assertEqual(self.calendar(self.tours[0]), ('MISS', 0))
+
+@override_settings(CACHES=LOCAL_CACHE, ALLOWED_HOSTS=['*'])
+class CatalogCacheTests(TestCase):
+    """Catalog responses are reused until a change in their scope, and served uncached if the cache fails"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tour = make_tour()
+
+    def setUp(self):
+        cache.clear()
+        catalog_cache.local.clear()
+        self.addCleanup(setattr, catalog_cache, 'disabled_until', 0)
+
+    def tour_list(self):
+        response = APIClient().get('/api/tours/')
+        self.assertEqual(response.status_code, 200)
+        return response['X-Cache'], [tour['title'] for tour in response.data]
+
+    def test_saving_a_tour_retires_cached_lists(self):
+        self.assertEqual(self.tour_list(), ('MISS', ['Pyramids of Giza']))
+        self.assertEqual(self.tour_list(), ('HIT', ['Pyramids of Giza']))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tour.title = 'Great Pyramids'
+            self.tour.save()
+        self.assertEqual(self.tour_list(), ('MISS', ['Great Pyramids']))
+        self.assertEqual(self.tour_list(), ('HIT', ['Great Pyramids']))
+
+    def test_other_scopes_keep_their_entries(self):
+        self.tour_list()
+        catalog_cache.bump('availability')
+        self.assertEqual(self.tour_list()[0], 'HIT')
+
+    def test_cache_errors_fail_open(self):
+        with mock.patch('tours.cache.cache.get_many', side_effect=ConnectionError('Redis is down')):
+            self.assertEqual(self.tour_list(), ('BYPASS', ['Pyramids of Giza']))
+        # Stays out of the way for TOUR_CACHE_RETRY_AFTER instead of failing every request
+        self.assertEqual(self.tour_list()[0], 'BYPASS')
+        catalog_cache.disabled_until = 0
+        self.assertEqual(self.tour_list()[0], 'MISS')
+
+@override_settings(CACHES=LOCAL_CACHE, ALLOWED_HOSTS=['*'], TOUR_STATS_REFRESH_DELAY=30)
+class TourStatsSnapshotTests(TestCase):
+    """The stats endpoint reads a snapshot that catalog changes refresh, debounced"""
+
+    def setUp(self):
+        cache.clear()
+        catalog_cache.local.clear()
+        make_tour(is_featured=True, price=Decimal('50.00'))
+        make_tour('Nile cruise', location='Luxor', price=Decimal('150.00'))
+
+    def stats(self):
+        response = APIClient().get('/api/tours/stats/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_snapshot_is_served_until_refreshed(self):
+        data = self.stats()
+        self.assertEqual((data['stats']['total_tours'], data['stats']['featured_tours']), (2, 1))
+        self.assertEqual(data['price_stats']['avg_price'], Decimal('100.00'))
+        self.assertEqual(data['popular_locations'][0], {'location': 'Giza', 'tour_count': 1})
+
+        make_tour('Karnak temple', location='Luxor')
+        self.assertEqual(self.stats()['stats']['total_tours'], 2)
+        refresh_tour_stats()
+        data = self.stats()
+        self.assertEqual(data['stats']['total_tours'], 3)
+        self.assertEqual(data['popular_locations'][0], {'location': 'Luxor', 'tour_count': 2})
+
+    def test_changes_in_one_window_schedule_one_refresh(self):
+        # Earlier tests may have left a real timer running; start from a clean slate
+        with mock.patch.object(tour_stats, '_timer', None), mock.patch('tours.stats.threading.Timer') as timer:
+            with self.captureOnCommitCallbacks(execute=True):
+                make_tour('Karnak temple')
+                make_tour('Valley of the Kings')
+            tour_stats.schedule_tour_stats_refresh()
+        timer.assert_called_once_with(30, tour_stats._refresh_later)
+
+@override_settings(CACHES=LOCAL_CACHE)
+class RatingDeltaTests(TestCase):
+    """Review writes shift the tour's running rating totals instead of recounting them"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='critic@example.com', username='critic', password='pw12345!x', first_name='Cri', last_name='Tic'
+        )
+        cls.tour = make_tour()
+        cls.other = make_tour('Nile cruise')
+
+    def review(self, rating, tour=None):
+        return TourReview.objects.create(tour=tour or self.tour, user=self.user, rating=rating, comment='Fine')
+
+    def assertTotals(self, tour, rating_sum, review_count, rating):
+        tour.refresh_from_db()
+        self.assertEqual((tour.rating_sum, tour.review_count, tour.rating), (rating_sum, review_count, Decimal(rating)))
+
+    def test_create_edit_and_delete(self):
+        first = self.review(5)
+        self.review(4)
+        self.assertTotals(self.tour, 9, 2, '4.50')
+
+        first.rating = 2
+        first.save()
+        self.assertTotals(self.tour, 6, 2, '3.00')
+
+        first.is_active = False
+        first.save()
+        self.assertTotals(self.tour, 4, 1, '4.00')
+        first.delete()
+        self.assertTotals(self.tour, 4, 1, '4.00')
+
+        TourReview.objects.get().delete()
+        self.assertTotals(self.tour, 0, 0, '0.00')
+        self.assertEqual(find_rating_drift(), [])
+
+    def test_moving_a_review_shifts_both_tours(self):
+        review = self.review(3)
+        self.review(5, tour=self.other)
+        review.tour = self.other
+        review.rating = 4
+        review.save()
+        self.assertTotals(self.tour, 0, 0, '0.00')
+        self.assertTotals(self.other, 9, 2, '4.50')
+        self.assertEqual(find_rating_drift(), [])
+
+    def test_drift_is_found_and_fixed(self):
+        self.review(4)
+        Tour.objects.filter(pk=self.tour.pk).update(rating_sum=1, review_count=3)
+        self.assertEqual([tour.pk for tour, _, _ in find_rating_drift()], [self.tour.pk])
+        fix_rating_drift(find_rating_drift())
+        self.assertTotals(self.tour, 4, 1, '4.00')
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite fallback search')
+@override_settings(CACHES=LOCAL_CACHE, ALLOWED_HOSTS=['*'])
+class TourSearchFallbackTests(TestCase):
+    """Without Postgres, `?search=` matches substrings of the same columns the vector covers"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pyramids = make_tour(is_featured=True)
+        cls.cruise = make_tour('Nile cruise', location='Aswan', short_description='Felucca', description='Sail at sunset')
+        cls.temple = make_tour('Karnak temple', location='Luxor', short_description='Temple', description='Hypostyle hall')
+
+    def setUp(self):
+        catalog_cache.local.clear()
+        cache.clear()
+
+    def search(self, text, **params):
+        response = APIClient().get('/api/tours/', {'search': text, 'fields': 'title', **params})
+        self.assertEqual(response.status_code, 200)
+        return [tour['title'] for tour in response.data]
+
+    def test_matches_each_searched_column_case_insensitively(self):
+        self.assertFalse(full_text_enabled())
+        self.assertEqual(self.search('NILE'), ['Nile cruise'])
+        self.assertEqual(self.search('luxor'), ['Karnak temple'])
+        self.assertEqual(self.search('felucca'), ['Nile cruise'])
+        self.assertEqual(self.search('hypostyle'), ['Karnak temple'])
+        self.assertEqual(self.search('petra'), [])
+
+    def test_keeps_the_list_ordering(self):
+        Tour.objects.filter(pk=self.cruise.pk).update(description='Sail past the temple of Kom Ombo')
+        self.assertEqual(self.search('temple'), ['Karnak temple', 'Nile cruise'])  # newest first
+        self.assertEqual(self.search('temple', ordering='-title'), ['Nile cruise', 'Karnak temple'])
+        self.assertEqual(len(self.search('  ')), 3)
 
-# Create your tests here.
@@ -11,10 +11,14 @@ urlpatterns = [
     path('categories/', views.TourCategoryListView.as_view(), name='tour_categories'),
     path('stats/', views.tour_stats, name='tour_stats'),
     path('search-suggestions/', views.tour_search_suggestions, name='tour_search_suggestions'),
+    path('cache-stats/', views.tour_cache_stats, name='tour_cache_stats'),
+    path('calendar/', views.tour_calendar, name='tour_calendar'),
     
     # Specific tour details
     path('<slug:id>/', views.TourDetailView.as_view(), name='tour_detail'),
     path('<slug:tour_slug>/availability/', views.tour_availability, name='tour_availability'),
+    path('<slug:id>/slots/', views.TourSlotListView.as_view(), name='tour_slots'),
+    path('<slug:id>/calendar/', views.tour_calendar, name='tour_calendar_single'),
     
     # Reviews
     path('<slug:tour_slug>/reviews/', views.TourReviewListView.as_view(), name='tour_reviews'),
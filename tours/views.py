@@ -2,12 +2,22 @@
 
 from rest_framework import generics, filters, status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Avg, Count
+from django.db import transaction
+from django.db.models import Prefetch, Q
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from tour_backend.pagination import KeysetListPagination, OptInKeysetPagination
+from .autocomplete import autocomplete
+from .availability import month_calendar
+from .cache import CachedCatalogMixin, cached_catalog_view, catalog_cache
+from .filters import TourSearchFilter
 from .models import Tour, TourCategory, TourReview, TourAvailability
+from .stats import get_tour_stats_snapshot
 from .serializers import (
     TourListSerializer, 
     TourDetailSerializer, 
@@ -16,22 +26,84 @@ from .serializers import (
     TourReviewSerializer,
     TourAvailabilitySerializer
 )
+from calendar import monthrange
+from datetime import datetime, timedelta
+import hashlib
+import json
+import uuid
 
-class TourListView(generics.ListAPIView):
+# Catalog order; the unique id last gives every tour a stable cursor position
+TOUR_LIST_ORDERING = ('-is_featured', '-created_at', 'id')
+
+# What the tour detail embeds; the rest is behind the slots and reviews endpoints
+TOUR_DETAIL_SLOT_DAYS = 60
+TOUR_DETAIL_SLOTS = 50
+TOUR_DETAIL_REVIEWS = 10
+
+MAX_CALENDAR_TOURS = 50
+
+class TourListPagination(OptInKeysetPagination):
+    ordering = TOUR_LIST_ORDERING
+
+class TourListView(CachedCatalogMixin, generics.ListAPIView):
     """
-    List all active tours with filtering and search
+    List all active tours with filtering and search.
+    Pass `page_size` (and then `cursor`) to page through the catalog, `fields`
+    to pick the output fields, or `view=ids` for just the ids and their versions.
     """
+    cache_endpoint = 'tour_list'
     serializer_class = TourListSerializer
-    pagination_class = None 
+    pagination_class = TourListPagination
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, TourSearchFilter]
     filterset_fields = ['category', 'difficulty', 'location', 'is_featured']
-    search_fields = ['title', 'description', 'location', 'short_description']
     ordering_fields = ['title', 'price', 'rating', 'created_at', 'duration_hours']
     ordering = ['-is_featured', '-created_at']
 
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('view') == 'ids':
+            return catalog_cache.respond(request, self.cache_endpoint, self.cache_scopes, self.list_versions)
+        return super().list(request, *args, **kwargs)
+
+    def list_versions(self):
+        """Ids and last update times of the matching tours, for diffing a cached catalog"""
+        rows = [
+            [str(tour_id), updated_at.isoformat()]
+            for tour_id, updated_at in self.filter_queryset(self.get_queryset()).values_list('id', 'updated_at')
+        ]
+        return Response({
+            'success': True,
+            'version': hashlib.md5(json.dumps(rows).encode()).hexdigest(),
+            'count': len(rows),
+            'tours': rows,
+        })
+
+    def get_sparse_fields(self):
+        raw = self.request.query_params.get('fields')
+        if not raw:
+            return None
+        fields = [name.strip() for name in raw.split(',') if name.strip()]
+        unknown = set(fields) - set(self.serializer_class.Meta.fields)
+        if unknown:
+            raise ParseError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        return fields
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_sparse_fields())
+        return super().get_serializer(*args, **kwargs)
+
     def get_queryset(self):
-        queryset = Tour.objects.filter(is_active=True).select_related('category')
+        queryset = Tour.objects.filter(is_active=True)
+
+        fields = self.get_sparse_fields()
+        if fields is None:
+            queryset = queryset.select_related('category')
+        else:
+            # Load only what the chosen fields read, plus the cursor columns
+            columns = self.serializer_class.columns_for(fields) | {name.lstrip('-') for name in TOUR_LIST_ORDERING}
+            if 'category__name' in columns:
+                queryset = queryset.select_related('category')
+            queryset = queryset.only(*columns)
         
         # Custom filtering
         min_price = self.request.query_params.get('min_price')
@@ -59,26 +131,65 @@ class TourDetailView(generics.RetrieveAPIView):
     lookup_field = 'id'
 
     def get_queryset(self):
+        # Embed bounded slices only; full lists are paged by the slots and reviews endpoints
+        today = timezone.localdate()
+        upcoming_slots = TourAvailability.objects.filter(
+            is_active=True,
+            date__gte=today,
+            date__lte=today + timedelta(days=TOUR_DETAIL_SLOT_DAYS),
+        ).order_by('date', 'start_time', 'id')[:TOUR_DETAIL_SLOTS]
+        latest_reviews = TourReview.objects.filter(is_active=True).select_related('user').order_by(
+            '-created_at', 'id'
+        )[:TOUR_DETAIL_REVIEWS]
+
         return Tour.objects.filter(is_active=True).select_related('category').prefetch_related(
             'images', 
-            'availability_slots',
-            'reviews__user'
+            # to_attr: Django 4.2.0 cannot cache sliced prefetches on the related manager
+            Prefetch('availability_slots', queryset=upcoming_slots, to_attr='upcoming_slots'),
+            Prefetch('reviews', queryset=latest_reviews, to_attr='latest_reviews'),
         )
 
-class FeaturedToursView(generics.ListAPIView):
+class TourSlotPagination(KeysetListPagination):
+    ordering = ('date', 'start_time', 'id')
+
+class TourSlotListView(generics.ListAPIView):
+    """
+    Active availability slots of a tour, from today (or `date_from`) onwards.
+    Paged with `page_size` and the `next_cursor` of the previous page.
+    """
+    serializer_class = TourAvailabilitySerializer
+    pagination_class = TourSlotPagination
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def get_queryset(self):
+        tour = get_object_or_404(Tour.objects.only('id'), id=self.kwargs['id'], is_active=True)
+        try:
+            date_from = parse_date(self.request.query_params.get('date_from', ''))
+            date_to = parse_date(self.request.query_params.get('date_to', ''))
+        except ValueError:
+            raise ParseError('Invalid date')
+
+        slots = TourAvailability.objects.filter(tour=tour, is_active=True, date__gte=date_from or timezone.localdate())
+        if date_to:
+            slots = slots.filter(date__lte=date_to)
+        return slots
+
+class FeaturedToursView(CachedCatalogMixin, generics.ListAPIView):
     """
     Get featured tours
     """
+    cache_endpoint = 'featured_tours'
     serializer_class = TourListSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     
     def get_queryset(self):
         return Tour.objects.filter(is_active=True, is_featured=True).select_related('category')[:6]
 
-class PopularToursView(generics.ListAPIView):
+class PopularToursView(CachedCatalogMixin, generics.ListAPIView):
     """
     Get popular tours based on ratings and bookings
     """
+    cache_endpoint = 'popular_tours'
     serializer_class = TourListSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     
@@ -89,10 +200,12 @@ class PopularToursView(generics.ListAPIView):
             review_count__gte=5
         ).select_related('category').order_by('-rating', '-review_count')[:6]
 
-class TourCategoryListView(generics.ListAPIView):
+class TourCategoryListView(CachedCatalogMixin, generics.ListAPIView):
     """
     List all tour categories
     """
+    cache_endpoint = 'tour_categories'
+    cache_scopes = ('categories',)
     serializer_class = TourCategorySerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     queryset = TourCategory.objects.filter(is_active=True)
@@ -153,10 +266,9 @@ class CreateTourReviewView(generics.CreateAPIView):
         
         serializer = self.get_serializer(data=mutable_data)
         serializer.is_valid(raise_exception=True)
-        review = serializer.save()
-        
-        # Update tour's average rating
-        self.update_tour_rating(tour)
+        # The tour's rating and review count are updated by the TourReview signals
+        with transaction.atomic():
+            review = serializer.save()
         
         return Response({
             'success': True,
@@ -164,22 +276,6 @@ class CreateTourReviewView(generics.CreateAPIView):
             'review': TourReviewSerializer(review).data
         }, status=status.HTTP_201_CREATED)
 
-    def update_tour_rating(self, tour):
-        """Update tour's average rating and review count"""
-        reviews = TourReview.objects.filter(tour=tour, is_active=True)
-        if reviews.exists():
-            tour.rating = reviews.aggregate(Avg('rating'))['rating__avg']
-            tour.review_count = reviews.count()
-            tour.save(update_fields=['rating', 'review_count'])
-
-    def update_tour_rating(self, tour):
-        """Update tour's average rating and review count"""
-        reviews = TourReview.objects.filter(tour=tour, is_active=True)
-        if reviews.exists():
-            tour.rating = reviews.aggregate(Avg('rating'))['rating__avg']
-            tour.review_count = reviews.count()
-            tour.save(update_fields=['rating', 'review_count'])
-
 @api_view(['GET'])
 @permission_classes([IsAuthenticatedOrReadOnly])
 def tour_search_suggestions(request):
@@ -194,34 +290,8 @@ def tour_search_suggestions(request):
             'suggestions': []
         })
     
-    # Search in tour titles and locations
-    tours = Tour.objects.filter(
-        Q(title__icontains=query) | Q(location__icontains=query),
-        is_active=True
-    ).values('title', 'slug', 'location').distinct()[:10]
-    
-    suggestions = []
-    for tour in tours:
-        suggestions.append({
-            'title': tour['title'],
-            'slug': tour['slug'],
-            'location': tour['location'],
-            'type': 'tour'
-        })
-    
-    # Add unique locations
-    locations = Tour.objects.filter(
-        location__icontains=query,
-        is_active=True
-    ).values_list('location', flat=True).distinct()[:5]
-    
-    for location in locations:
-        if not any(s['location'] == location for s in suggestions):
-            suggestions.append({
-                'title': location,
-                'location': location,
-                'type': 'location'
-            })
+    # Answered from the in-memory autocomplete index; typos fall back to trigram matching
+    suggestions = autocomplete.suggest(query)
     
     return Response({
         'success': True,
@@ -230,33 +300,81 @@ def tour_search_suggestions(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticatedOrReadOnly])
+@cached_catalog_view('tour_stats', scopes=('stats',))
 def tour_stats(request):
     """
-    Get overall tour statistics
+    Get overall tour statistics (read from the precomputed snapshot)
     """
+    snapshot = get_tour_stats_snapshot()
+
     stats = {
-        'total_tours': Tour.objects.filter(is_active=True).count(),
-        'total_categories': TourCategory.objects.filter(is_active=True).count(),
-        'average_rating': Tour.objects.filter(is_active=True).aggregate(Avg('rating'))['rating__avg'] or 0,
-        'total_reviews': TourReview.objects.filter(is_active=True).count(),
-        'featured_tours': Tour.objects.filter(is_active=True, is_featured=True).count(),
+        'total_tours': snapshot.total_tours,
+        'total_categories': snapshot.total_categories,
+        'average_rating': snapshot.average_rating,
+        'total_reviews': snapshot.total_reviews,
+        'featured_tours': snapshot.featured_tours,
     }
-    
-    # Popular locations (top 5)
-    popular_locations = Tour.objects.filter(is_active=True).values('location').annotate(
-        tour_count=Count('id')
-    ).order_by('-tour_count')[:5]
-    
-    # Price ranges
-    price_stats = Tour.objects.filter(is_active=True).aggregate(
-        min_price=models.Min('price'),
-        max_price=models.Max('price'),
-        avg_price=Avg('price')
-    )
-    
+
+    price_stats = {
+        'min_price': snapshot.min_price,
+        'max_price': snapshot.max_price,
+        'avg_price': snapshot.avg_price,
+    }
+
     return Response({
         'success': True,
         'stats': stats,
-        'popular_locations': list(popular_locations),
-        'price_stats': price_stats
-    })
\ No newline at end of file
+        'popular_locations': snapshot.popular_locations,
+        'price_stats': price_stats,
+        'refreshed_at': snapshot.refreshed_at,
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticatedOrReadOnly])
+@cached_catalog_view('tour_calendar', scopes=('availability',), daily=True)
+def tour_calendar(request, id=None):
+    """
+    Days of a month on which tours can take a party of `travelers`.
+    `month=YYYY-MM` (default: this month); tours from the URL or `tours=id,id,...`.
+    Each tour maps to a bitmap of the month: bit 0 is day 1.
+    """
+    month_param = request.query_params.get('month')
+    try:
+        month = datetime.strptime(month_param, '%Y-%m').date() if month_param else timezone.localdate()
+        travelers = int(request.query_params.get('travelers', 1))
+        tour_ids = [str(uuid.UUID(value)) for value in (
+            [id] if id else request.query_params.get('tours', '').split(',')
+        ) if value]
+    except ValueError:
+        return Response({
+            'error': 'Use month=YYYY-MM, a whole number of travelers and tour ids'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if not tour_ids or len(tour_ids) > MAX_CALENDAR_TOURS or travelers < 1:
+        return Response({
+            'error': f'Give between 1 and {MAX_CALENDAR_TOURS} tours and at least 1 traveler'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'success': True,
+        'month': f'{month.year:04d}-{month.month:02d}',
+        'days_in_month': monthrange(month.year, month.month)[1],
+        'travelers': travelers,
+        'tours': month_calendar(tour_ids, month.year, month.month, travelers),
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def tour_cache_stats(request):
+    """
+    Hit/miss counters of the tour catalog cache (admin only)
+    """
+    if not request.user.is_staff:
+        return Response({
+            'error': 'Admin access required'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    return Response({
+        'success': True,
+        'cache': catalog_cache.stats()
+    })